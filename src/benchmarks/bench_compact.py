@@ -0,0 +1,57 @@
+"""
+Footprint and color error of the compact storage formats against float32.
+
+    python -m benchmarks.bench_compact --ply scene.ply
+
+Colors are evaluated on the CPU with the shader's SH math from a set of camera
+positions around the scene, clamped to [0, 1], and compared as PSNR.
+"""
+import argparse
+
+import numpy as np
+
+import gaussian_representation
+from gaussian_math import eval_sh_color
+from benchmarks.synthetic import random_gaussians
+
+
+def psnr(a, b):
+    mse = np.mean((a - b) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(1.0 / mse)
+
+
+def colors(gaussians, cam_pos):
+    dirs = gaussians.xyz - cam_pos
+    dirs /= np.linalg.norm(dirs, axis=-1, keepdims=True)
+    return np.clip(eval_sh_color(gaussians.sh, dirs), 0, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ply", type=str, default=None)
+    parser.add_argument("--num", type=int, default=1_000_000)
+    parser.add_argument("--views", type=int, default=8)
+    args = parser.parse_args()
+
+    gaussians = gaussian_representation.from_ply(args.ply) if args.ply else random_gaussians(args.num)
+    center = gaussians.xyz.mean(axis=0)
+    radius = 2 * np.linalg.norm(gaussians.xyz - center, axis=-1).mean()
+    angles = np.linspace(0, 2 * np.pi, args.views, endpoint=False)
+    cams = center + radius * np.stack([np.cos(angles), np.zeros_like(angles), np.sin(angles)], axis=-1)
+    reference = [colors(gaussians, c) for c in cams]
+    float_bytes = gaussians.flat().nbytes
+    print(f"float32: {float_bytes / 2**20:.1f} MiB ({len(gaussians)} splats, sh_dim {gaussians.sh_dim})")
+
+    for sh_bits in (8, 16):
+        compact = gaussian_representation.encode_compact(gaussians, sh_bits=sh_bits)
+        decoded = gaussian_representation.decode_compact(compact)
+        color_psnr = min(psnr(colors(decoded, c), ref) for c, ref in zip(cams, reference))
+        opacity_err = np.abs(decoded.opacity - gaussians.opacity).max()
+        scale_err = np.abs(decoded.scale / gaussians.scale - 1).max()
+        print(f"compact{sh_bits}: {compact.nbytes / 2**20:.1f} MiB ({float_bytes / compact.nbytes:.2f}x smaller), "
+              f"worst-view color PSNR {color_psnr:.1f} dB, max opacity error {opacity_err:.4f}, "
+              f"max relative scale error {scale_err:.4f}")
+
+
+if __name__ == "__main__":
+    main()
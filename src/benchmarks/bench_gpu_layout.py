@@ -0,0 +1,43 @@
+"""
+CPU-side cost of preparing the interleaved flat() buffer versus the
+structure-of-arrays buffers uploaded by the "soa" storage format.
+
+    python -m benchmarks.bench_gpu_layout --num 5000000
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.synthetic import random_gaussians
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num", type=int, default=1_000_000)
+    parser.add_argument("--sh-degrees", type=int, nargs="+", default=[0, 3])
+    args = parser.parse_args()
+
+    for degree in args.sh_degrees:
+        gaussians = random_gaussians(args.num, sh_degree=degree)
+        flat, flat_time, flat_peak = measure(gaussians.flat)
+        soa, soa_time, soa_peak = measure(gaussians.soa)
+        soa_gpu = sum(a.nbytes for a in soa.values())
+        print(f"SH degree {degree}, {args.num} splats")
+        print(f"  flat: {flat_time * 1e3:8.2f} ms, {flat_peak / 2**20:8.1f} MiB allocated, "
+              f"{flat.nbytes / 2**20:8.1f} MiB on GPU")
+        print(f"  soa:  {soa_time * 1e3:8.2f} ms, {soa_peak / 2**20:8.1f} MiB allocated, "
+              f"{soa_gpu / 2**20:8.1f} MiB on GPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Effect of Morton-ordering the Gaussians at load on the CPU passes that read them.
+
+    python -m benchmarks.bench_morton --sizes 1000000 5000000 --repeats 3
+
+For each size, a set in random (training) order and the same set after
+spatial_index.morton_order() are compared on
+    sort    view depth and argsort of every center, what the cpu backend does,
+    gather  the flat() rows in back-to-front order, the access pattern of the
+            vertex shader's per-instance reads,
+    cull    an octree frustum query, and the sort of the visible subset.
+"""
+import argparse
+import time
+
+import glm
+import numpy as np
+
+import sorting
+import spatial_index
+from benchmarks.synthetic import random_gaussians
+
+
+def best_of(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def camera(aspect=16 / 9):
+    # From inside the cloud, so culling drops most of it.
+    view = np.array(glm.lookAt(glm.vec3(0, 0, 0), glm.vec3(1, 0.2, 0.3), glm.vec3(0, -1, 0)))
+    proj = np.array(glm.perspective(glm.radians(60), aspect, 0.01, 100))
+    return view, proj @ view
+
+
+def measure(gaussians, view, clip, repeats):
+    flat = gaussians.flat()
+    xyz = gaussians.xyz
+
+    def sort():
+        return np.argsort(sorting.view_depth(xyz, view))
+
+    index = sort()
+    octree = spatial_index.Octree(xyz, gaussians.scale)
+    visible = octree.query(clip)
+
+    def cull_and_sort():
+        subset = octree.query(clip)
+        return subset[np.argsort(sorting.view_depth(xyz[subset], view))]
+
+    return {
+        "sort": best_of(sort, repeats),
+        "gather": best_of(lambda: flat[index], repeats),
+        "cull": best_of(lambda: octree.query(clip), repeats),
+        "cull+sort": best_of(cull_and_sort, repeats),
+        "visible": len(visible),
+        "ranges": len(octree.query_ranges(clip)[0]),
+        "ordered": octree.ordered,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--sh-degree", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    view, clip = camera()
+    for n in args.sizes:
+        shuffled = random_gaussians(n, args.sh_degree)
+        shuffled = type(shuffled).from_flat(shuffled.flat())
+        start = time.perf_counter()
+        order = spatial_index.morton_order(shuffled.xyz)
+        order_time = time.perf_counter() - start
+        start = time.perf_counter()
+        morton = shuffled.reordered(order)
+        permute_time = time.perf_counter() - start
+        print(f"{n:>10} splats, {shuffled.flat().shape[-1] * 4} B/row: morton_order {order_time * 1e3:.1f} ms, "
+              f"permute {permute_time * 1e3:.1f} ms")
+
+        before = measure(shuffled, view, clip, args.repeats)
+        after = measure(morton, view, clip, args.repeats)
+        for key in ("sort", "gather", "cull", "cull+sort"):
+            print(f"    {key:<10} {before[key] * 1e3:9.2f} ms -> {after[key] * 1e3:9.2f} ms  "
+                  f"{before[key] / after[key]:5.2f}x")
+        kind = "row ranges" if after["ordered"] else "runs of a permutation"
+        print(f"    visible    {after['visible']} splats in {after['ranges']} octree runs, {kind} after reordering")
+
+
+if __name__ == "__main__":
+    main()
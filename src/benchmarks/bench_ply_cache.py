@@ -0,0 +1,47 @@
+"""
+Cold (parse + activate + write) versus warm (memory-mapped) PLY cache loads.
+
+    python -m benchmarks.bench_ply_cache --num 5000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import write_raw_ply
+from ply_cache import PlyCache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num", type=int, default=1_000_000)
+    parser.add_argument("--ply", type=str, default=None, help="Existing PLY file to load instead of a synthetic one")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = args.ply
+    if path is None:
+        path = os.path.join(workdir, "bench.ply")
+        write_raw_ply(path, args.num)
+    cache = PlyCache(cache_dir=os.path.join(workdir, "cache"))
+
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        gaussians = cache.load(path)
+        mapped = time.perf_counter() - start
+        # Reading the whole buffer is what the SSBO upload does next.
+        np.add.reduce(gaussians.flat(), axis=0)
+        touched = time.perf_counter() - start
+        print(f"{label}: load {mapped:7.3f} s, load + read-through {touched:7.3f} s "
+              f"({len(gaussians)} splats, {gaussians.flat().nbytes / 2**20:.1f} MiB)")
+        del gaussians
+
+    print(f"hits {cache.hits}, misses {cache.misses}")
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
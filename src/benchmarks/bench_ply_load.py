@@ -0,0 +1,62 @@
+"""
+Compares the memory-mapped PLY loader with the plyfile reference path.
+
+    python -m benchmarks.bench_ply_load --num 5000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import gaussian_representation
+from benchmarks.synthetic import write_raw_ply
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num", type=int, default=1_000_000)
+    parser.add_argument("--ply", type=str, default=None, help="Existing PLY file to load instead of a synthetic one")
+    args = parser.parse_args()
+
+    path = args.ply
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "bench.ply")
+        write_raw_ply(path, args.num)
+    size = os.path.getsize(path)
+    print(f"{path}: {size / 2**20:.1f} MiB")
+
+    paths = [
+        ("plyfile", lambda p: gaussian_representation._from_ply_plyfile(p).flat()),
+        ("mmap", lambda p: gaussian_representation.from_ply(p).flat()),
+        ("mmap flat", gaussian_representation.from_ply_flat),
+    ]
+    reference = None
+    for name, fn in paths:
+        flat, elapsed, peak = measure(fn, path)
+        if reference is None:
+            reference = flat
+        else:
+            assert np.allclose(flat, reference, rtol=1e-5, atol=1e-6), f"{name} disagrees with plyfile"
+        print(f"{name:>10}: {elapsed:7.3f} s, peak {peak / 2**20:8.1f} MiB "
+              f"({peak / flat.nbytes:.2f}x result)")
+        del flat
+
+    if args.ply is None:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
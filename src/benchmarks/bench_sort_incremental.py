@@ -0,0 +1,71 @@
+"""
+Full argsort versus IncrementalSorter along a camera path.
+
+    python -m benchmarks.bench_sort_incremental --sizes 1000000 5000000 10000000
+    python -m benchmarks.bench_sort_incremental --path trajectory.json
+
+A recorded path is a JSON list of {"position", "target", "up"} entries, the same
+fields Camera uses. Without one, an orbit with a small step per frame is used.
+"""
+import argparse
+import json
+import time
+
+import glm
+import numpy as np
+
+import sorting
+from benchmarks.synthetic import random_gaussians
+
+
+def load_path(path):
+    with open(path) as f:
+        frames = json.load(f)
+    return [np.array(glm.lookAt(glm.vec3(*fr["position"]), glm.vec3(*fr["target"]), glm.vec3(*fr.get("up", [0, -1, 0]))))
+            for fr in frames]
+
+
+def orbit_path(num_frames, step):
+    views = []
+    for i in range(num_frames):
+        a = i * step
+        eye = glm.vec3(3 * np.sin(a), 0.3 * np.sin(3 * a), 3 * np.cos(a))
+        views.append(np.array(glm.lookAt(eye, glm.vec3(0), glm.vec3(0, -1, 0))))
+    return views
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 5_000_000, 10_000_000])
+    parser.add_argument("--path", type=str, default=None)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--step", type=float, default=0.002, help="Orbit angle per frame in radians")
+    args = parser.parse_args()
+
+    views = load_path(args.path) if args.path else orbit_path(args.frames, args.step)
+    for n in args.sizes:
+        gaussians = random_gaussians(n, sh_degree=0)
+        sorter = sorting.IncrementalSorter()
+        full_time = incremental_time = 0.0
+        worst = 0.0
+        for view in views:
+            start = time.perf_counter()
+            np.argsort(sorting.view_depth(gaussians.xyz, view))
+            full_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            order = sorter(gaussians, view)[:, 0]
+            incremental_time += time.perf_counter() - start
+
+            keys = sorting.view_depth(gaussians.xyz, view)[order]
+            worst = max(worst, float((np.maximum.accumulate(keys) - keys).max() / (keys.max() - keys.min())))
+
+        frames = len(views)
+        print(f"{n:>10} splats: argsort {full_time / frames * 1e3:8.2f} ms/frame, "
+              f"incremental {incremental_time / frames * 1e3:8.2f} ms/frame "
+              f"(skipped {sorter.skipped}, repaired {sorter.repaired}, full {sorter.full_sorts}, "
+              f"worst inversion {worst:.1e} of depth range)")
+
+
+if __name__ == "__main__":
+    main()
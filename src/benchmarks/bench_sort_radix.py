@@ -0,0 +1,44 @@
+"""
+Throughput of the threaded radix sort backend versus np.argsort.
+
+    python -m benchmarks.bench_sort_radix --sizes 1000000 10000000 --threads 1 4 16
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+import sorting
+
+
+def best_of(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 5_000_000, 10_000_000])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        depth = rng.normal(0, 1, n).astype(np.float32)
+        t = best_of(lambda: np.argsort(depth), args.repeats)
+        print(f"{n:>10} np.argsort            {t * 1e3:8.2f} ms  {n / t / 1e6:7.1f} Mkeys/s")
+        for bits in (16, 32):
+            for threads in sorted(set(args.threads)):
+                sorter = sorting.RadixSorter(bits=bits, num_threads=threads)
+                t = best_of(lambda: sorter.argsort(sorting.quantize_depth(depth, bits)), args.repeats)
+                print(f"{n:>10} radix {bits}-bit {threads:>3} thr  {t * 1e3:8.2f} ms  {n / t / 1e6:7.1f} Mkeys/s")
+
+
+if __name__ == "__main__":
+    main()
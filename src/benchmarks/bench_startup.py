@@ -0,0 +1,116 @@
+"""
+Startup time of the viewer: `python -X importtime` breakdown of its imports and
+the wall time until main.py reports its first frame.
+
+    python -m benchmarks.bench_startup [--modules main gaussian_renderer] [--runs 3] [--out startup.json]
+
+Every measurement runs in a fresh interpreter, so nothing is cached in sys.modules.
+Time to first frame needs a display; without one it is reported as an error.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+_FIRST_FRAME = re.compile(r"First frame after ([\d.]+) s")
+
+
+def import_times(module):
+    """
+    Imports `module` in a fresh interpreter and returns [(name, depth, self_us, cumulative_us)]
+    in the order -X importtime prints them, dependencies before their importer.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=SRC_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            entries.append((m.group(4), len(m.group(3)) // 2, int(m.group(1)), int(m.group(2))))
+    return entries
+
+
+def breakdown(entries, top=15):
+    """
+    Summarizes import_times(): the total, the direct imports of the module by
+    cumulative time, and top-level packages by the self time of all their submodules.
+    """
+    root = entries[-1]
+    direct = [e for e in entries if e[1] == 1]
+    packages = defaultdict(int)
+    for name, _, self_us, _ in entries:
+        packages[name.split(".")[0]] += self_us
+    return {
+        "total_ms": root[3] / 1000,
+        "modules": len(entries),
+        "direct_imports_ms": {name: cum / 1000 for name, _, _, cum in sorted(direct, key=lambda e: -e[3])[:top]},
+        "packages_self_ms": {name: us / 1000 for name, us in sorted(packages.items(), key=lambda p: -p[1])[:top]},
+    }
+
+
+def time_to_first_frame(timeout=120):
+    """
+    Runs the viewer until its first frame and returns (wall seconds, seconds reported by main.py).
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "main.py", "--exit-after-first-frame"],
+                          cwd=SRC_DIR, capture_output=True, text=True, timeout=timeout)
+    wall = time.perf_counter() - start
+    m = _FIRST_FRAME.search(proc.stderr)
+    if proc.returncode != 0 or m is None:
+        lines = proc.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"exit code {proc.returncode}")
+    return wall, float(m.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=["main", "worldsettings", "gaussian_renderer", "imgui_manager"])
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per measurement, the median is kept")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--no-first-frame", action="store_true", help="only measure imports")
+    parser.add_argument("--out", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "imports": {}, "first_frame": None}
+    for module in args.modules:
+        try:
+            runs = [breakdown(import_times(module), args.top) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"import {module}: failed, {e}")
+            report["imports"][module] = {"error": str(e)}
+            continue
+        result = sorted(runs, key=lambda r: r["total_ms"])[len(runs) // 2]
+        report["imports"][module] = result
+        print(f"import {module}: {result['total_ms']:.1f} ms, {result['modules']} modules")
+        for name, ms in result["direct_imports_ms"].items():
+            print(f"    {name:<32} {ms:9.1f} ms")
+        print("  by package (self time):")
+        for name, ms in result["packages_self_ms"].items():
+            print(f"    {name:<32} {ms:9.1f} ms")
+
+    if not args.no_first_frame:
+        try:
+            times = sorted(time_to_first_frame() for _ in range(args.runs))
+            wall, reported = times[len(times) // 2]
+            report["first_frame"] = {"wall_s": wall, "reported_s": reported}
+            print(f"first frame: {wall:.2f} s wall, {reported:.2f} s after main.py started")
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            report["first_frame"] = {"error": str(e)}
+            print(f"first frame: failed, {e}")
+
+    if args.out is not None:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Regression benchmark suite for the load, sort and buffer-preparation hot paths.
+
+Every case runs on synthetic scenes for each requested size and SH degree and is
+written to one JSON file, so runs from different releases can be diffed.
+
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --sizes 10000 1000000 20000000 --sh-degrees 0 3 --cases sort
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import gaussian_representation
+import gaussian_renderer
+from benchmarks.synthetic import random_gaussians, write_raw_ply
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+FULL_SIZES = [10_000, 100_000, 1_000_000, 5_000_000, 20_000_000]
+GROUPS = ["load", "flat", "sort", "prep"]
+
+
+def max_rss_bytes() -> int:
+    """
+    Process-wide resident set high-water mark, or 0 where it cannot be queried.
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_case(fn, repeat):
+    """
+    Times fn() `repeat` times, then runs it once more under tracemalloc for the
+    peak of Python and NumPy allocations made by the case.
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "times_s": times,
+        "min_s": min(times),
+        "median_s": float(np.median(times)),
+        "peak_alloc_bytes": peak,
+        "max_rss_bytes": max_rss_bytes(),
+    }
+
+
+def orbit_views(num_views, radius=4.0):
+    """
+    View matrices on a slow orbit, so stateful sorters see frame-to-frame coherence.
+    """
+    from camera import Camera
+    views = []
+    for angle in np.linspace(0.0, 0.2, num_views):
+        camera = Camera(720, 1280)
+        camera.position[:] = [radius * np.sin(angle), 0.5, radius * np.cos(angle)]
+        views.append(camera.get_view_matrix())
+    return views
+
+
+def load_cases(n, sh_degree, tmp_dir):
+    path = os.path.join(tmp_dir, f"bench_{n}_{sh_degree}.ply")
+    write_raw_ply(path, n, sh_degree)
+    cases = {
+        "from_ply": lambda: gaussian_representation.from_ply(path),
+        "from_ply_flat": lambda: gaussian_representation.from_ply_flat(path),
+    }
+    if sh_degree > 0:
+        cases["from_ply_flat_sh0"] = lambda: gaussian_representation.from_ply_flat(path, max_sh_degree=0)
+    return cases, lambda: os.remove(path)
+
+
+def flat_cases(gaussians):
+    # flat() caches nothing on a GaussianData built from separate arrays.
+    return {"flat": gaussians.flat}
+
+
+def sort_cases(gaussians, backends):
+    views = orbit_views(8)
+    cases = {}
+    for name in backends:
+        fn = gaussian_renderer.SORT_BACKENDS[name]
+        def cold(fn=fn):
+            # Stateful sorters would otherwise reuse the order of the previous repeat.
+            if hasattr(fn, "reset"):
+                fn.reset()
+            return fn(gaussians, views[0])
+        cases[f"sort_{name}"] = cold
+        if name == "cpu_incremental":
+            def coherent(fn=fn):
+                fn.reset()
+                for view in views:
+                    fn(gaussians, view)
+            cases["sort_cpu_incremental_orbit8"] = coherent
+    return cases
+
+
+def prep_cases(gaussians):
+    from spatial_index import Octree, morton_order
+    from lod import LodHierarchy
+    return {
+        "prep_soa": gaussians.soa,
+        "prep_compact8": lambda: gaussian_representation.encode_compact(gaussians, sh_bits=8),
+        "prep_compact16": lambda: gaussian_representation.encode_compact(gaussians, sh_bits=16),
+        "prep_octree": lambda: Octree(gaussians.xyz, gaussians.scale),
+        "prep_lod": lambda: LodHierarchy(gaussians),
+        "prep_morton_order": lambda: gaussians.reordered(morton_order(gaussians.xyz)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=None)
+    parser.add_argument("--full", action="store_true", help=f"sizes {FULL_SIZES}")
+    parser.add_argument("--sh-degrees", type=int, nargs="+", default=[0, 1, 2, 3])
+    parser.add_argument("--cases", nargs="+", choices=GROUPS, default=GROUPS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tmp-dir", default=None, help="where synthetic PLY files are written")
+    parser.add_argument("--out", default="benchmark_results.json")
+    args = parser.parse_args()
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+    backends = gaussian_renderer.available_sort_backends()
+    tmp_dir = args.tmp_dir or tempfile.mkdtemp()
+
+    report = {
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "sort_backends": backends,
+        "results": [],
+    }
+    for n in sizes:
+        for degree in args.sh_degrees:
+            cleanup = None
+            cases = {}
+            if "load" in args.cases:
+                load, cleanup = load_cases(n, degree, tmp_dir)
+                cases.update(load)
+            gaussians = random_gaussians(n, sh_degree=degree)
+            if "flat" in args.cases:
+                cases.update(flat_cases(gaussians))
+            if "sort" in args.cases and degree == args.sh_degrees[0]:
+                # Sorting only reads the centers, so one SH degree per size is enough.
+                cases.update(sort_cases(gaussians, backends))
+            if "prep" in args.cases:
+                cases.update(prep_cases(gaussians))
+
+            for name, fn in cases.items():
+                entry = {"case": name, "num": n, "sh_degree": degree}
+                try:
+                    entry.update(run_case(fn, args.repeat))
+                    print(f"{name:>28} n={n:<9} sh={degree}: {entry['median_s'] * 1e3:10.2f} ms, "
+                          f"peak {entry['peak_alloc_bytes'] / 2**20:9.1f} MiB")
+                except Exception as e:
+                    entry["error"] = f"{type(e).__name__}: {e}"
+                    print(f"{name:>28} n={n:<9} sh={degree}: failed, {entry['error']}")
+                report["results"].append(entry)
+            if cleanup is not None:
+                cleanup()
+            del gaussians, cases
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
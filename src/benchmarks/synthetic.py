@@ -0,0 +1,41 @@
+import numpy as np
+from gaussian_representation import GaussianData
+
+
+def random_gaussians(n: int, sh_degree: int = 3, seed: int = 0) -> GaussianData:
+    """
+    Creates n activated Gaussians scattered in a unit-ish cube.
+    """
+    rng = np.random.default_rng(seed)
+    xyz = rng.normal(0, 1, (n, 3)).astype(np.float32)
+    rot = rng.normal(0, 1, (n, 4)).astype(np.float32)
+    rot /= np.linalg.norm(rot, axis=-1, keepdims=True)
+    scale = np.exp(rng.uniform(-6, -2, (n, 3))).astype(np.float32)
+    opacity = rng.uniform(0, 1, (n, 1)).astype(np.float32)
+    sh = rng.normal(0, 0.3, (n, 3 * (sh_degree + 1) ** 2)).astype(np.float32)
+    return GaussianData(xyz, rot, scale, opacity, sh)
+
+
+def write_raw_ply(path: str, n: int, sh_degree: int = 3, seed: int = 0, chunk: int = 1 << 20):
+    """
+    Writes a binary 3DGS-style PLY with n random, not yet activated splats.
+    Rows are generated in chunks so huge files do not need to fit in memory.
+    """
+    n_rest = 3 * (sh_degree + 1) ** 2 - 3
+    names = ["x", "y", "z", "nx", "ny", "nz", "f_dc_0", "f_dc_1", "f_dc_2"]
+    names += [f"f_rest_{i}" for i in range(n_rest)]
+    names += ["opacity", "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"]
+    header = ["ply", "format binary_little_endian 1.0", f"element vertex {n}"]
+    header += [f"property float {name}" for name in names]
+    header += ["end_header"]
+
+    rng = np.random.default_rng(seed)
+    with open(path, "wb") as f:
+        f.write(("\n".join(header) + "\n").encode("ascii"))
+        for start in range(0, n, chunk):
+            m = min(chunk, n - start)
+            rows = rng.normal(0, 1, (m, len(names))).astype("<f4")
+            rows[:, 3:6] = 0
+            scale_col = names.index("scale_0")
+            rows[:, scale_col:scale_col + 3] = rng.uniform(-6, -2, (m, 3))
+            f.write(rows.tobytes())
@@ -0,0 +1,337 @@
+"""
+Out-of-core scenes: a PLY file split into spatial chunks on disk, of which only
+the chunks near the camera are kept in memory.
+
+    python chunked_scene.py scene.ply scene_chunks/ [--chunk-rows 262144] [--sh-degree 1]
+
+Preprocessing streams the PLY through PlyFlatReader, so neither the input nor the
+output ever has to fit in RAM. Chunks are runs of Morton-ordered grid cells holding
+about chunk_rows splats each, saved as activated flat() rows in chunk_XXXXX.npy
+next to a manifest.json with their counts and padded bounds.
+
+At runtime a ResidencyManager keeps the chunks that intersect the frustum, nearest
+first, as objects of a Scene, within a byte budget. A worker thread pages chunks
+in, and the least recently visible chunks are evicted to make room.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+import numpy as np
+import util
+import gaussian_representation
+from gaussian_representation import GaussianData, PlyFlatReader
+from scene import Scene
+from spatial_index import morton_codes, morton_order, boxes_in_frustum
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_BUDGET_BYTES = 4 << 30
+_GRID_DEPTH = 7  # 128^3 cells to group into chunks
+
+
+@dataclass
+class ChunkInfo:
+    index: int
+    path: str
+    count: int
+    lo: np.ndarray   # (3,) bounds padded by every splat's 3-sigma radius
+    hi: np.ndarray
+    nbytes: int
+
+
+def _cell_codes(xyz, lo, extent):
+    return morton_codes(xyz, _GRID_DEPTH, lo, extent)
+
+
+def preprocess(ply_path, out_dir, chunk_rows=1 << 18, max_sh_degree=None, block=1 << 20) -> str:
+    """
+    Splits a binary PLY file into spatial chunks under out_dir and returns the
+    manifest path. Reads the file three times in blocks of `block` rows: for the
+    bounds, for the per-cell counts and for the rows themselves.
+    """
+    reader = PlyFlatReader(ply_path, max_sh_degree)
+    n = len(reader)
+    xyz_names = ["x", "y", "z"]
+
+    lo = np.full(3, np.inf, dtype=np.float32)
+    hi = np.full(3, -np.inf, dtype=np.float32)
+    for start in range(0, n, block):
+        xyz = gaussian_representation._gather(reader.vertices[start:start + block], xyz_names)
+        lo = np.minimum(lo, xyz.min(axis=0))
+        hi = np.maximum(hi, xyz.max(axis=0))
+    extent = max(float((hi - lo).max()), 1e-6)
+
+    counts = np.zeros(1 << (3 * _GRID_DEPTH), dtype=np.int64)
+    for start in range(0, n, block):
+        xyz = gaussian_representation._gather(reader.vertices[start:start + block], xyz_names)
+        counts += np.bincount(_cell_codes(xyz, lo, extent).astype(np.int64), minlength=len(counts))
+
+    # Consecutive cells in Morton order are spatially close; cut the sequence every chunk_rows splats.
+    cell_chunk = (np.cumsum(counts) - counts) // chunk_rows
+    used = np.unique(cell_chunk[counts > 0])
+    cell_chunk = np.searchsorted(used, cell_chunk)
+    chunk_counts = np.bincount(cell_chunk, weights=counts, minlength=len(used)).astype(np.int64)
+
+    os.makedirs(out_dir, exist_ok=True)
+    files = [f"chunk_{i:05d}.npy" for i in range(len(used))]
+    outputs = [np.lib.format.open_memmap(os.path.join(out_dir, f), mode="w+", dtype=np.float32,
+                                         shape=(int(c), reader.total_dim)) for f, c in zip(files, chunk_counts)]
+    cursors = np.zeros(len(used), dtype=np.int64)
+    chunk_lo = np.full((len(used), 3), np.inf, dtype=np.float32)
+    chunk_hi = np.full((len(used), 3), -np.inf, dtype=np.float32)
+    for start in range(0, n, block):
+        rows = reader.read(start, min(n, start + block))
+        chunk = cell_chunk[_cell_codes(rows[:, 0:3], lo, extent).astype(np.int64)]
+        order = np.argsort(chunk, kind="stable")
+        rows, chunk = rows[order], chunk[order]
+        starts = np.flatnonzero(np.concatenate([[True], chunk[1:] != chunk[:-1]]))
+        ids = chunk[starts]
+        radius = 3 * rows[:, 7:10].max(axis=1, keepdims=True)
+        chunk_lo[ids] = np.minimum(chunk_lo[ids], np.minimum.reduceat(rows[:, 0:3] - radius, starts))
+        chunk_hi[ids] = np.maximum(chunk_hi[ids], np.maximum.reduceat(rows[:, 0:3] + radius, starts))
+        for k, i in enumerate(ids):
+            part = rows[starts[k]:starts[k + 1] if k + 1 < len(starts) else len(rows)]
+            outputs[i][cursors[i]:cursors[i] + len(part)] = part
+            cursors[i] += len(part)
+    # Rows arrive in file order; Z-order each chunk so its splats are contiguous in space once resident.
+    for out in outputs:
+        out[:] = out[morton_order(out[:, 0:3])]
+        out.flush()
+    del outputs
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "source": os.path.abspath(ply_path),
+        "total": n,
+        "row_dim": reader.total_dim,
+        "sh_dim": reader.total_dim - 11,
+        "bounds": [lo.tolist(), hi.tolist()],
+        "chunks": [{"file": f, "count": int(c), "lo": l.tolist(), "hi": h.tolist()}
+                   for f, c, l, h in zip(files, chunk_counts, chunk_lo, chunk_hi)],
+    }
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest_path
+
+
+def load_manifest(path):
+    """
+    Returns (manifest dict, [ChunkInfo]). path is the manifest or its directory.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_NAME)
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"{path}: unsupported chunk manifest version {manifest.get('version')}")
+    base = os.path.dirname(path)
+    row_bytes = manifest["row_dim"] * 4
+    chunks = [ChunkInfo(i, os.path.join(base, c["file"]), c["count"], np.array(c["lo"], dtype=np.float32),
+                        np.array(c["hi"], dtype=np.float32), c["count"] * row_bytes)
+              for i, c in enumerate(manifest["chunks"])]
+    return manifest, chunks
+
+
+class ResidencyManager:
+    """
+    Pages the chunks of a preprocessed scene in and out of a Scene. Call update()
+    once per frame: it picks the wanted chunks for the camera, evicts least recently
+    wanted chunks to stay within budget_bytes and queues page-ins for the worker.
+    It returns True when the scene changed and has to be re-uploaded.
+
+    Chunks intersecting the frustum are wanted, nearest first; chunks in the wider
+    prefetch_margin frustum are loaded ahead of time when the budget allows.
+    """
+    def __init__(self, manifest_path, budget_bytes=DEFAULT_BUDGET_BYTES, scene=None,
+                 max_distance=None, prefetch_margin=2.0):
+        self.manifest, self.chunks = load_manifest(manifest_path)
+        self.budget_bytes = budget_bytes
+        self.max_distance = max_distance
+        self.prefetch_margin = prefetch_margin
+        self.scene = scene if scene is not None else Scene()
+        self.resident = OrderedDict()   # chunk index -> SceneObject, least recently wanted first
+        self.resident_bytes = 0
+        self._lo = np.stack([c.lo for c in self.chunks]) if self.chunks else np.zeros((0, 3), np.float32)
+        self._hi = np.stack([c.hi for c in self.chunks]) if self.chunks else np.zeros((0, 3), np.float32)
+
+        # Statistics
+        self.hits = 0             # wanted chunks found resident, summed over updates
+        self.misses = 0           # wanted chunks that were not resident
+        self.page_ins = 0
+        self.prefetches = 0       # page-ins of chunks that were not visible when queued
+        self.evictions = 0
+        self.page_in_times = deque(maxlen=256)
+
+        self._cond = threading.Condition()
+        self._queue = []          # (ChunkInfo, prefetch) to load, highest priority first
+        self._loading = None      # ChunkInfo the worker is reading
+        self._finished = []       # (ChunkInfo, prefetch, rows, seconds)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="chunk-loader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                chunk, prefetch = self._queue.pop(0)
+                self._loading = chunk
+            start = time.perf_counter()
+            try:
+                rows = np.load(chunk.path)
+            except (OSError, ValueError) as e:
+                util.logger.error(f"Could not page in {chunk.path}: {e}")
+                rows = None
+            with self._cond:
+                self._loading = None
+                if rows is not None:
+                    self._finished.append((chunk, prefetch, rows, time.perf_counter() - start))
+                self._cond.notify_all()
+
+    def _plan(self, camera):
+        """
+        Returns (visible, prefetch) chunk indices, each ordered nearest first.
+        """
+        clip_mat = camera.get_project_matrix() @ camera.get_view_matrix()
+        pos = np.asarray(camera.position, dtype=np.float32)
+        dist = np.linalg.norm(np.maximum(np.maximum(self._lo - pos, pos - self._hi), 0), axis=1)
+        near = dist <= self.max_distance if self.max_distance is not None else np.ones(len(dist), dtype=bool)
+        visible = boxes_in_frustum(self._lo, self._hi, clip_mat) & near
+        nearby = boxes_in_frustum(self._lo, self._hi, clip_mat, self.prefetch_margin) & near & ~visible
+        by_dist = np.argsort(dist, kind="stable")
+        return by_dist[visible[by_dist]], by_dist[nearby[by_dist]]
+
+    def _evict(self, chunk_index):
+        obj = self.resident.pop(chunk_index)
+        self.scene.remove(obj)
+        self.resident_bytes -= self.chunks[chunk_index].nbytes
+        self.evictions += 1
+
+    def _integrate(self):
+        with self._cond:
+            finished, self._finished = self._finished, []
+        for chunk, prefetch, rows, seconds in finished:
+            self.resident[chunk.index] = self.scene.add(GaussianData.from_flat(rows), name=f"chunk {chunk.index}")
+            self.resident_bytes += chunk.nbytes
+            self.page_ins += 1
+            self.prefetches += prefetch
+            self.page_in_times.append(seconds)
+        return bool(finished)
+
+    def update(self, camera) -> bool:
+        changed = self._integrate()
+        visible, prefetch = self._plan(camera)
+        wanted = set(visible.tolist()) | set(prefetch.tolist())
+        for i in visible:
+            if i in self.resident:
+                self.hits += 1
+                self.resident.move_to_end(i)
+            else:
+                self.misses += 1
+        for i in prefetch:
+            if i in self.resident:
+                self.resident.move_to_end(i)
+
+        with self._cond:
+            # Chunks read but not integrated yet already hold their memory.
+            in_flight = [f[0] for f in self._finished] + ([self._loading] if self._loading is not None else [])
+            free = self.budget_bytes - self.resident_bytes - sum(c.nbytes for c in in_flight)
+            in_flight = {c.index for c in in_flight}
+            queue = []
+            candidates = [(i, False) for i in visible] + [(i, True) for i in prefetch]
+            for i, is_prefetch in candidates:
+                chunk = self.chunks[i]
+                if i in self.resident or i in in_flight:
+                    continue
+                # Make room from the least recently wanted chunks that are not wanted now.
+                while free < chunk.nbytes:
+                    victim = next((j for j in self.resident if j not in wanted), None)
+                    if victim is None:
+                        break
+                    self._evict(victim)
+                    free += self.chunks[victim].nbytes
+                    changed = True
+                if free < chunk.nbytes:
+                    break
+                free -= chunk.nbytes
+                queue.append((chunk, is_prefetch))
+            self._queue = queue
+            self._cond.notify_all()
+        return changed
+
+    def wait_idle(self, timeout=None):
+        """
+        Blocks until every queued chunk has been read; the next update() adds them
+        to the scene. For offline rendering, where every frame must be complete.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while self._queue or self._loading is not None:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    @property
+    def busy(self) -> bool:
+        """
+        True while chunks are queued or being read, or read but not yet added by update().
+        """
+        with self._cond:
+            return bool(self._queue or self._loading is not None or self._finished)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 1.0
+
+    def stats(self) -> dict:
+        times = np.array(self.page_in_times) * 1000 if self.page_in_times else np.zeros(1)
+        return {
+            "chunks": len(self.chunks),
+            "resident_chunks": len(self.resident),
+            "resident_bytes": self.resident_bytes,
+            "budget_bytes": self.budget_bytes,
+            "hit_rate": self.hit_rate,
+            "page_ins": self.page_ins,
+            "prefetches": self.prefetches,
+            "evictions": self.evictions,
+            "page_in_ms_mean": float(times.mean()),
+            "page_in_ms_max": float(times.max()),
+        }
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._queue = []
+            self._cond.notify_all()
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split a PLY scene into spatial chunks for out-of-core viewing.")
+    parser.add_argument("ply")
+    parser.add_argument("out_dir")
+    parser.add_argument("--chunk-rows", type=int, default=1 << 18, help="target splats per chunk")
+    parser.add_argument("--sh-degree", type=int, choices=range(4), default=None,
+                        help="keep only the SH bands up to this degree")
+    args = parser.parse_args()
+
+    time_start = time.perf_counter()
+    manifest_path = preprocess(args.ply, args.out_dir, args.chunk_rows, args.sh_degree)
+    manifest, chunks = load_manifest(manifest_path)
+    counts = np.array([c.count for c in chunks])
+    util.logger.info(f"Wrote {len(chunks)} chunks of {counts.min()}..{counts.max()} splats "
+                     f"({manifest['total']} total) to {args.out_dir} in {time.perf_counter() - time_start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
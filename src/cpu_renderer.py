@@ -0,0 +1,290 @@
+"""
+Headless CPU reference rasterizer.
+
+Mirrors ui/shaders/gau_vert.glsl and gau_frag.glsl in NumPy: Gaussians are
+projected with the same EWA covariance, colored with the same SH evaluation,
+binned into screen tiles and alpha-blended front to back, which matches the
+back-to-front GL_ONE_MINUS_SRC_ALPHA blend of the OpenGL renderer. Bands of
+tile rows are rasterized on a process pool, so no GL context is needed.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import imageio
+import numpy as np
+import util
+import gaussian_math
+from gaussian_renderer import GaussianRenderBase, sort_gaussians
+
+# Front-to-back compositing stops once every pixel of a tile is this opaque.
+_MIN_TRANSMITTANCE = 1e-4
+# Splats blended per vectorized step inside a tile.
+_BATCH = 128
+
+
+def _project(gaussians, camera, model_mat, scale_modifier, render_mod):
+    """
+    Per-Gaussian screen-space quantities of the vertex shader, for the Gaussians that
+    survive its early culling. Returns (index, center_px, conic, half_wh, opacity, color,
+    depth), with center_px in window coordinates (y up).
+    """
+    view = camera.get_view_matrix().astype(np.float64)
+    proj = camera.get_project_matrix().astype(np.float64)
+    htanx, htany, focal = camera.get_htanfovxy_focal()
+    w, h = camera.w, camera.h
+
+    xyz = np.asarray(gaussians.xyz, dtype=np.float64)
+    pos_model = xyz @ model_mat[:3, :3].T + model_mat[:3, 3]
+    pos_view = pos_model @ view[:3, :3].T + view[:3, 3]
+    clip = pos_view @ proj[:3, :3].T + proj[:3, 3]
+    clip_w = pos_view @ proj[3, :3] + proj[3, 3]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ndc = clip / clip_w[:, None]
+    # Early culling of the shader, plus the near/far clipping GL applies to the quad.
+    keep = np.all(np.abs(ndc) <= 1.3, axis=1) & (np.abs(ndc[:, 2]) <= 1.0)
+    index = np.nonzero(keep)[0]
+    ndc, pos_view = ndc[index], pos_view[index]
+
+    cov3d = gaussian_math.covariance3d(np.asarray(gaussians.scale)[index] * scale_modifier,
+                                       np.asarray(gaussians.rot)[index])
+    # computeCov2D: clamp the mean to 1.3x the frustum before building the Jacobian.
+    tz = pos_view[:, 2]
+    tx = np.clip(pos_view[:, 0] / tz, -1.3 * htanx, 1.3 * htanx) * tz
+    ty = np.clip(pos_view[:, 1] / tz, -1.3 * htany, 1.3 * htany) * tz
+    jac = np.zeros((len(index), 2, 3))
+    jac[:, 0, 0] = focal / tz
+    jac[:, 0, 2] = -(focal * tx) / (tz * tz)
+    jac[:, 1, 1] = focal / tz
+    jac[:, 1, 2] = -(focal * ty) / (tz * tz)
+    t = jac @ (view[:3, :3] @ model_mat[:3, :3])
+    cov = t @ cov3d @ np.swapaxes(t, -1, -2)
+    a, b, c = cov[:, 0, 0] + 0.3, cov[:, 0, 1], cov[:, 1, 1] + 0.3
+    det = a * c - b * b
+    valid = det != 0
+    index, ndc, pos_view = index[valid], ndc[valid], pos_view[valid]
+    a, b, c, det = a[valid], b[valid], c[valid], det[valid]
+    conic = np.stack([c / det, -b / det, a / det], axis=-1)
+    half_wh = 3.0 * np.sqrt(np.stack([a, c], axis=-1))
+    center = (ndc[:, :2] + 1.0) * 0.5 * np.array([w, h])
+
+    opacity = np.asarray(gaussians.opacity)[index, 0].astype(np.float64)
+    depth = -pos_view[:, 2]
+    if render_mod == -1:
+        inv = 1.0 / np.where(depth < 0.05, 1.0, depth)
+        color = np.repeat(inv[:, None], 3, axis=1)
+    else:
+        # View directions in the model's own frame, where its SH are defined.
+        dirs = (pos_model[index] - camera.position) @ np.linalg.inv(model_mat)[:3, :3].T
+        dirs /= np.linalg.norm(dirs, axis=-1, keepdims=True)
+        color = gaussian_math.eval_sh_color(np.asarray(gaussians.sh)[index], dirs, degree=max(render_mod, 0))
+    # Fixed-point color attachments clamp fragment colors before blending.
+    color = np.clip(color, 0.0, 1.0)
+    return index, center, conic, half_wh, opacity, color, depth
+
+
+def _raster_band(task):
+    """
+    Rasterizes the pixel rows [y0, y1) of the image. Splats arrive front to back.
+    """
+    y0, y1, width, tile, render_mod, center, conic, half_wh, opacity, color = task
+    band = np.zeros((y1 - y0, width, 3))
+    if len(center) == 0:
+        return y0, band
+
+    # Bin splats into the tiles their quad overlaps, keeping the depth order per tile.
+    lo = np.floor((center - half_wh - [0, y0]) / tile).astype(np.int64)
+    hi = np.floor((center + half_wh - [0, y0]) / tile).astype(np.int64)
+    tiles_x, tiles_y = -(-width // tile), -(-(y1 - y0) // tile)
+    lo = np.maximum(lo, 0)
+    hi = np.minimum(hi, [tiles_x - 1, tiles_y - 1])
+    span = np.maximum(hi - lo + 1, 0)
+    counts = span[:, 0] * span[:, 1]
+    splat = np.repeat(np.arange(len(center)), counts)
+    local = np.arange(len(splat)) - np.repeat(np.cumsum(counts) - counts, counts)
+    tx = lo[splat, 0] + local % span[splat, 0]
+    ty = lo[splat, 1] + local // span[splat, 0]
+    tile_id = ty * tiles_x + tx
+    order = np.argsort(tile_id, kind="stable")
+    splat, tile_id = splat[order], tile_id[order]
+    bounds = np.searchsorted(tile_id, np.arange(tiles_x * tiles_y + 1))
+
+    offs = np.arange(tile) + 0.5
+    for t in range(tiles_x * tiles_y):
+        ids = splat[bounds[t]:bounds[t + 1]]
+        if len(ids) == 0:
+            continue
+        px0, py0 = (t % tiles_x) * tile, (t // tiles_x) * tile
+        pw, ph = min(tile, width - px0), min(tile, y1 - y0 - py0)
+        px = np.tile(px0 + offs[:pw], ph)
+        py = np.repeat(y0 + py0 + offs[:ph], pw)
+        transmittance = np.ones(pw * ph)
+        accum = np.zeros((pw * ph, 3))
+        for s in range(0, len(ids), _BATCH):
+            b = ids[s:s + _BATCH]
+            dx = px[None, :] - center[b, 0:1]
+            dy = py[None, :] - center[b, 1:2]
+            inside = (np.abs(dx) <= half_wh[b, 0:1]) & (np.abs(dy) <= half_wh[b, 1:2])
+            power = (-0.5 * (conic[b, 0:1] * dx * dx + conic[b, 2:3] * dy * dy)
+                     - conic[b, 1:2] * dx * dy)
+            if render_mod == -2:
+                alpha = inside.astype(np.float64)
+            else:
+                alpha = np.minimum(0.99, opacity[b, None] * np.exp(np.minimum(power, 0.0)))
+                alpha[~inside | (power > 0) | (alpha < 1.0 / 255.0)] = 0.0
+                if render_mod in (-3, -4):
+                    alpha = (alpha > 0.22).astype(np.float64)
+            # Transmittance in front of each splat, then its weighted contribution.
+            before = np.cumprod(np.vstack([transmittance[None, :], 1.0 - alpha[:-1]]), axis=0)
+            weight = before * alpha
+            if render_mod == -4:
+                accum += np.einsum("kp,kpc->pc", weight, color[b][:, None, :] * np.exp(np.minimum(power, 0.0))[..., None])
+            else:
+                accum += weight.T @ color[b]
+            transmittance = before[-1] * (1.0 - alpha[-1])
+            if transmittance.max() < _MIN_TRANSMITTANCE:
+                break
+        band[py0:py0 + ph, px0:px0 + pw] = accum.reshape(ph, pw, 3)
+    return y0, band
+
+
+class CpuRenderer(GaussianRenderBase):
+    """
+    GaussianRenderBase on the CPU. draw() returns the frame as an (H, W, 3) float image,
+    top row first, and keeps it in self.image.
+    """
+    def __init__(self, w, h, world_settings=None, tile_size=16, num_workers=None):
+        super().__init__()
+        self.world_settings = world_settings
+        self.camera = None if world_settings is None else world_settings.world_camera
+        self.w, self.h = w, h
+        self.tile_size = tile_size
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self._pool = None
+        self.order = None
+        self.scale_modifier = 1.0
+        self.render_mod = 3
+        self.model_mat = np.eye(4)
+        self.image = np.zeros((h, w, 3), dtype=np.float32)
+        self.last_draw_time = 0.0
+
+    def set_camera(self, camera):
+        self.camera = camera
+        self.w, self.h = camera.w, camera.h
+
+    def update_gaussian_data(self, gaussianset):
+        self.gaussians = gaussianset
+        self.order = None
+
+    def sort_and_update(self):
+        self.order = sort_gaussians(self.gaussians, self.camera.get_view_matrix() @ self.model_mat)[:, 0]
+
+    def set_scale_modifier(self, modifier):
+        self.scale_modifier = modifier
+
+    def set_render_mode(self, mod: int):
+        self.render_mod = mod
+
+    def update_camera_pose(self):
+        self.order = None
+
+    def update_camera_intrin(self):
+        pass
+
+    def set_model_matrix(self, model_mat):
+        self.model_mat = np.asarray(model_mat, dtype=np.float64)
+
+    def set_render_resolution(self, w, h):
+        self.w, self.h = w, h
+
+    def _map(self, tasks):
+        if self.num_workers <= 1 or len(tasks) <= 1:
+            return list(map(_raster_band, tasks))
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.num_workers)
+        return list(self._pool.map(_raster_band, tasks))
+
+    def draw(self):
+        time_start = time.perf_counter()
+        camera = self.camera
+        w, h = camera.w, camera.h
+        index, center, conic, half_wh, opacity, color, depth = _project(
+            self.gaussians, camera, self.model_mat, self.scale_modifier, self.render_mod)
+
+        # Front to back. The shared sort backends give the far-to-near order the GL path
+        # draws in; without a sort, order by this frame's view depth.
+        if self.order is not None:
+            rank = np.empty(len(self.gaussians), dtype=np.int64)
+            rank[self.order] = np.arange(len(self.order))[::-1]
+            front_to_back = np.argsort(rank[index], kind="stable")
+        else:
+            front_to_back = np.argsort(depth, kind="stable")
+        center, conic, half_wh = center[front_to_back], conic[front_to_back], half_wh[front_to_back]
+        opacity, color = opacity[front_to_back], color[front_to_back]
+
+        # One task per band of tile rows, each with only the splats that reach it.
+        tiles_y = -(-h // self.tile_size)
+        num_bands = min(tiles_y, self.num_workers * 4)
+        rows = np.linspace(0, tiles_y, num_bands + 1).astype(np.int64) * self.tile_size
+        tasks = []
+        for y0, y1 in zip(rows[:-1], np.minimum(rows[1:], h)):
+            sel = (center[:, 1] + half_wh[:, 1] >= y0) & (center[:, 1] - half_wh[:, 1] < y1)
+            tasks.append((int(y0), int(y1), w, self.tile_size, self.render_mod,
+                          center[sel], conic[sel], half_wh[sel], opacity[sel], color[sel]))
+
+        image = np.zeros((h, w, 3))
+        for y0, band in self._map(tasks):
+            image[y0:y0 + len(band)] = band
+        # Bands are in window coordinates (y up); flip to top row first.
+        self.image = image[::-1].astype(np.float32)
+        self.last_draw_time = time.perf_counter() - time_start
+        util.logger.debug(f"CPU raster: {len(index)} splats, {len(tasks)} bands in {self.last_draw_time:.3f} s")
+        return self.image
+
+    def save_image(self, path):
+        imageio.imwrite(path, np.clip(self.image * 255.0 + 0.5, 0, 255).astype(np.uint8))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def render_image(gaussians, camera, path=None, render_mod=3, scale_modifier=1.0, num_workers=None):
+    """
+    Renders one frame of `gaussians` from `camera` and optionally writes it as a PNG.
+    """
+    renderer = CpuRenderer(camera.w, camera.h, num_workers=num_workers)
+    renderer.set_camera(camera)
+    renderer.update_gaussian_data(gaussians)
+    renderer.set_render_mode(render_mod)
+    renderer.set_scale_modifier(scale_modifier)
+    try:
+        image = renderer.draw()
+        if path is not None:
+            renderer.save_image(path)
+    finally:
+        renderer.close()
+    return image
+
+
+if __name__ == "__main__":
+    import argparse
+    from camera import Camera
+    import gaussian_representation
+
+    parser = argparse.ArgumentParser(description="Render a PLY scene on the CPU without a GL context.")
+    parser.add_argument("ply")
+    parser.add_argument("output", help="PNG path")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--position", type=float, nargs=3, default=[0.0, 0.0, 3.0])
+    parser.add_argument("--target", type=float, nargs=3, default=[0.0, 0.0, 0.0])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    camera = Camera(args.height, args.width)
+    camera.position[:] = args.position
+    camera.target[:] = args.target
+    start = time.perf_counter()
+    render_image(gaussian_representation.from_ply(args.ply), camera, args.output, num_workers=args.workers)
+    util.logger.info(f"Wrote {args.output} in {time.perf_counter() - start:.2f} s")
@@ -3,11 +3,11 @@ from camera import Camera
 
 
 def setup(camera: Camera):
-    width = camera.width
-    height = camera.height
+    width = camera.w
+    height = camera.h
     fovy = camera.fovy
-    znear = camera.near
-    zfar = camera.far
+    znear = camera.znear
+    zfar = camera.zfar
 
     view_matrix = camera.get_view_matrix()
     projection_matrix = camera.get_project_matrix()
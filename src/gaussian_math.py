@@ -0,0 +1,108 @@
+"""
+NumPy versions of the per-Gaussian math in ui/shaders/gau_vert.glsl.
+"""
+import numpy as np
+
+SH_C0 = 0.28209479177387814
+SH_C1 = 0.4886025119029199
+SH_C2 = [1.0925484305920792, -1.0925484305920792, 0.31539156525252005, -1.0925484305920792, 0.5462742152960396]
+SH_C3 = [-0.5900435899266435, 2.890611442640554, -0.4570457994644658, 0.3731763325901154,
+         -0.4570457994644658, 1.445305721320277, -0.5900435899266435]
+
+
+def eval_sh_color(sh, dirs, degree=3) -> np.ndarray:
+    """
+    Evaluates the view-dependent color of every Gaussian like the vertex shader does:
+    sh is (N, sh_dim) in the flat() layout, dirs are (N, 3) unit view directions.
+    Returns unclamped (N, 3) colors.
+    """
+    sh = np.asarray(sh, dtype=np.float32)
+    n, sh_dim = sh.shape
+    coef = sh.reshape(n, sh_dim // 3, 3)
+    color = SH_C0 * coef[:, 0]
+    if sh_dim > 3 and degree >= 1:
+        x, y, z = (dirs[:, i:i + 1] for i in range(3))
+        color = color - SH_C1 * y * coef[:, 1] + SH_C1 * z * coef[:, 2] - SH_C1 * x * coef[:, 3]
+        if sh_dim > 12 and degree >= 2:
+            xx, yy, zz = x * x, y * y, z * z
+            xy, yz, xz = x * y, y * z, x * z
+            color = (color +
+                     SH_C2[0] * xy * coef[:, 4] +
+                     SH_C2[1] * yz * coef[:, 5] +
+                     SH_C2[2] * (2.0 * zz - xx - yy) * coef[:, 6] +
+                     SH_C2[3] * xz * coef[:, 7] +
+                     SH_C2[4] * (xx - yy) * coef[:, 8])
+            if sh_dim > 27 and degree >= 3:
+                color = (color +
+                         SH_C3[0] * y * (3.0 * xx - yy) * coef[:, 9] +
+                         SH_C3[1] * xy * z * coef[:, 10] +
+                         SH_C3[2] * y * (4.0 * zz - xx - yy) * coef[:, 11] +
+                         SH_C3[3] * z * (2.0 * zz - 3.0 * xx - 3.0 * yy) * coef[:, 12] +
+                         SH_C3[4] * x * (4.0 * zz - xx - yy) * coef[:, 13] +
+                         SH_C3[5] * z * (xx - yy) * coef[:, 14] +
+                         SH_C3[6] * x * (xx - 3.0 * yy) * coef[:, 15])
+    return color + 0.5
+
+
+def quat_to_rotmat(q) -> np.ndarray:
+    """
+    (N, 4) unit quaternions (r, x, y, z) to (N, 3, 3) rotation matrices.
+    """
+    r, x, y, z = (q[:, i] for i in range(4))
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - r * z), 2 * (x * z + r * y)], axis=-1),
+        np.stack([2 * (x * y + r * z), 1 - 2 * (x * x + z * z), 2 * (y * z - r * x)], axis=-1),
+        np.stack([2 * (x * z - r * y), 2 * (y * z + r * x), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+def rotmat_to_quat(m) -> np.ndarray:
+    """
+    (N, 3, 3) rotation matrices to (N, 4) unit quaternions (r, x, y, z).
+    """
+    m = np.asarray(m, dtype=np.float64)
+    # Solve from the largest of the four squared components for numerical stability.
+    t = np.stack([
+        1 + m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2],
+        1 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2],
+        1 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2],
+        1 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2],
+    ], axis=-1)
+    best = np.argmax(t, axis=-1)
+    s = np.sqrt(np.maximum(t[np.arange(len(m)), best], 1e-12)) * 2
+    q = np.empty((len(m), 4))
+    diffs = np.stack([m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0], m[:, 1, 0] - m[:, 0, 1]], axis=-1)
+    sums = np.stack([m[:, 0, 1] + m[:, 1, 0], m[:, 0, 2] + m[:, 2, 0], m[:, 1, 2] + m[:, 2, 1]], axis=-1)
+    for b in range(4):
+        sel = best == b
+        ss = s[sel]
+        d, sm = diffs[sel], sums[sel]
+        if b == 0:
+            q[sel] = np.stack([ss / 4, d[:, 0] / ss, d[:, 1] / ss, d[:, 2] / ss], axis=-1)
+        elif b == 1:
+            q[sel] = np.stack([d[:, 0] / ss, ss / 4, sm[:, 0] / ss, sm[:, 1] / ss], axis=-1)
+        elif b == 2:
+            q[sel] = np.stack([d[:, 1] / ss, sm[:, 0] / ss, ss / 4, sm[:, 2] / ss], axis=-1)
+        else:
+            q[sel] = np.stack([d[:, 2] / ss, sm[:, 1] / ss, sm[:, 2] / ss, ss / 4], axis=-1)
+    q /= np.linalg.norm(q, axis=-1, keepdims=True)
+    return q.astype(np.float32)
+
+
+def covariance3d(scale, rot) -> np.ndarray:
+    """
+    (N, 3, 3) world-space covariances R S S^T R^T, as computeCov3D in the vertex shader.
+    """
+    m = quat_to_rotmat(rot) * np.asarray(scale)[:, None, :]
+    return m @ np.swapaxes(m, -1, -2)
+
+
+def covariance_to_scale_rot(cov):
+    """
+    Inverse of covariance3d: returns (N, 3) scales and (N, 4) quaternions.
+    """
+    eigval, eigvec = np.linalg.eigh(np.asarray(cov, dtype=np.float64))
+    # eigh may return a reflection; flip one axis to keep a proper rotation.
+    eigvec[np.linalg.det(eigvec) < 0, :, 0] *= -1
+    scale = np.sqrt(np.maximum(eigval, 1e-12)).astype(np.float32)
+    return scale, rotmat_to_quat(eigvec)
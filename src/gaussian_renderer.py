@@ -2,11 +2,21 @@ from OpenGL import GL as gl
 import util
 from camera import Camera
 import gaussian_representation  # This module now provides the new Gaussian and GaussianSet classes.
+import sorting
+from sort_worker import SortWorker
+from sort_scheduler import SortScheduler
+from spatial_index import Octree
+from scene import ScenePoints
+from profiler import profiler
+import os
+import threading
+import weakref
 import numpy as np
 
-# Global buffers used for sorting
+# Device copy of the centers of the last Gaussian set a GPU backend sorted. Keyed on
+# the backend and a weak reference to the set: id() of a freed set gets reused.
 _sort_buffer_xyz = None
-_sort_buffer_gausid = None  # used to tell whether gaussian set is reloaded
+_sort_buffer_key = None  # (backend name, weakref to the set)
 
 try:
     from OpenGL.raw.WGL.EXT.swap_control import wglSwapIntervalEXT
@@ -15,28 +25,37 @@ except:
 
 
 
-def _sort_gaussian_cpu(gaussianset, view_mat):
+def _sort_gaussian_cpu(gaussianset, view_mat, subset=None):
     # Expect gaussianset to have a property 'xyz' (of shape (N,3))
-    xyz = np.asarray(gaussianset.xyz)
-    view_mat = np.asarray(view_mat)
-    xyz_view = view_mat[None, :3, :3] @ xyz[..., None] + view_mat[None, :3, 3, None]
-    depth = xyz_view[:, 2, 0]
+    depth = sorting.view_depth(sorting.subset_xyz(gaussianset, subset), view_mat)
     index = np.argsort(depth)
     index = index.astype(np.int32).reshape(-1, 1)
     return index
 
-def _sort_gaussian_cupy(gaussianset, view_mat):
+# Stateful CPU sorter that reuses the previous order across frames.
+_sort_gaussian_cpu_incremental = sorting.IncrementalSorter()
+
+def _device_xyz(backend, gaussianset, to_device):
+    """
+    Centers of the whole set on the device, uploaded once per set and backend.
+    """
+    global _sort_buffer_xyz, _sort_buffer_key
+    key = _sort_buffer_key
+    if key is None or key[0] != backend or key[1]() is not gaussianset:
+        _sort_buffer_xyz = to_device(np.ascontiguousarray(gaussianset.xyz, dtype=np.float32))
+        _sort_buffer_key = (backend, weakref.ref(gaussianset))
+    return _sort_buffer_xyz
+
+def _sort_gaussian_cupy(gaussianset, view_mat, subset=None):
     import cupy as cp
-    global _sort_buffer_gausid, _sort_buffer_xyz
     
     if gaussianset is None or len(gaussianset) == 0:
         util.get_logger().error("Gaussian data not loaded")
         return
     
-    if _sort_buffer_gausid != id(gaussianset):
-        _sort_buffer_xyz = cp.asarray(gaussianset.xyz)
-        _sort_buffer_gausid = id(gaussianset)
-    xyz = _sort_buffer_xyz
+    xyz = _device_xyz("cupy", gaussianset, cp.asarray)
+    if subset is not None:
+        xyz = xyz[cp.asarray(subset)]
     view_mat = cp.asarray(view_mat)
     xyz_view = view_mat[None, :3, :3] @ xyz[..., None] + view_mat[None, :3, 3, None]
     depth = xyz_view[:, 2, 0]
@@ -45,34 +64,185 @@ def _sort_gaussian_cupy(gaussianset, view_mat):
     index = cp.asnumpy(index)  # convert to numpy
     return index
 
-def _sort_gaussian_torch(gaussianset, view_mat):
+def _sort_gaussian_torch(gaussianset, view_mat, subset=None):
     import torch
-    global _sort_buffer_gausid, _sort_buffer_xyz
-    if _sort_buffer_gausid != id(gaussianset):
-        _sort_buffer_xyz = torch.tensor(gaussianset.xyz).cuda()
-        _sort_buffer_gausid = id(gaussianset)
-    xyz = _sort_buffer_xyz
+    xyz = _device_xyz("torch", gaussianset, lambda a: torch.from_numpy(a).cuda())
+    if subset is not None:
+        xyz = xyz[torch.from_numpy(np.asarray(subset, dtype=np.int64)).to(xyz.device)]
+    view_mat = torch.as_tensor(np.asarray(view_mat, dtype=np.float32), device=xyz.device)
     xyz_view = view_mat[None, :3, :3] @ xyz[..., None] + view_mat[None, :3, 3, None]
     depth = xyz_view[:, 2, 0]
     index = torch.argsort(depth)
     index = index.type(torch.int32).reshape(-1, 1).cpu().numpy()
     return index
 
-# Decide which sorting backend to use.
+_radix_sorter = None
+
+def _sort_gaussian_cpu_radix(gaussianset, view_mat, subset=None):
+    global _radix_sorter
+    if _radix_sorter is None:
+        _radix_sorter = sorting.RadixSorter()
+    return _radix_sorter(gaussianset, view_mat, subset)
+
+SORT_BACKENDS = {
+    "torch": _sort_gaussian_torch,
+    "cupy": _sort_gaussian_cupy,
+    "cpu": _sort_gaussian_cpu,
+    "cpu_incremental": _sort_gaussian_cpu_incremental,
+    "cpu_radix": _sort_gaussian_cpu_radix,
+}
+
+SORT_BACKEND_ENV = "COSMOS_SORT_BACKEND"
+# Tried in order when neither set_sort_backend() nor the environment picks a backend.
+PREFERRED_SORT_BACKENDS = ["torch", "cupy", "cpu_incremental"]
+_FALLBACK_SORT_BACKEND = "cpu_incremental"
+
+# Chosen on first use, see current_sort_backend().
 _sort_gaussian = None
-try:
-    import torch
-    if not torch.cuda.is_available():
-        raise ImportError
-    util.logger.info("Detected torch cuda installed, will use torch as sorting backend")
-    _sort_gaussian = _sort_gaussian_torch
-except ImportError:
-    try:
-        import cupy as cp
-        print("Detected cupy installed, will use cupy as sorting backend")
-        _sort_gaussian = _sort_gaussian_cupy
-    except ImportError:
-        _sort_gaussian = _sort_gaussian_cpu
+sort_backend_name = None
+_probe_results = {}  # backend name -> None when usable, else the reason it is not
+_probe_lock = threading.Lock()
+_select_lock = threading.Lock()
+_probe_thread = None
+
+
+def probe_sort_backend(name: str):
+    """
+    Returns None if a backend can run on this machine, else the reason it cannot.
+    The backend's module is imported on the first call only; results are cached.
+    """
+    if name not in SORT_BACKENDS:
+        return f"unknown backend, expected one of {list(SORT_BACKENDS)}"
+    with _probe_lock:
+        if name not in _probe_results:
+            reason = None
+            try:
+                if name == "torch":
+                    import torch
+                    if not torch.cuda.is_available():
+                        reason = "CUDA is not available"
+                elif name == "cupy":
+                    import cupy
+            except ImportError as e:
+                reason = str(e)
+            _probe_results[name] = reason
+        return _probe_results[name]
+
+
+def available_sort_backends():
+    """
+    The SORT_BACKENDS entries that can run on this machine. Probes every backend.
+    """
+    return [name for name in SORT_BACKENDS if probe_sort_backend(name) is None]
+
+
+def _use_sort_backend(name):
+    global _sort_gaussian, sort_backend_name
+    _sort_gaussian = SORT_BACKENDS[name]
+    sort_backend_name = name
+
+
+def _select_default_backend():
+    """
+    Picks the backend named by $COSMOS_SORT_BACKEND, or the first usable preferred
+    one, unless set_sort_backend() chose one meanwhile.
+    """
+    name = os.environ.get(SORT_BACKEND_ENV)
+    if name:
+        reason = probe_sort_backend(name)
+        if reason is not None:
+            util.logger.warning(f"Ignoring {SORT_BACKEND_ENV}={name}: {reason}")
+            name = None
+    if not name:
+        name = next(n for n in PREFERRED_SORT_BACKENDS if probe_sort_backend(n) is None)
+    with _select_lock:
+        if _sort_gaussian is None:
+            _use_sort_backend(name)
+            util.logger.info(f"Using {name} as sorting backend")
+
+
+def probe_sort_backends_async():
+    """
+    Selects the default backend on a background thread, so importing torch or cupy
+    does not delay the first frame. Sorts use the CPU fallback until it is done.
+    """
+    global _probe_thread
+    if _sort_gaussian is None and _probe_thread is None:
+        _probe_thread = threading.Thread(target=_select_default_backend, name="sort-backend-probe", daemon=True)
+        _probe_thread.start()
+
+
+def current_sort_backend() -> str:
+    """
+    Name of the backend sort_gaussians() uses, selecting the default on first use.
+    """
+    return _sort_function()[0]
+
+
+def _sort_function():
+    if _sort_gaussian is None:
+        if _probe_thread is not None and _probe_thread.is_alive():
+            return _FALLBACK_SORT_BACKEND, SORT_BACKENDS[_FALLBACK_SORT_BACKEND]
+        _select_default_backend()
+    return sort_backend_name, _sort_gaussian
+
+
+# Serializes sorts, since the stateful CPU sorters are shared by the render loop and the sort worker.
+_sort_lock = threading.Lock()
+
+def sort_gaussians(gaussianset, view_mat, subset=None):
+    """
+    Sorts all Gaussians, or only the indices in subset, with the current backend.
+    """
+    _, sort_fn = _sort_function()
+    with _sort_lock:
+        if subset is None:
+            return sort_fn(gaussianset, view_mat)
+        if len(subset) == 0:
+            return np.zeros((0, 1), dtype=np.int32)
+        # The backends gather the subset from the whole set, so their per-set caches stay valid.
+        index = sort_fn(gaussianset, view_mat, subset)
+        return subset[index[:, 0]].astype(np.int32).reshape(-1, 1)
+
+
+def set_sort_backend(name: str):
+    """
+    Selects a sorting backend explicitly instead of the default.
+    """
+    if name not in SORT_BACKENDS:
+        raise ValueError(f"Unknown sort backend '{name}', expected one of {list(SORT_BACKENDS)}")
+    reason = probe_sort_backend(name)
+    if reason is not None:
+        raise ValueError(f"Sort backend '{name}' is not available: {reason}")
+    with _select_lock:
+        _use_sort_backend(name)
+    util.logger.info(f"Using {name} as sorting backend")
+
+
+def list_sort_backends() -> str:
+    """
+    One line per backend with whether it can run here, for --list-backends.
+    """
+    lines = []
+    for name in SORT_BACKENDS:
+        reason = probe_sort_backend(name)
+        status = "available" if reason is None else f"unavailable ({reason})"
+        lines.append(f"{name:<16} {status}")
+    env = os.environ.get(SORT_BACKEND_ENV)
+    lines.append(f"default: {current_sort_backend()}" + (f" (from {SORT_BACKEND_ENV}={env})" if env else ""))
+    return "\n".join(lines)
+
+
+# GPU storage formats understood by OpenGLRenderer, see CompactGaussianData for the compact ones.
+STORAGE_FORMATS = ["float32", "compact8", "compact16", "soa"]
+
+# Shader-storage blocks of the structure-of-arrays layout: GaussianData.soa() key -> (block name, binding)
+_SOA_BLOCKS = {
+    "pos_opacity": ("gaussian_pos_opacity", 4),
+    "rot": ("gaussian_rot", 5),
+    "scale": ("gaussian_scale", 6),
+    "sh": ("gaussian_sh", 7),
+}
 
 
 class GaussianRenderBase:
@@ -124,7 +294,8 @@ class OpenGLRenderer(GaussianRenderBase):
     def __init__(self, w, h, world_settings):
         super().__init__()
         gl.glViewport(0, 0, w, h)
-        self.program = util.load_shaders('./ui/shaders/gau_vert.glsl', './ui/shaders/gau_frag.glsl')
+        self.shader = util.ShaderProgram.from_files('./ui/shaders/gau_vert.glsl', './ui/shaders/gau_frag.glsl')
+        self.program = self.shader.id
 
         # Vertex data for a quad
         self.quad_v = np.array([
@@ -143,7 +314,39 @@ class OpenGLRenderer(GaussianRenderBase):
         util.set_faces_to_vao(vao, self.quad_f)
         self.vao = vao
         self.gau_bufferid = None
-        self.index_bufferid = None
+        self.packed_bufferid = None
+        self.sh_range_bufferid = None
+        self.soa_bufferids = {key: None for key in _SOA_BLOCKS}
+        self.spatial_index = None
+        self.num_instances = 0
+        self.order_buffer = util.StreamingStorageBuffer(self.program, "gaussian_order", bind_idx=1)
+        # camera_block of gau_vert.glsl: view (16), projection (16), hfovxy_focal (4), cam_pos (4)
+        self.camera_data = np.zeros(40, dtype=np.float32)
+        self.camera_ubo = util.UniformBuffer(self.camera_data.nbytes, binding=0)
+
+        # Multi-object scene state, see update_scene().
+        self.scene = None
+        self.scene_capacity = 0    # rows allocated in gau_bufferid / object_bufferid
+        self.scene_uploaded = {}   # object id -> (SceneObject, offset, count) already on the GPU
+        self.scene_sh_dim = None   # SH width of the rows in gau_bufferid
+        self.object_bufferid = None
+        self.transform_bufferid = None
+
+        # Background sorting state.
+        self.sort_worker = None
+        self.order_frame = 0     # frame whose view matrix produced the uploaded order
+        self.sort_latency = 0.0  # seconds, submission to completion of the last async sort
+        self.streaming = False   # self.gaussians is a prefix of the rows in the streaming SSBO
+        self.sort_scheduler = SortScheduler()
+
+        # Render-on-demand state, see draw_cached(). Every call that changes what
+        # draw() would produce sets dirty.
+        self.dirty = True
+        self.frame_fbo = None
+        self.frame_color = None
+        self.frame_size = None
+        self.redraws = 0       # draw_cached() calls that drew the splats
+        self.cached_frames = 0 # draw_cached() calls that reused the last image
         
         # OpenGL settings.
         gl.glEnable(gl.GL_CULL_FACE)
@@ -161,64 +364,367 @@ class OpenGLRenderer(GaussianRenderBase):
         else:
             print("VSync is not supported")
 
+    def _release_buffers(self, *names):
+        for name in names:
+            buffer_id = getattr(self, name)
+            if buffer_id is not None:
+                gl.glDeleteBuffers(1, [buffer_id])
+                setattr(self, name, None)
+
+    def _release_soa_buffers(self):
+        for key, buffer_id in self.soa_bufferids.items():
+            if buffer_id is not None:
+                gl.glDeleteBuffers(1, [buffer_id])
+                self.soa_bufferids[key] = None
+
+    def _leave_scene(self):
+        if self.scene is None:
+            return
+        self._release_buffers("object_bufferid", "transform_bufferid")
+        self.scene = None
+        self.scene_capacity = 0
+        self.scene_uploaded = {}
+        self.shader.set_int("use_object_transforms", 0)
+
     def update_gaussian_data(self, gaussianset):
+        self.dirty = True
+        self._leave_scene()
+        self.shader.set_int("use_object_transforms", 0)
         self.gaussians = gaussianset
-        # Obtain the flattened representation from the GaussianSet.
-        gaussian_data = gaussianset.flat()
-        
-        self.gau_bufferid = util.set_storage_buffer_data(
+        self.streaming = False
+        self.spatial_index = None
+        if self.world_settings.frustum_culling:
+            time_start = util.get_time()
+            self.spatial_index = Octree(gaussianset.xyz, gaussianset.scale)
+            util.logger.info(f"Built spatial index in {util.get_time() - time_start:.2f} s")
+        storage_format = self.world_settings.storage_format
+        if storage_format == "float32":
+            self._release_buffers("packed_bufferid", "sh_range_bufferid")
+            self._release_soa_buffers()
+            # Obtain the flattened representation from the GaussianSet.
+            gaussian_data = gaussianset.flat()
+
+            self.gau_bufferid = util.set_storage_buffer_data(
+                self.program,
+                "gaussian_data",
+                gaussian_data, 
+                bind_idx=0,
+                buffer_id=self.gau_bufferid
+            )
+            self.shader.set_int("data_layout", 0)
+        elif storage_format == "soa":
+            self._release_buffers("gau_bufferid", "packed_bufferid", "sh_range_bufferid")
+            arrays = gaussianset.soa()
+            for key, (block, bind_idx) in _SOA_BLOCKS.items():
+                self.soa_bufferids[key] = util.set_storage_buffer_data(
+                    self.program,
+                    block,
+                    arrays[key],
+                    bind_idx=bind_idx,
+                    buffer_id=self.soa_bufferids[key]
+                )
+            self.shader.set_int("data_layout", 2)
+            self.shader.set_int("sh_stride4", arrays["sh"].shape[-1] // 4)
+        else:
+            self._release_buffers("gau_bufferid")
+            self._release_soa_buffers()
+            sh_bits = 8 if storage_format == "compact8" else 16
+            compact = gaussian_representation.encode_compact(gaussianset, sh_bits=sh_bits)
+            self.packed_bufferid = util.set_storage_buffer_data(
+                self.program,
+                "gaussian_packed",
+                compact.packed,
+                bind_idx=2,
+                buffer_id=self.packed_bufferid
+            )
+            # Keep the range buffer non-empty even when there is nothing to dequantize.
+            sh_ranges = compact.sh_ranges if compact.sh_ranges.size else np.zeros(2, dtype=np.float32)
+            self.sh_range_bufferid = util.set_storage_buffer_data(
+                self.program,
+                "sh_quant_range",
+                sh_ranges,
+                bind_idx=3,
+                buffer_id=self.sh_range_bufferid
+            )
+            self.shader.set_int("data_layout", 1)
+            self.shader.set_int("packed_stride", compact.stride)
+            self.shader.set_int("sh_rest_bits", compact.sh_bits)
+            self.shader.set_int("sh_chunk_size", compact.chunk_size)
+            util.logger.info(f"Compact storage: {compact.nbytes / 2**20:.1f} MiB "
+                             f"({len(gaussianset) * (11 + gaussianset.sh_dim) * 4 / compact.nbytes:.1f}x smaller)")
+        # Use the sh_dim property from GaussianSet.
+        self.shader.set_int("sh_dim", gaussianset.sh_dim)
+
+    def _grow_scene_buffer(self, name, bind_idx, block, row_bytes, rows):
+        """
+        Reallocates a scene buffer to `rows` rows, copying the rows already uploaded
+        on the GPU with glCopyBufferSubData instead of re-uploading them.
+        """
+        old_id = getattr(self, name)
+        new_id = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, new_id)
+        gl.glBufferData(gl.GL_COPY_WRITE_BUFFER, rows * row_bytes, None, gl.GL_STATIC_DRAW)
+        if old_id is not None and self.scene_capacity > 0:
+            gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, old_id)
+            gl.glCopyBufferSubData(gl.GL_COPY_READ_BUFFER, gl.GL_COPY_WRITE_BUFFER, 0, 0,
+                                   self.scene_capacity * row_bytes)
+            gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, 0)
+        gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, 0)
+        if old_id is not None:
+            gl.glDeleteBuffers(1, [old_id])
+        setattr(self, name, new_id)
+        self.shader.bind_storage_block(block, bind_idx)
+        gl.glBindBufferBase(gl.GL_SHADER_STORAGE_BUFFER, bind_idx, new_id)
+
+    def update_scene(self, scene):
+        """
+        Brings the merged GPU buffer in line with a Scene. Only objects added since the
+        last call are uploaded; removed objects simply drop out of the sort, and their
+        rows are reused by later objects. The transforms are re-uploaded whole, they
+        are two matrices per object.
+        """
+        self.dirty = True
+        self.streaming = False
+        if self.scene is not scene or self.scene_sh_dim != scene.sh_dim:
+            # A new scene, or the SH width changed: every row is uploaded again.
+            self._leave_scene()
+            self._release_buffers("gau_bufferid", "packed_bufferid", "sh_range_bufferid")
+            self._release_soa_buffers()
+            self.scene = scene
+        self.spatial_index = None
+        self.scene_sh_dim = scene.sh_dim
+        row_bytes = scene.row_dim * 4 if scene.sh_dim is not None else 0
+
+        if scene.capacity > self.scene_capacity:
+            rows = max(scene.capacity, self.scene_capacity * 3 // 2)
+            self._grow_scene_buffer("gau_bufferid", 0, "gaussian_data", row_bytes, rows)
+            self._grow_scene_buffer("object_bufferid", 8, "gaussian_object", 4, rows)
+            self.scene_capacity = rows
+
+        # Ids are reused after removal, so an upload only counts for the very same object.
+        self.scene_uploaded = {i: u for i, u in self.scene_uploaded.items() if scene.objects.get(i) is u[0]}
+        for obj in scene.objects.values():
+            uploaded = self.scene_uploaded.get(obj.id)
+            if uploaded is not None and uploaded[1:] == (obj.offset, obj.count):
+                continue
+            gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, self.gau_bufferid)
+            rows = np.ascontiguousarray(scene.rows(obj), dtype=np.float32)
+            gl.glBufferSubData(gl.GL_SHADER_STORAGE_BUFFER, obj.offset * row_bytes, rows.nbytes, rows)
+            gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, self.object_bufferid)
+            ids = np.full(obj.count, obj.id, dtype=np.uint32)
+            gl.glBufferSubData(gl.GL_SHADER_STORAGE_BUFFER, obj.offset * 4, ids.nbytes, ids)
+            self.scene_uploaded[obj.id] = (obj, obj.offset, obj.count)
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, 0)
+
+        self.transform_bufferid = util.set_storage_buffer_data(
             self.program,
-            "gaussian_data",
-            gaussian_data, 
-            bind_idx=0,
-            buffer_id=self.gau_bufferid
+            "object_transforms",
+            scene.transforms(),
+            bind_idx=9,
+            buffer_id=self.transform_bufferid
         )
-        # Use the sh_dim property from GaussianSet.
-        util.set_uniform_1int(self.program, gaussianset.sh_dim, "sh_dim")
+        self.shader.set_int("use_object_transforms", 1)
+        self.shader.set_int("data_layout", 0)
+        if scene.sh_dim is not None:
+            self.shader.set_int("sh_dim", scene.sh_dim)
+        self.gaussians = scene.points()
 
-    def sort_and_update(self):
+    def begin_streaming(self, total, sh_dim):
+        """
+        Allocates the float32 SSBO for `total` Gaussians whose rows arrive through upload_rows().
+        """
+        self._leave_scene()
+        self._release_buffers("packed_bufferid", "sh_range_bufferid")
+        self._release_soa_buffers()
+        self.spatial_index = None
+        self.streaming = True
+        if self.gau_bufferid is None:
+            self.gau_bufferid = gl.glGenBuffers(1)
+        self.shader.bind_storage_block("gaussian_data", 0)
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, self.gau_bufferid)
+        gl.glBufferData(gl.GL_SHADER_STORAGE_BUFFER, total * (11 + sh_dim) * 4, None, gl.GL_STATIC_DRAW)
+        gl.glBindBufferBase(gl.GL_SHADER_STORAGE_BUFFER, 0, self.gau_bufferid)
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, 0)
+        self.shader.set_int("data_layout", 0)
+        self.shader.set_int("sh_dim", sh_dim)
+
+    def upload_rows(self, start, rows):
+        """
+        Writes flat() rows into the streaming SSBO starting at Gaussian `start`.
+        """
+        rows = np.ascontiguousarray(rows, dtype=np.float32)
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, self.gau_bufferid)
+        gl.glBufferSubData(gl.GL_SHADER_STORAGE_BUFFER, start * rows.shape[-1] * 4, rows.nbytes, rows)
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, 0)
+
+    def set_streamed_prefix(self, gaussianset):
+        """
+        Switches to a Gaussian set whose rows are already in the streaming SSBO.
+        """
+        self.dirty = True
+        self.gaussians = gaussianset
+
+    def _camera_state(self):
+        """
+        Returns (model-view matrix for sorting, clip matrix, camera position in model
+        space, focal length). Scene objects carry their own transforms and are sorted
+        in world space.
+        """
         camera = self.world_settings.world_camera
+        model_mat = np.eye(4) if self.scene is not None else self.world_settings.model_transform
+        view_mat = camera.get_view_matrix()
+        model_view = view_mat @ model_mat
+        clip_mat = camera.get_project_matrix() @ model_view
+        # Camera position in the Gaussians' own space, for LOD distances.
+        cam_pos = (np.linalg.inv(model_mat) @ np.append(camera.position, 1.0))[:3]
+        focal = camera.get_htanfovxy_focal()[2]
+        return model_view, clip_mat, cam_pos, focal
+
+    def _sort_for_view(self, gaussians, camera_state):
+        view_mat, clip_mat, cam_pos, focal = camera_state
+        if isinstance(gaussians, ScenePoints):
+            return sort_gaussians(gaussians, view_mat)
+        world_settings = self.world_settings
+        subset = None
+        lod = world_settings.lod
+        if world_settings.lod_enabled and lod is not None and gaussians is lod.gaussians:
+            subset = lod.select(cam_pos, focal, world_settings.lod_budget, world_settings.lod_max_error_px)
+        spatial_index = self.spatial_index
+        if spatial_index is not None and gaussians is self.gaussians:
+            visible = spatial_index.query(clip_mat)
+            if subset is None:
+                subset = visible
+            else:
+                mask = np.zeros(len(gaussians), dtype=bool)
+                mask[visible] = True
+                subset = subset[mask[subset]]
+        return sort_gaussians(gaussians, view_mat, subset)
+
+    def sort_due(self):
+        """
+        Asks the sort scheduler whether the current view needs a new order.
+        """
+        model_view, _, cam_pos, _ = self._camera_state()
+        return self.sort_scheduler.should_sort(self.gaussians, model_view, cam_pos)
+
+    def sort_and_update(self):
         time_start = util.get_time()
-        index = _sort_gaussian(self.gaussians, camera.get_view_matrix())
+        camera_state = self._camera_state()
+        self.sort_scheduler.sort_requested(self.gaussians, camera_state[0], camera_state[2])
+        with profiler.scope("sort"):
+            index = self._sort_for_view(self.gaussians, camera_state)
         time_end = util.get_time()
         util.logger.debug(f"Sorting time: {time_end - time_start:.3f} s")
-        self.index_bufferid = util.set_storage_buffer_data(
-            self.program,
-            "gaussian_order",
-            index, 
-            bind_idx=1,
-            buffer_id=self.index_bufferid
-        )
+        self.update_order(index)
+        self.order_frame = self.world_settings.frame_index
+        self.sort_scheduler.sort_cost = util.get_time() - time_start
+
+    def request_sort_async(self):
+        """
+        Queues a sort for the current view on the background worker.
+        """
+        if self.sort_worker is None:
+            self.sort_worker = SortWorker(self._sort_for_view)
+        camera_state = self._camera_state()
+        self.sort_scheduler.sort_requested(self.gaussians, camera_state[0], camera_state[2])
+        self.sort_worker.submit(self.gaussians, camera_state, self.world_settings.frame_index)
+
+    def poll_sort_async(self):
+        """
+        Uploads the newest finished background sort, if any. Until then the
+        previous order keeps being drawn.
+        """
+        if self.sort_worker is None:
+            return
+        result = self.sort_worker.poll()
+        # Drop orders computed for a Gaussian set that has been replaced meanwhile.
+        if result is None or not self._order_applies(result):
+            return
+        self.update_order(result.index, result.gaussians)
+        self.order_frame = result.frame
+        self.sort_latency = result.latency
+        # The sort itself ran off the render thread; only the upload costs frame time.
+        self.sort_scheduler.sort_cost = self.order_buffer.last_upload_time
+
+    def _order_applies(self, result):
+        """
+        Whether a background sort can be drawn now. Besides orders of the current
+        set, newer orders of an earlier state of the same data are taken, so a set
+        that changes faster than it sorts is not left with a stale order:
+          - while a file streams in, an order of an earlier prefix of the same
+            buffer only indexes rows that are already uploaded,
+          - an order of an earlier state of the same scene is drawn for the
+            objects still in it, update_order() drops the removed ones.
+        """
+        gaussians = result.gaussians
+        if gaussians is self.gaussians:
+            return True
+        if result.frame <= self.order_frame:
+            return False
+        if isinstance(gaussians, ScenePoints):
+            return self.scene is not None and gaussians.scene is self.scene
+        if not self.streaming:
+            return False
+        prefix, current = getattr(gaussians, "_flat", None), getattr(self.gaussians, "_flat", None)
+        return (prefix is not None and current is not None and len(prefix) <= len(current)
+                and np.may_share_memory(prefix, current))
+
+    def update_order(self, index, gaussians=None):
+        """
+        Uploads a back-to-front order of the rows of `gaussians`, self.gaussians by
+        default. Scene points are mapped to their slots in the merged buffer here.
+        """
+        self.dirty = True
+        gaussians = self.gaussians if gaussians is None else gaussians
+        if isinstance(gaussians, ScenePoints) and gaussians is not self.gaussians:
+            # An order of an earlier scene state: skip objects removed since, their rows may be reused.
+            index = index[gaussians.live()[index[:, 0]]]
+        self.sort_scheduler.order_uploaded(gaussians.xyz, index)
+        if isinstance(gaussians, ScenePoints):
+            index = gaussians.slots[index[:, 0]].reshape(-1, 1)
+        with profiler.scope("ssbo_upload"):
+            self.order_buffer.upload(index)
+        self.num_instances = len(index)
+        util.logger.debug(f"Order upload: {self.order_buffer.last_upload_bytes / 2**20:.1f} MiB "
+                          f"in {self.order_buffer.last_upload_time * 1000:.2f} ms")
         
     def set_scale_modifier(self, modifier):
-        util.set_uniform_1f(self.program, modifier, "scale_modifier")
+        self.dirty = True
+        self.shader.set_float("scale_modifier", modifier)
 
     def set_render_mode(self, mod: int):
-        util.set_uniform_1int(self.program, mod, "render_mod")
+        self.dirty = True
+        self.shader.set_int("render_mod", mod)
 
     def set_render_resolution(self, w, h):
+        self.dirty = True
         gl.glViewport(0, 0, w, h)
 
     def update_camera_pose(self):
         # Retrieve the camera solely through the world_settings object.
+        self.dirty = True
         camera = self.world_settings.world_camera
-        view_mat = camera.get_view_matrix()
-        util.set_uniform_mat4(self.program, view_mat, "view_matrix")
-        util.set_uniform_v3(self.program, camera.position, "cam_pos")
+        self.camera_data[0:16] = camera.get_view_matrix().ravel()
+        self.camera_data[36:39] = camera.position
+        self.camera_ubo.upload(self.camera_data)
 
     def update_camera_intrin(self):
+        self.dirty = True
         camera = self.world_settings.world_camera
-        proj_mat = camera.get_project_matrix()
-        util.set_uniform_mat4(self.program, proj_mat, "projection_matrix")
-        util.set_uniform_v3(self.program, camera.get_htanfovxy_focal(), "hfovxy_focal")
+        self.camera_data[16:32] = camera.get_project_matrix().ravel()
+        self.camera_data[32:35] = camera.get_htanfovxy_focal()
+        self.camera_ubo.upload(self.camera_data)
 
     def set_model_matrix(self, model_mat):
-        util.set_uniform_mat4(self.program, model_mat, "model_matrix")
+        self.dirty = True
+        self.shader.set_mat4("model_matrix", model_mat)
+        self.shader.set_mat4("inv_model_matrix", np.linalg.inv(model_mat))
 
     def draw(self):
-        gl.glUseProgram(self.program)
+        self.shader.use()
+        gl.glBindBufferBase(gl.GL_UNIFORM_BUFFER, self.camera_ubo.binding, self.camera_ubo.buffer)
         gl.glBindVertexArray(self.vao)
-        num_gau = len(self.gaussians)
+        num_gau = self.num_instances
         gl.glDrawElementsInstanced(
             gl.GL_TRIANGLES,
             len(self.quad_f.reshape(-1)),
@@ -226,3 +732,48 @@ class OpenGLRenderer(GaussianRenderBase):
             None,
             num_gau
         )
+        self.order_buffer.fence()
+        self.dirty = False
+
+    def _resize_frame_target(self, w, h):
+        if self.frame_fbo is None:
+            self.frame_fbo = gl.glGenFramebuffers(1)
+            self.frame_color = gl.glGenRenderbuffers(1)
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self.frame_color)
+        gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, gl.GL_RGBA8, w, h)
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, 0)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.frame_fbo)
+        gl.glFramebufferRenderbuffer(gl.GL_FRAMEBUFFER, gl.GL_COLOR_ATTACHMENT0, gl.GL_RENDERBUFFER, self.frame_color)
+        self.frame_size = (w, h)
+        self.dirty = True
+
+    def draw_cached(self, w, h, target=0):
+        """
+        Draws the splats into an offscreen framebuffer only when something made the
+        last image stale, then copies that image into `target`. Frames where only
+        the UI changes cost a blit instead of a draw of every instance.
+        """
+        if self.frame_size != (w, h):
+            self._resize_frame_target(w, h)
+        if self.dirty:
+            gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.frame_fbo)
+            gl.glClearColor(0, 0, 0, 1.0)
+            gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+            self.draw()
+            self.redraws += 1
+        else:
+            self.cached_frames += 1
+        gl.glBindFramebuffer(gl.GL_READ_FRAMEBUFFER, self.frame_fbo)
+        gl.glBindFramebuffer(gl.GL_DRAW_FRAMEBUFFER, target)
+        gl.glBlitFramebuffer(0, 0, w, h, 0, 0, w, h, gl.GL_COLOR_BUFFER_BIT, gl.GL_NEAREST)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, target)
+
+    def release_frame_target(self):
+        """
+        Frees the offscreen framebuffer of draw_cached(), for when render-on-demand is turned off.
+        """
+        if self.frame_fbo is None:
+            return
+        gl.glDeleteFramebuffers(1, [self.frame_fbo])
+        gl.glDeleteRenderbuffers(1, [self.frame_color])
+        self.frame_fbo = self.frame_color = self.frame_size = None
@@ -1,6 +1,14 @@
 import numpy as np
 from plyfile import PlyData
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from numpy.lib.recfunctions import structured_to_unstructured
+
+_PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
 
 @dataclass
 class GaussianData:
@@ -9,15 +17,54 @@ class GaussianData:
     scale: np.ndarray    # shape: (N, 3)
     opacity: np.ndarray  # shape: (N, 1)
     sh: np.ndarray       # shape: (N, sh_dim)
+    # Backing buffer when the fields are views into an existing flat() layout.
+    _flat: np.ndarray = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_flat(cls, flat: np.ndarray) -> "GaussianData":
+        """
+        Wraps an (N x total_dims) array in the flat() layout without copying it.
+        The fields are views into it and flat() returns it as is.
+        """
+        ret = cls(flat[:, 0:3], flat[:, 3:7], flat[:, 7:10], flat[:, 10:11], flat[:, 11:])
+        ret._flat = flat
+        return ret
 
     def flat(self) -> np.ndarray:
         """
         Returns a contiguous 2D array (N x total_dims) where each row is the concatenation of:
           [xyz, rot, scale, opacity, sh]
         """
+        if self._flat is not None:
+            return self._flat
         ret = np.concatenate([self.xyz, self.rot, self.scale, self.opacity, self.sh], axis=-1)
         return np.ascontiguousarray(ret)
     
+    def soa(self) -> dict:
+        """
+        Returns one vec4-aligned array per shader-storage block of the structure-of-arrays
+        layout: {"pos_opacity", "rot", "scale", "sh"}. Rotations, and SH when sh_dim is a
+        multiple of 4, are passed through without a copy if already contiguous float32;
+        only the vec3 attributes are padded.
+        """
+        n = len(self)
+        pos_opacity = np.empty((n, 4), dtype=np.float32)
+        pos_opacity[:, :3] = self.xyz
+        pos_opacity[:, 3] = self.opacity[:, 0]
+        scale = np.zeros((n, 4), dtype=np.float32)
+        scale[:, :3] = self.scale
+        if self.sh_dim % 4 == 0:
+            sh = np.ascontiguousarray(self.sh, dtype=np.float32)
+        else:
+            sh = np.zeros((n, -(-self.sh_dim // 4) * 4), dtype=np.float32)
+            sh[:, :self.sh_dim] = self.sh
+        return {
+            "pos_opacity": pos_opacity,
+            "rot": np.ascontiguousarray(self.rot, dtype=np.float32),
+            "scale": scale,
+            "sh": sh,
+        }
+
     def __len__(self) -> int:
         return len(self.xyz)
     
@@ -25,6 +72,156 @@ class GaussianData:
     def sh_dim(self) -> int:
         return self.sh.shape[-1]
 
+    @property
+    def sh_degree(self) -> int:
+        return sh_degree_for_dim(self.sh_dim)
+
+    def reordered(self, order) -> "GaussianData":
+        """
+        The Gaussians permuted by `order`, every attribute the same way. A set backed
+        by a flat() buffer gets a new one, gathered row by row.
+        """
+        if self._flat is not None:
+            return GaussianData.from_flat(self._flat[order])
+        return GaussianData(self.xyz[order], self.rot[order], self.scale[order], self.opacity[order], self.sh[order])
+
+    def with_sh_degree(self, degree: int) -> "GaussianData":
+        """
+        The same Gaussians with the SH bands above `degree` dropped, or self when there
+        is nothing to drop. A set backed by a flat() buffer gets a new, narrower one.
+        """
+        sh_dim = sh_dim_for_degree(degree)
+        if sh_dim >= self.sh_dim:
+            return self
+        if self._flat is not None:
+            return GaussianData.from_flat(np.ascontiguousarray(self._flat[:, :11 + sh_dim]))
+        return GaussianData(self.xyz, self.rot, self.scale, self.opacity, self.sh[:, :sh_dim])
+
+
+def sh_dim_for_degree(degree: int) -> int:
+    """
+    Number of SH floats (3 channels per coefficient) up to and including band `degree`.
+    """
+    return 3 * (degree + 1) ** 2
+
+
+def sh_degree_for_dim(sh_dim: int) -> int:
+    return int(round((sh_dim / 3) ** 0.5)) - 1
+
+
+@dataclass
+class CompactGaussianData:
+    """
+    Packed GPU layout, one row of uint32 words per Gaussian:
+      [0:3]  xyz as float32 bits
+      [3]    rotation as 4 x snorm8
+      [4]    scale.x | scale.y as half floats
+      [5]    scale.z as half | opacity as unorm8 in bits 16..23
+      [6]    SH DC r | g as half floats
+      [7]    SH DC b as half
+      [8:]   SH rest, either 8-bit codes quantized per chunk of Gaussians
+             against sh_ranges, or half floats
+    """
+    packed: np.ndarray     # shape: (N, stride) uint32
+    sh_ranges: np.ndarray  # shape: (num_chunks, sh_dim - 3, 2) float32 min/max, empty for 16-bit SH
+    sh_dim: int
+    sh_bits: int
+    chunk_size: int
+
+    def __len__(self) -> int:
+        return len(self.packed)
+
+    @property
+    def stride(self) -> int:
+        return self.packed.shape[-1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.packed.nbytes + self.sh_ranges.nbytes
+
+
+def _half_bits(a) -> np.ndarray:
+    a = np.clip(a, -65504, 65504).astype(np.float16)
+    return a.view(np.uint16).astype(np.uint32)
+
+
+def _from_half_bits(a) -> np.ndarray:
+    return (a & 0xFFFF).astype(np.uint16).view(np.float16).astype(np.float32)
+
+
+def encode_compact(gaussians: GaussianData, sh_bits=8, chunk_size=256) -> CompactGaussianData:
+    """
+    Packs activated Gaussians into the CompactGaussianData layout decoded by gau_vert.glsl.
+    """
+    assert sh_bits in (8, 16), "SH rest coefficients are stored in 8 or 16 bits"
+    n = len(gaussians)
+    n_rest = gaussians.sh_dim - 3
+    per_word = 32 // sh_bits
+    rest_words = -(-n_rest // per_word)
+    packed = np.zeros((n, 8 + rest_words), dtype=np.uint32)
+
+    packed[:, 0:3] = np.ascontiguousarray(gaussians.xyz, dtype=np.float32).view(np.uint32)
+    rot = np.clip(np.round(gaussians.rot * 127), -127, 127).astype(np.int8)
+    packed[:, 3] = np.ascontiguousarray(rot).view(np.uint32)[:, 0]
+    scale = gaussians.scale
+    opacity = np.round(np.clip(gaussians.opacity[:, 0], 0, 1) * 255).astype(np.uint32)
+    packed[:, 4] = _half_bits(scale[:, 0]) | _half_bits(scale[:, 1]) << 16
+    packed[:, 5] = _half_bits(scale[:, 2]) | opacity << 16
+    dc = gaussians.sh[:, :3]
+    packed[:, 6] = _half_bits(dc[:, 0]) | _half_bits(dc[:, 1]) << 16
+    packed[:, 7] = _half_bits(dc[:, 2])
+
+    rest = gaussians.sh[:, 3:]
+    sh_ranges = np.zeros((0, n_rest, 2), dtype=np.float32)
+    if n_rest == 0:
+        pass
+    elif sh_bits == 8:
+        starts = np.arange(0, n, chunk_size)
+        lo = np.minimum.reduceat(rest, starts, axis=0)
+        hi = np.maximum.reduceat(rest, starts, axis=0)
+        span = hi - lo
+        inv = np.divide(255, span, out=np.zeros_like(span), where=span > 0)
+        chunk_id = np.arange(n) // chunk_size
+        codes = np.zeros((n, rest_words * 4), dtype=np.uint8)
+        codes[:, :n_rest] = np.round((rest - lo[chunk_id]) * inv[chunk_id])
+        packed[:, 8:] = codes.view("<u4")
+        sh_ranges = np.stack([lo, hi], axis=-1).astype(np.float32)
+    else:
+        halves = np.zeros((n, rest_words * 2), dtype=np.uint16)
+        halves[:, :n_rest] = np.clip(rest, -65504, 65504).astype(np.float16).view(np.uint16)
+        packed[:, 8:] = halves.view("<u4")
+
+    return CompactGaussianData(packed, sh_ranges, gaussians.sh_dim, sh_bits, chunk_size)
+
+
+def decode_compact(compact: CompactGaussianData) -> GaussianData:
+    """
+    CPU mirror of the shader-side decode, used to measure the quantization error.
+    """
+    packed = compact.packed
+    n = len(compact)
+    n_rest = compact.sh_dim - 3
+    xyz = packed[:, 0:3].copy().view(np.float32)
+    rot = np.clip(packed[:, 3:4].copy().view(np.int8).astype(np.float32) / 127, -1, 1)
+    scale = np.stack([_from_half_bits(packed[:, 4]), _from_half_bits(packed[:, 4] >> 16),
+                      _from_half_bits(packed[:, 5])], axis=-1)
+    opacity = (((packed[:, 5] >> 16) & 0xFF).astype(np.float32) / 255)[:, None]
+    dc = np.stack([_from_half_bits(packed[:, 6]), _from_half_bits(packed[:, 6] >> 16),
+                   _from_half_bits(packed[:, 7])], axis=-1)
+    rest_words = np.ascontiguousarray(packed[:, 8:])
+    if n_rest == 0:
+        rest = np.zeros((n, 0), dtype=np.float32)
+    elif compact.sh_bits == 8:
+        codes = rest_words.view(np.uint8)[:, :n_rest].astype(np.float32)
+        chunk_id = np.arange(n) // compact.chunk_size
+        lo = compact.sh_ranges[chunk_id, :, 0]
+        hi = compact.sh_ranges[chunk_id, :, 1]
+        rest = lo + codes / 255 * (hi - lo)
+    else:
+        rest = rest_words.view(np.float16)[:, :n_rest].astype(np.float32)
+    sh = np.concatenate([dc, rest], axis=-1)
+    return GaussianData(xyz, rot, scale, opacity, sh)
+
 
 def naive_gaussian():
     """
@@ -67,12 +264,193 @@ def naive_gaussian():
     return GaussianData(gau_xyz, gau_rot, gau_scale, gau_opacity, gau_sh)
 
 
-def from_ply(path: str) -> GaussianData:
+@dataclass
+class PlyHeader:
+    format: str          # "ascii", "binary_little_endian" or "binary_big_endian"
+    elements: list       # [(name, count, [(prop_name, prop_type)])], list properties have type "list"
+    data_offset: int     # byte offset of the first element's data
+
+
+def read_ply_header(path: str) -> PlyHeader:
+    """
+    Parses the text header of a PLY file without touching the element data.
+    """
+    fmt = None
+    elements = []
+    with open(path, "rb") as f:
+        if f.readline().strip() != b"ply":
+            raise ValueError(f"{path} is not a PLY file")
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"{path}: unexpected end of PLY header")
+            tokens = line.decode("ascii", errors="replace").split()
+            if not tokens or tokens[0] in ("comment", "obj_info"):
+                continue
+            if tokens[0] == "end_header":
+                break
+            if tokens[0] == "format":
+                fmt = tokens[1]
+            elif tokens[0] == "element":
+                elements.append((tokens[1], int(tokens[2]), []))
+            elif tokens[0] == "property":
+                if tokens[1] == "list":
+                    elements[-1][2].append((tokens[-1], "list"))
+                else:
+                    elements[-1][2].append((tokens[2], tokens[1]))
+        data_offset = f.tell()
+    return PlyHeader(fmt, elements, data_offset)
+
+
+def map_ply_vertices(path: str):
+    """
+    Memory-maps the vertex element of a binary PLY file as a structured array.
+    Returns None for ASCII files, which cannot be mapped.
+    """
+    header = read_ply_header(path)
+    if header.format == "ascii":
+        return None
+    endian = "<" if header.format == "binary_little_endian" else ">"
+    offset = header.data_offset
+    for name, count, props in header.elements:
+        if any(t == "list" for _, t in props):
+            raise ValueError(f"{path}: cannot map element '{name}' with list properties")
+        dtype = np.dtype([(p, endian + _PLY_TYPES[t]) for p, t in props])
+        if name == "vertex":
+            return np.asarray(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,)))
+        offset += dtype.itemsize * count
+    raise ValueError(f"{path}: no vertex element")
+
+
+def _sorted_props(names, prefix):
+    props = [n for n in names if n.startswith(prefix)]
+    return sorted(props, key=lambda x: int(x.split('_')[-1]))
+
+
+def _rest_coeffs(num_rest, max_sh_degree=None):
+    """
+    Returns (rest coefficients per channel in the file, rest coefficients to keep)
+    for a file with `num_rest` f_rest_* properties. Any SH degree is accepted.
+    """
+    n_coeffs = num_rest // 3
+    if num_rest % 3 or sh_dim_for_degree(sh_degree_for_dim(num_rest + 3)) != num_rest + 3:
+        raise ValueError(f"Unexpected number of extra features: {num_rest}")
+    if max_sh_degree is None:
+        return n_coeffs, n_coeffs
+    return n_coeffs, min(n_coeffs, (max_sh_degree + 1) ** 2 - 1)
+
+
+def _ply_columns(names, max_sh_degree=None):
+    """
+    Maps every GaussianData group to the PLY property names it is gathered from,
+    in output order. The SH rest coefficients are stored channel-major in the file
+    and are reordered to coefficient-major here, so no transpose is needed later.
+    Bands above max_sh_degree are never read.
+    """
+    rest = _sorted_props(names, "f_rest_")
+    n_coeffs, keep = _rest_coeffs(len(rest), max_sh_degree)
+    rest = [rest[c * n_coeffs + k] for k in range(keep) for c in range(3)]
+    return {
+        "xyz": ["x", "y", "z"],
+        "rot": _sorted_props(names, "rot"),
+        "scale": _sorted_props(names, "scale_"),
+        "opacity": ["opacity"],
+        "sh": ["f_dc_0", "f_dc_1", "f_dc_2"] + rest,
+    }
+
+
+def _gather(vertices, names, out=None, block=1 << 16) -> np.ndarray:
+    """
+    Gathers the given properties of a structured vertex array into a contiguous
+    (N, len(names)) float32 array. Homogeneous float records (the usual 3DGS layout)
+    are viewed as a 2D matrix and gathered with one vectorized take per block of rows;
+    blocking keeps the aligned temporary small when the header length leaves the
+    mapped data misaligned.
+    """
+    dtype = vertices.dtype
+    first = dtype[0]
+    packed = all(dtype[n] == first for n in dtype.names) and dtype.itemsize == first.itemsize * len(dtype.names)
+    if out is None:
+        out = np.empty((len(vertices), len(names)), dtype=np.float32)
+    if not (packed and first.kind == "f"):
+        out[...] = structured_to_unstructured(vertices[names], dtype=np.float32)
+        return out
+    raw = vertices.view(first).reshape(len(vertices), len(dtype.names))
+    cols = [dtype.names.index(n) for n in names]
+    for start in range(0, len(vertices), block):
+        out[start:start + block] = np.take(raw[start:start + block], cols, axis=1)
+    return out
+
+
+def _activate(rot, scale, opacity):
+    """
+    Applies the activations in place: normalize rotations, exp scales, sigmoid opacities.
+    """
+    rot /= np.linalg.norm(rot, axis=-1, keepdims=True)
+    np.exp(scale, out=scale)
+    np.negative(opacity, out=opacity)
+    np.exp(opacity, out=opacity)
+    opacity += 1
+    np.reciprocal(opacity, out=opacity)
+
+
+def from_ply(path: str, max_sh_degree=None) -> GaussianData:
     """
     Loads Gaussians from a PLY file and returns a GaussianData instance.
-    This implementation follows the reference structure.
+    Binary files are memory-mapped and each attribute group is gathered in one pass;
+    ASCII files fall back to plyfile. With max_sh_degree, higher SH bands are skipped.
+    """
+    vertices = map_ply_vertices(path)
+    if vertices is None:
+        return _from_ply_plyfile(path, max_sh_degree)
+    columns = _ply_columns(vertices.dtype.names, max_sh_degree)
+    xyz, rot, scale, opacity, sh = (_gather(vertices, columns[k]) for k in ("xyz", "rot", "scale", "opacity", "sh"))
+    _activate(rot, scale, opacity)
+    return GaussianData(xyz, rot, scale, opacity, sh)
+
+
+class PlyFlatReader:
+    """
+    Reads row ranges of a binary PLY file as activated rows of the
+    GaussianData.flat() layout.
+    """
+    def __init__(self, path: str, max_sh_degree=None):
+        self.vertices = map_ply_vertices(path)
+        if self.vertices is None:
+            raise ValueError(f"{path}: ASCII PLY files cannot be read in row ranges")
+        columns = _ply_columns(self.vertices.dtype.names, max_sh_degree)
+        self.columns = sum((columns[k] for k in ("xyz", "rot", "scale", "opacity", "sh")), [])
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def total_dim(self) -> int:
+        return len(self.columns)
+
+    def read(self, start: int, stop: int, out=None) -> np.ndarray:
+        flat = _gather(self.vertices[start:stop], self.columns, out=out)
+        _activate(flat[:, 3:7], flat[:, 7:10], flat[:, 10:11])
+        return flat
+
+
+def from_ply_flat(path: str, max_sh_degree=None) -> np.ndarray:
+    """
+    Loads a PLY file straight into the GaussianData.flat() layout, skipping the
+    per-group arrays and the concatenation copy.
+    """
+    try:
+        reader = PlyFlatReader(path, max_sh_degree)
+    except ValueError:
+        return _from_ply_plyfile(path, max_sh_degree).flat()
+    return reader.read(0, len(reader))
+
+
+def _from_ply_plyfile(path: str, max_sh_degree=None) -> GaussianData:
+    """
+    Loads Gaussians from a PLY file through plyfile, one property at a time.
+    Kept for ASCII files and as the reference path in benchmarks.
     """
-    max_sh_degree = 3
     plydata = PlyData.read(path)
     
     # Load positions.
@@ -95,13 +473,13 @@ def from_ply(path: str) -> GaussianData:
     # Load extra SH features.
     extra_f_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("f_rest_")]
     extra_f_names = sorted(extra_f_names, key=lambda x: int(x.split('_')[-1]))
-    assert len(extra_f_names) == 3 * (max_sh_degree + 1) ** 2 - 3, "Unexpected number of extra features"
+    n_coeffs, keep = _rest_coeffs(len(extra_f_names), max_sh_degree)
     features_extra = np.zeros((xyz.shape[0], len(extra_f_names)), dtype=np.float32)
     for idx, attr_name in enumerate(extra_f_names):
         features_extra[:, idx] = np.asarray(plydata.elements[0][attr_name])
     # Reshape and transpose to form proper SH coefficients (excluding DC).
-    features_extra = features_extra.reshape((features_extra.shape[0], 3, (max_sh_degree + 1) ** 2 - 1))
-    features_extra = np.transpose(features_extra, [0, 2, 1])
+    features_extra = features_extra.reshape((features_extra.shape[0], 3, n_coeffs))
+    features_extra = np.transpose(features_extra, [0, 2, 1])[:, :keep]
     
     # Load scales.
     scale_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("scale_")]
@@ -130,6 +508,37 @@ def from_ply(path: str) -> GaussianData:
     return GaussianData(xyz, rots, scales, opacities, sh)
 
 
+def save_ply(path: str, gaussians: GaussianData, chunk: int = 1 << 20):
+    """
+    Writes Gaussians as a binary 3DGS PLY that from_ply() reads back: activations are
+    inverted and the SH rest coefficients go back to channel-major order.
+    Rows are written in chunks so the inverse activations never copy the whole set.
+    """
+    n = len(gaussians)
+    n_coeffs = gaussians.sh_dim // 3 - 1
+    names = ["x", "y", "z", "nx", "ny", "nz", "f_dc_0", "f_dc_1", "f_dc_2"]
+    names += [f"f_rest_{i}" for i in range(3 * n_coeffs)]
+    names += ["opacity", "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"]
+    header = ["ply", "format binary_little_endian 1.0", f"element vertex {n}"]
+    header += [f"property float {name}" for name in names]
+    header += ["end_header"]
+
+    with open(path, "wb") as f:
+        f.write(("\n".join(header) + "\n").encode("ascii"))
+        for start in range(0, n, chunk):
+            stop = min(n, start + chunk)
+            rows = np.zeros((stop - start, len(names)), dtype="<f4")
+            rows[:, 0:3] = gaussians.xyz[start:stop]
+            sh = np.asarray(gaussians.sh[start:stop]).reshape(-1, n_coeffs + 1, 3)
+            rows[:, 6:9] = sh[:, 0]
+            rows[:, 9:9 + 3 * n_coeffs] = sh[:, 1:].transpose(0, 2, 1).reshape(len(rows), -1)
+            opacity = np.clip(gaussians.opacity[start:stop, 0], 1e-7, 1 - 1e-7)
+            rows[:, -8] = np.log(opacity / (1 - opacity))
+            rows[:, -7:-4] = np.log(np.maximum(gaussians.scale[start:stop], 1e-30))
+            rows[:, -4:] = gaussians.rot[start:stop]
+            f.write(rows.tobytes())
+
+
 # --- Testing the implementation ---
 if __name__ == "__main__":
     # Test naive gaussians.
@@ -1,24 +1,134 @@
 import imgui
-import tkinter as tk
-from tkinter import filedialog
+import numpy as np
+import gaussian_renderer
+from profiler import profiler
 
 world_settings = None
+sh_degrees = ["0 (DC only)", "1", "2", "3 (all)"]
+load_sh_degrees = ["all"] + sh_degrees[:3]
 type_visualization = ["Gaussian Ball", "Flat Ball", "Billboard", "Depth", "SH:0", "SH:0~1", "SH:0~2", "SH:0~3 (default)"]
 show_cam_window = False
 show_param_window = True
-def open_file_dialog():
+show_profiler_window = False
+def open_file_dialog(title="Choose a scene file", filetypes=(("Scenes", "*.ply *.splat *.spz"), ("PLY Files", "*.ply"))):
+    # tkinter is only needed for the dialogs, so it is imported on first use.
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.withdraw()  # Hide the root window to avoid it appearing
-    file_path = filedialog.askopenfilename(title="Choose a PLY file", filetypes=[("PLY Files", "*.ply")])
+    file_path = filedialog.askopenfilename(title=title, filetypes=list(filetypes))
     root.quit()
     root.destroy()  
     return file_path
 
+def save_file_dialog(title, extension, filetypes=None):
+    import tkinter as tk
+    from tkinter import filedialog
+    root = tk.Tk()
+    root.withdraw()
+    file_path = filedialog.asksaveasfilename(title=title, defaultextension=extension,
+                                             filetypes=filetypes or [(extension.upper(), "*" + extension)])
+    root.quit()
+    root.destroy()
+    return file_path
+
 def load_file():
-    if imgui.button("Load PLY"):
+    if imgui.button("Load"):
             file_path = open_file_dialog()
             if file_path:
                 world_settings.load_ply(file_path)
+    imgui.same_line()
+    if imgui.button("Add to scene"):
+        file_path = open_file_dialog()
+        if file_path:
+            world_settings.add_ply_object(file_path)
+    imgui.same_line()
+    if imgui.button("Open chunks"):
+        file_path = open_file_dialog("Choose a chunk manifest", (("Chunk manifest", "manifest.json"),))
+        if file_path:
+            world_settings.open_chunked(file_path)
+    # Scenes and files still streaming in have no single set to write.
+    if world_settings.can_save:
+        imgui.same_line()
+        if imgui.button("Save"):
+            file_path = save_file_dialog("Save scene", ".ply", [("PLY", "*.ply"), ("SPZ", "*.spz"), ("Splat", "*.splat")])
+            if file_path:
+                world_settings.save_ply(file_path)
+
+    changed, world_settings.prune_on_load = imgui.checkbox("Prune on load", world_settings.prune_on_load)
+    if world_settings.prune_on_load:
+        changed, world_settings.prune_min_opacity = imgui.input_float(
+            "Min opacity", world_settings.prune_min_opacity, format="%.4f")
+        changed, world_settings.prune_min_scale = imgui.input_float(
+            "Min scale", world_settings.prune_min_scale, format="%.6f")
+        changed, dedup = imgui.checkbox("Merge duplicates", world_settings.prune_dedup_radius is not None)
+        if changed:
+            world_settings.prune_dedup_radius = 0.0 if dedup else None
+        if world_settings.prune_dedup_radius is not None:
+            changed, world_settings.prune_dedup_radius = imgui.input_float(
+                "Merge radius", world_settings.prune_dedup_radius, format="%.6f")
+        report = world_settings.last_prune_report
+        if report is not None:
+            imgui.text(f"Last load: -{report.removed} splats, -{report.removed_bytes / 2**20:.1f} MiB")
+    changed, world_settings.morton_reorder_on_load = imgui.checkbox(
+        "Morton order on load", world_settings.morton_reorder_on_load)
+
+def residency():
+    manager = world_settings.residency
+    if manager is None or not imgui.collapsing_header("Out-of-core", flags=imgui.TREE_NODE_DEFAULT_OPEN)[0]:
+        return
+    budget_mib = world_settings.residency_budget // 2**20
+    changed, budget_mib = imgui.slider_int("Budget (MiB)", budget_mib, 64, 65536)
+    if changed:
+        world_settings.residency_budget = budget_mib * 2**20
+    stats = manager.stats()
+    imgui.text(f"Resident: {stats['resident_chunks']} / {stats['chunks']} chunks, "
+               f"{stats['resident_bytes'] / 2**20:.0f} MiB")
+    imgui.text(f"Hit rate: {stats['hit_rate'] * 100:.1f}%, page-ins: {stats['page_ins']} "
+               f"({stats['prefetches']} prefetched), evictions: {stats['evictions']}")
+    imgui.text(f"Page-in: {stats['page_in_ms_mean']:.1f} ms avg, {stats['page_in_ms_max']:.1f} ms max")
+
+def scene_objects():
+    scene = world_settings.scene
+    if scene is None or world_settings.residency is not None or not imgui.collapsing_header("Scene", flags=imgui.TREE_NODE_DEFAULT_OPEN)[0]:
+        return
+    for obj in list(scene.objects.values()):
+        imgui.push_id(str(obj.id))
+        clicked, _ = imgui.selectable(f"{obj.name} ({obj.count})", world_settings.selected_object is obj,
+                                      width=imgui.get_content_region_available_width() - 70)
+        if clicked:
+            world_settings.selected_object = obj
+        imgui.same_line()
+        if imgui.small_button("Remove"):
+            world_settings.remove_object(obj)
+        imgui.pop_id()
+
+def sort_scheduling():
+    scheduler = world_settings.gauss_renderer.sort_scheduler
+    if not imgui.tree_node("Sort scheduling"):
+        return
+    changed, angle = imgui.slider_float("Max rotation (deg)", np.degrees(scheduler.max_angle), 0.0, 20.0)
+    if changed:
+        scheduler.max_angle = np.radians(angle)
+    changed, translation = imgui.slider_float("Max travel (% of scene)", scheduler.max_translation * 100, 0.0, 10.0)
+    if changed:
+        scheduler.max_translation = translation / 100
+    changed, rate = imgui.slider_float("Max inversions (%)", scheduler.max_inversion_rate * 100, 0.0, 20.0)
+    if changed:
+        scheduler.max_inversion_rate = rate / 100
+    use_budget = scheduler.frame_budget is not None
+    changed, use_budget = imgui.checkbox("Sort in spare frame time", use_budget)
+    if changed:
+        scheduler.frame_budget = 1 / 60 if use_budget else None
+    if scheduler.frame_budget is not None:
+        changed, budget_ms = imgui.slider_float("Frame budget (ms)", scheduler.frame_budget * 1000, 1.0, 50.0)
+        if changed:
+            scheduler.frame_budget = budget_ms / 1000
+    imgui.text(f"Sorts performed: {scheduler.sorts_performed}, skipped: {scheduler.sorts_skipped}")
+    imgui.text(", ".join(f"{reason}: {count}" for reason, count in scheduler.reasons.most_common()))
+    imgui.text(f"Since last sort: {np.degrees(scheduler.angle):.2f} deg, {scheduler.translation * 100:.2f}% travel, "
+               f"{scheduler.inversion_rate * 100:.2f}% inversions")
+    imgui.tree_pop()
 
 def parameters():
     imgui.text("Parameters:")
@@ -28,18 +138,75 @@ def parameters():
         world_settings.gauss_renderer.sort_and_update()
     imgui.same_line()
     changed, world_settings.auto_sort = imgui.checkbox("Auto-sort", world_settings.auto_sort)
+    imgui.same_line()
+    changed, world_settings.async_sort = imgui.checkbox("Background", world_settings.async_sort)
+    if world_settings.auto_sort and world_settings.async_sort:
+        renderer = world_settings.gauss_renderer
+        imgui.text(f"Sort latency: {renderer.sort_latency * 1000:.1f} ms, "
+                   f"staleness: {world_settings.get_sort_staleness()} frames")
+    if world_settings.auto_sort:
+        sort_scheduling()
+
+    changed, on_demand = imgui.checkbox("Render on demand", world_settings.render_on_demand)
+    if changed:
+        world_settings.set_render_on_demand(on_demand)
+    if world_settings.render_on_demand:
+        renderer = world_settings.gauss_renderer
+        imgui.same_line()
+        imgui.text(f"{renderer.redraws} redrawn, {renderer.cached_frames} reused")
+
+    backends = list(gaussian_renderer.SORT_BACKENDS)
+    current = backends.index(gaussian_renderer.current_sort_backend())
+    changed, selected = imgui.combo("Sort backend", current, backends)
+    if changed:
+        world_settings.set_sort_backend(backends[selected])
+
+    changed, culling = imgui.checkbox("Frustum culling", world_settings.frustum_culling)
+    if changed:
+        world_settings.set_frustum_culling(culling)
+    if world_settings.frustum_culling:
+        imgui.same_line()
+        imgui.text(f"{world_settings.gauss_renderer.num_instances} drawn")
+
+    changed, lod_enabled = imgui.checkbox("Level of detail", world_settings.lod_enabled)
+    if changed:
+        world_settings.set_lod_enabled(lod_enabled)
+    if world_settings.lod_enabled:
+        budget_changed, world_settings.lod_budget = imgui.slider_int(
+            "Splat budget", world_settings.lod_budget, 10_000, 20_000_000)
+        error_changed, world_settings.lod_max_error_px = imgui.slider_float(
+            "Max error (px)", world_settings.lod_max_error_px, 0.5, 32.0)
+        if budget_changed or error_changed:
+            # The cut is chosen by the sort, which a still camera would not repeat.
+            world_settings.gauss_renderer.sort_scheduler.invalidate()
+
+    formats = gaussian_renderer.STORAGE_FORMATS
+    changed, selected = imgui.combo("GPU storage", formats.index(world_settings.storage_format), formats)
+    if changed:
+        world_settings.set_storage_format(formats[selected])
 
     # Visualization type
     changed, mode = imgui.combo("Visualization Type", world_settings.render_mode, type_visualization)
     if changed:
         world_settings.update_render_mode(mode)
 
+    changed, degree = imgui.combo("Resident SH degree", world_settings.sh_degree, sh_degrees)
+    if changed:
+        world_settings.set_sh_degree(degree)
+
+    # Takes effect on the next load: bands above it are never read from disk.
+    current = 0 if world_settings.load_sh_degree is None else world_settings.load_sh_degree + 1
+    changed, selected = imgui.combo("Load SH degree", current, load_sh_degrees)
+    if changed:
+        world_settings.load_sh_degree = None if selected == 0 else selected - 1
+
 def menu_bar():
-    global show_cam_window, show_param_window
+    global show_cam_window, show_param_window, show_profiler_window
     if imgui.begin_main_menu_bar():
         if imgui.begin_menu("Camera", True):
             clicked, show_cam_window = imgui.menu_item("Camera Settings", None, show_cam_window)
             clicked, show_param_window = imgui.menu_item("Parameters", None, show_param_window)
+            clicked, show_profiler_window = imgui.menu_item("Profiler", None, show_profiler_window)
         
             imgui.end_menu()
         imgui.end_main_menu_bar()
@@ -47,11 +214,49 @@ def param_window():
     if imgui.begin("Cosmos", True):
         imgui.text(f"FPS: {imgui.get_io().framerate:.1f}")
         imgui.text(f"Num of Gauss: {world_settings.get_num_gaussians()}")
+        order_buffer = world_settings.gauss_renderer.order_buffer
+        imgui.text(f"Order upload: {order_buffer.last_upload_time * 1000:.2f} ms, "
+                   f"{order_buffer.bandwidth() / 2**30:.2f} GiB/s avg")
 
         load_file()
+        loader = world_settings.streaming_loader
+        if loader is not None:
+            imgui.progress_bar(loader.progress, (0, 0), f"{loader.loaded} / {loader.total}")
+        residency()
+        scene_objects()
         parameters()
 
         imgui.end()
+def profiler_window():
+    if imgui.begin("Profiler", True):
+        changed, enabled = imgui.checkbox("Record", profiler.enabled)
+        if changed:
+            profiler.set_enabled(enabled)
+        imgui.same_line()
+        if imgui.button("Clear"):
+            profiler.clear()
+        imgui.same_line()
+        if imgui.button("Export CSV"):
+            file_path = save_file_dialog("Export profile", ".csv")
+            if file_path:
+                profiler.export_csv(file_path)
+        imgui.same_line()
+        if imgui.button("Export trace"):
+            file_path = save_file_dialog("Export Chrome trace", ".json")
+            if file_path:
+                profiler.export_chrome_trace(file_path)
+
+        frame_times = profiler.frame_times()
+        if len(frame_times):
+            imgui.plot_lines("frame", frame_times, overlay_text=f"{frame_times[-100:].mean():.2f} ms",
+                             scale_min=0.0, graph_size=(0, 40))
+        for name, gpu in profiler.scope_names():
+            history = profiler.history(name, gpu)
+            label = f"{name} (GPU)" if gpu else name
+            imgui.plot_lines(label, history, overlay_text=f"{history[-100:].mean():.2f} ms",
+                             scale_min=0.0, graph_size=(0, 40))
+        imgui.end()
+
 def cam_window():
     if imgui.begin("Camera Settings", True):
         imgui.text("Bleh")
@@ -69,4 +274,6 @@ def main_ui(this_world_settings):
         cam_window()
     if show_param_window:
         param_window()
+    if show_profiler_window:
+        profiler_window()
     
@@ -4,6 +4,11 @@ import sys
 import imgui
 import numpy as np
 
+# Keys polled every frame by check_inputs().
+MOVEMENT_KEYS = (glfw.KEY_W, glfw.KEY_A, glfw.KEY_S, glfw.KEY_D, glfw.KEY_I, glfw.KEY_J, glfw.KEY_K, glfw.KEY_L)
+# Longest time step applied to held keys, so the first frame after an idle wait does not jump.
+MAX_INPUT_DELTA = 0.1
+
 class InputHandler:
     def __init__(self, window, world_settings):
         self.window = window
@@ -40,10 +45,13 @@ class InputHandler:
         self.world_settings.world_camera.h = height
         self.world_settings.gauss_renderer.set_render_resolution(width, height)
 
+    def keys_held(self):
+        return any(glfw.get_key(self.window, key) == glfw.PRESS for key in MOVEMENT_KEYS)
+
     def check_inputs(self):
         # Time-based to make it frame-rate independent
         curr_time = glfw.get_time()
-        delta = curr_time - self.last_time
+        delta = min(curr_time - self.last_time, MAX_INPUT_DELTA)
         self.last_time = curr_time
 
         # View transformations
@@ -0,0 +1,128 @@
+"""
+Level-of-detail hierarchy over a Gaussian set with screen-space-error driven selection.
+"""
+import numpy as np
+from gaussian_representation import GaussianData
+from gaussian_math import covariance3d, covariance_to_scale_rot
+from spatial_index import morton_codes
+
+
+def _area(scale):
+    """
+    Footprint proxy used to weight merges: product of the two largest axes.
+    """
+    s = np.sort(scale, axis=-1)
+    return s[:, 1] * s[:, 2]
+
+
+def _merge(mu, cov, alpha, sh, area, groups):
+    """
+    Moment-matches every group of consecutive nodes (starting at `groups`) into one
+    parent: weighted mean position, covariance including the spread of the child
+    means, weighted SH, and an opacity that preserves the children's total coverage.
+    """
+    w = (alpha[:, 0] * area)[:, None]
+    w_sum = np.add.reduceat(w, groups, axis=0)
+    w_sum = np.maximum(w_sum, 1e-12)
+    p_mu = np.add.reduceat(w * mu, groups, axis=0) / w_sum
+    counts = np.diff(np.concatenate([groups, [len(mu)]]))
+    d = mu - np.repeat(p_mu, counts, axis=0)
+    spread = cov + d[:, :, None] * d[:, None, :]
+    p_cov = np.add.reduceat(w[:, :, None] * spread, groups, axis=0) / w_sum[:, :, None]
+    p_sh = np.add.reduceat(w * sh, groups, axis=0) / w_sum
+    p_scale, p_rot = covariance_to_scale_rot(p_cov)
+    p_area = _area(p_scale)
+    coverage = np.add.reduceat(alpha[:, 0] * area, groups)
+    p_alpha = np.clip(coverage / np.maximum(p_area, 1e-12), 0, 1)[:, None]
+    return p_mu, p_cov, p_alpha.astype(np.float32), p_sh, p_scale, p_rot, p_area
+
+
+class LodHierarchy:
+    """
+    Hierarchy whose leaves are the input Gaussians and whose inner nodes are merged
+    parents. Children are clustered by Morton-order octree cells that double in size
+    at each level, so every node's children are a contiguous range of nodes.
+
+    `gaussians` holds all nodes: the leaves (permuted into Morton order) first,
+    then each coarser level. select() returns indices into it.
+    """
+    def __init__(self, source: GaussianData, max_root_nodes=256):
+        self.source = source
+        n = len(source)
+        xyz = np.asarray(source.xyz, dtype=np.float32)
+        # Start one level below one splat per cell so the first merges are small.
+        depth = int(np.clip(np.ceil(np.log(max(n, 2)) / np.log(8)) + 1, 1, 20))
+        # An empty (e.g. fully pruned) set gives an empty hierarchy.
+        codes = morton_codes(xyz, depth) if n else np.zeros(0, dtype=np.uint64)
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+
+        mu = xyz[order].astype(np.float64)
+        scale = np.asarray(source.scale, dtype=np.float32)[order]
+        rot = np.asarray(source.rot, dtype=np.float32)[order]
+        alpha = np.asarray(source.opacity, dtype=np.float32)[order]
+        sh = np.asarray(source.sh, dtype=np.float32)[order]
+        cov = covariance3d(scale, rot)
+        area = _area(scale)
+
+        parts = [(mu, rot, scale, alpha, sh)]
+        radius = [3 * scale.max(axis=1)]
+        child_start = [np.full(n, -1, dtype=np.int64)]
+        child_end = [np.full(n, -1, dtype=np.int64)]
+        self.level_offsets = [0]
+        offset = n
+        while len(mu) > max_root_nodes and depth > 0:
+            codes = codes >> np.uint64(3)
+            depth -= 1
+            groups = np.flatnonzero(np.concatenate([[True], codes[1:] != codes[:-1]]))
+            if len(groups) == len(mu):
+                continue  # every cell holds a single node, nothing to merge at this level
+            mu, cov, alpha, sh, scale, rot, area = _merge(mu, cov, alpha, sh, area, groups)
+            codes = codes[groups]
+            child_offset = self.level_offsets[-1]
+            child_start.append(groups + child_offset)
+            child_end.append(np.concatenate([groups[1:], [offset - child_offset]]) + child_offset)
+            self.level_offsets.append(offset)
+            offset += len(mu)
+            parts.append((mu, rot, scale, alpha, sh))
+            radius.append(3 * scale.max(axis=1))
+
+        self.gaussians = GaussianData(*(np.concatenate([p[k] for p in parts]).astype(np.float32) for k in range(5)))
+        self.child_start = np.concatenate(child_start)
+        self.child_end = np.concatenate(child_end)
+        self.radius = np.concatenate(radius)
+        self.num_levels = len(parts)
+        self.num_leaves = n
+
+    def select(self, cam_pos, focal, budget=2_000_000, max_error_px=2.0) -> np.ndarray:
+        """
+        Picks a cut through the hierarchy: starting from the roots, nodes whose
+        projected size exceeds max_error_px pixels are replaced by their children,
+        largest error first, until no node needs refining or the splat budget is spent.
+        cam_pos must be in the same space as the Gaussian centers.
+        """
+        xyz = self.gaussians.xyz
+        selected = np.arange(self.level_offsets[-1], len(xyz))
+        for _ in range(self.num_levels - 1):
+            inner = selected[self.child_start[selected] >= 0]
+            if len(inner) == 0:
+                break
+            dist = np.maximum(np.linalg.norm(xyz[inner] - cam_pos, axis=-1), 1e-6)
+            error = focal * self.radius[inner] / dist
+            refine = inner[error > max_error_px]
+            if len(refine) == 0:
+                break
+            # Each refinement adds (children - 1) splats; keep the largest errors within budget.
+            by_error = np.argsort(-error[error > max_error_px])
+            refine = refine[by_error]
+            extra = np.cumsum(self.child_end[refine] - self.child_start[refine] - 1)
+            refine = refine[:np.searchsorted(extra, budget - len(selected), side="right")]
+            if len(refine) == 0:
+                break
+            keep = np.ones(len(selected), dtype=bool)
+            keep[np.searchsorted(selected, np.sort(refine))] = False
+            counts = self.child_end[refine] - self.child_start[refine]
+            children = np.repeat(self.child_start[refine] - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+            children += np.arange(counts.sum())
+            selected = np.sort(np.concatenate([selected[keep], children]))
+        return selected.astype(np.int32)
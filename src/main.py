@@ -1,9 +1,12 @@
+import time
+_process_start = time.perf_counter()
+
+import argparse
 import glfw
 import OpenGL.GL as gl
 from imgui.integrations.glfw import GlfwRenderer
 import imgui
 import numpy as np
-import imageio
 import os
 import sys
 from loguru import logger
@@ -12,8 +15,9 @@ from camera import Camera
 from input_handler import InputHandler
 import util
 import imgui_manager
+from profiler import profiler
 from worldsettings import WorldSettings
-import existing_renderer
+import gaussian_renderer
 
 
 # Make a Camera object
@@ -54,37 +58,80 @@ def update_camera_intrin_lazy():
         world_settings.world_camera.dirty_intrinsic = False
 
 def processFrames():
-    update_camera_pose_lazy()
-    update_camera_intrin_lazy()
-    if world_settings.auto_sort:
-        world_settings.gauss_renderer.sort_and_update()
-
-
-def game_loop(window, glfw_renderer):
+    world_settings.update_streaming()
+    world_settings.update_residency()
+    with profiler.scope("camera_uniforms"):
+        update_camera_pose_lazy()
+        update_camera_intrin_lazy()
+    if world_settings.auto_sort and world_settings.gauss_renderer.sort_due():
+        if world_settings.async_sort:
+            world_settings.gauss_renderer.request_sort_async()
+        else:
+            world_settings.gauss_renderer.sort_and_update()
+    world_settings.gauss_renderer.poll_sort_async()
+
+
+def game_loop(window, glfw_renderer, exit_after_first_frame=False):
     while not glfw.window_should_close(window):
-        glfw.poll_events()
-        glfw_renderer.process_inputs()
+        profiler.begin_frame(world_settings.frame_index)
+        with profiler.scope("input"):
+            if world_settings.render_on_demand:
+                glfw.wait_events_timeout(world_settings.event_timeout())
+            else:
+                glfw.poll_events()
+            glfw_renderer.process_inputs()
 
-        gl.glClearColor(0, 0, 0, 1.0)
-        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
-        
-        world_settings.input_handler.check_inputs()
+            gl.glClearColor(0, 0, 0, 1.0)
+            gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+
+            world_settings.input_handler.check_inputs()
 
         imgui.new_frame()
 
         processFrames()
 
-        imgui_manager.main_ui(this_world_settings=world_settings)
-        world_settings.gauss_renderer.draw()
-
-        imgui.render()
-        glfw_renderer.render(imgui.get_draw_data())
-        glfw.swap_buffers(window)
+        with profiler.scope("ui"):
+            imgui_manager.main_ui(this_world_settings=world_settings)
+        with profiler.scope("draw"), profiler.gpu_scope("draw"):
+            if world_settings.render_on_demand:
+                world_settings.gauss_renderer.draw_cached(world_camera.w, world_camera.h)
+            else:
+                world_settings.gauss_renderer.draw()
+
+        with profiler.scope("ui_render"):
+            imgui.render()
+            glfw_renderer.render(imgui.get_draw_data())
+        with profiler.scope("swap"):
+            glfw.swap_buffers(window)
+        profiler.end_frame()
+        if world_settings.frame_index == 0:
+            log.info(f"First frame after {time.perf_counter() - _process_start:.2f} s")
+            if exit_after_first_frame:
+                break
+        world_settings.frame_index += 1
         
     glfw.terminate()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Cosmos Gaussian splatting viewer.")
+    parser.add_argument("--list-backends", action="store_true", help="list the sort backends and exit")
+    parser.add_argument("--sort-backend", choices=list(gaussian_renderer.SORT_BACKENDS), default=None,
+                        help=f"overrides ${gaussian_renderer.SORT_BACKEND_ENV} and auto-detection")
+    parser.add_argument("--exit-after-first-frame", action="store_true", help="for startup benchmarks")
+    parser.add_argument("--on-demand", action="store_true",
+                        help="wait for events and redraw only when the image is stale")
+    parser.add_argument("--load-sh-degree", type=int, choices=range(4), default=None,
+                        help="read only the SH bands up to this degree from scene files")
+    args = parser.parse_args()
+    if args.list_backends:
+        print(gaussian_renderer.list_sort_backends())
+        return
+    if args.sort_backend is not None:
+        gaussian_renderer.set_sort_backend(args.sort_backend)
+    else:
+        gaussian_renderer.probe_sort_backends_async()
+
     imgui.create_context()
     window = impl_glfw_init()
 
@@ -92,10 +139,14 @@ def main():
     input_handler = InputHandler(window, world_settings)
     world_settings.input_handler = input_handler
 
+    profiler.enable_gpu_timing()
+
     # Backend GS renderer
     world_settings.create_gaussian_renderer()
     world_settings.update_activated_render_state()
-    game_loop(window, glfw_renderer)
+    world_settings.render_on_demand = args.on_demand
+    world_settings.load_sh_degree = args.load_sh_degree
+    game_loop(window, glfw_renderer, args.exit_after_first_frame)
 
 if __name__ == "__main__":
     global log, input_handler
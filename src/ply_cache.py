@@ -0,0 +1,144 @@
+"""
+Persistent cache of preprocessed PLY scenes.
+
+Each entry is the activated, interleaved float32 buffer produced by
+gaussian_representation.from_ply_flat, stored as a .npy file so a warm load is
+a memory map that can be handed straight to the SSBO upload. Loads truncated
+to a lower SH degree are cached as entries of their own.
+"""
+import hashlib
+import os
+import numpy as np
+import util
+from gaussian_representation import GaussianData, from_ply_flat
+
+CACHE_DIR = os.environ.get("COSMOS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "cosmos"))
+MAX_CACHE_BYTES = int(os.environ.get("COSMOS_CACHE_MAX_BYTES", 16 << 30))
+
+# Bump whenever the cached layout or activations change.
+_FORMAT_VERSION = 1
+_SAMPLE_BYTES = 1 << 20
+
+
+def fingerprint(path: str, max_sh_degree=None) -> str:
+    """
+    Cache key built from the file's absolute path, size, mtime and a content hash.
+    Only the first, middle and last MiB are hashed so keying a multi-GB file stays cheap.
+    """
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{_FORMAT_VERSION}:{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}".encode())
+    if max_sh_degree is not None:
+        h.update(f":sh{max_sh_degree}".encode())
+    with open(path, "rb") as f:
+        for offset in (0, st.st_size // 2, max(0, st.st_size - _SAMPLE_BYTES)):
+            f.seek(offset)
+            h.update(f.read(_SAMPLE_BYTES))
+    return h.hexdigest()
+
+
+class PlyCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def lookup(self, path: str, max_sh_degree=None):
+        """
+        Returns the cached Gaussians of a PLY file memory-mapped, or None on a miss.
+        """
+        entry = self._entry_path(fingerprint(path, max_sh_degree))
+        if os.path.exists(entry):
+            try:
+                flat = np.load(entry, mmap_mode="r")
+                os.utime(entry)  # mtime doubles as the LRU timestamp
+                self.hits += 1
+                return GaussianData.from_flat(flat)
+            except (OSError, ValueError) as e:
+                util.logger.warning(f"Dropping unreadable cache entry {entry}: {e}")
+                os.remove(entry)
+        self.misses += 1
+        return None
+
+    def load(self, path: str, max_sh_degree=None) -> GaussianData:
+        """
+        Returns the Gaussians of a PLY file, memory-mapped from the cache when possible.
+        """
+        gaussians = self.lookup(path, max_sh_degree)
+        if gaussians is not None:
+            return gaussians
+        flat = from_ply_flat(path, max_sh_degree)
+        self.store(path, flat, max_sh_degree)
+        return GaussianData.from_flat(flat)
+
+    def store(self, path: str, flat: np.ndarray, max_sh_degree=None):
+        """
+        Caches the activated flat() buffer of a PLY file. Write failures are only logged.
+        """
+        entry = self._entry_path(fingerprint(path, max_sh_degree))
+        try:
+            self._store(entry, flat)
+        except OSError as e:
+            util.logger.warning(f"Could not write PLY cache entry {entry}: {e}")
+
+    def _store(self, entry, flat):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = entry + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, flat)
+        os.replace(tmp, entry)
+        self.evict(keep=entry)
+
+    def entries(self):
+        """
+        Returns [(path, bytes, last_access)] for every cache entry, least recently used first.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        ret = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy"):
+                p = os.path.join(self.cache_dir, name)
+                st = os.stat(p)
+                ret.append((p, st.st_size, st.st_mtime))
+        return sorted(ret, key=lambda e: e[2])
+
+    def total_bytes(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for p, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            os.remove(p)
+            total -= size
+            util.logger.debug(f"Evicted PLY cache entry {p}")
+
+    def clear(self):
+        for p, _, _ in self.entries():
+            os.remove(p)
+
+
+_default_cache = None
+
+
+def default_cache() -> PlyCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PlyCache()
+    return _default_cache
+
+
+def load(path: str, max_sh_degree=None) -> GaussianData:
+    return default_cache().load(path, max_sh_degree)
@@ -0,0 +1,102 @@
+"""
+Progressive PLY loading: a background thread reads and activates the vertex block
+in growing chunks while the viewer keeps drawing the rows loaded so far.
+"""
+import threading
+import time
+import numpy as np
+import util
+from gaussian_representation import GaussianData, PlyFlatReader, from_ply_flat
+
+
+class StreamingPlyLoader:
+    """
+    Rows are written into one preallocated flat() buffer. Chunks start small so
+    the first splats appear quickly and double up to max_chunk rows. With a
+    ply_cache.PlyCache, the finished buffer is stored on the same thread.
+    """
+    def __init__(self, path, first_chunk=1 << 15, max_chunk=1 << 20, max_sh_degree=None, cache=None):
+        self.path = path
+        self.max_sh_degree = max_sh_degree
+        self.cache = cache
+        self.first_chunk = first_chunk
+        self.max_chunk = max_chunk
+        try:
+            self._reader = PlyFlatReader(path, max_sh_degree)
+            self.total = len(self._reader)
+            self.flat = np.empty((self.total, self._reader.total_dim), dtype=np.float32)
+        except ValueError:
+            # ASCII files cannot be read in ranges; load them whole on the worker.
+            self._reader = None
+            self.total = 0
+            self.flat = None
+        self.loaded = 0          # rows published through poll()
+        self.error = None
+        self.start_time = time.perf_counter()
+        self.first_chunk_time = None
+        self._finished = []      # (start, stop) ranges ready to publish
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._thread = threading.Thread(target=self._run, name="ply-stream", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            if self._reader is None:
+                flat = from_ply_flat(self.path, self.max_sh_degree)
+                with self._lock:
+                    self.flat, self.total = flat, len(flat)
+                    self._finished.append((0, len(flat)))
+            else:
+                start, chunk = 0, self.first_chunk
+                while start < self.total and not self._cancelled:
+                    stop = min(self.total, start + chunk)
+                    self._reader.read(start, stop, out=self.flat[start:stop])
+                    with self._lock:
+                        self._finished.append((start, stop))
+                    start, chunk = stop, min(chunk * 2, self.max_chunk)
+        except Exception as e:
+            util.logger.error(f"Streaming load of {self.path} failed: {e}")
+            self.error = e
+            return
+        # The rows are only read from here on, so writing them out does not race the uploads.
+        if self.cache is not None and not self._cancelled:
+            self.cache.store(self.path, self.flat, self.max_sh_degree)
+
+    def poll(self):
+        """
+        Returns the row ranges finished since the last call, in order.
+        """
+        with self._lock:
+            ranges, self._finished = self._finished, []
+        if ranges:
+            self.loaded = ranges[-1][1]
+            if self.first_chunk_time is None:
+                self.first_chunk_time = time.perf_counter() - self.start_time
+        return ranges
+
+    def gaussians(self) -> GaussianData:
+        """
+        The rows loaded so far, as views into the shared buffer.
+        """
+        return GaussianData.from_flat(self.flat[:self.loaded])
+
+    @property
+    def progress(self) -> float:
+        return self.loaded / self.total if self.total else 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.error is not None or (self.flat is not None and self.loaded == self.total)
+
+    def wait(self) -> GaussianData:
+        """
+        Blocks until the worker has read every row and returns them.
+        """
+        self._thread.join()
+        self.poll()
+        return self.gaussians()
+
+    def cancel(self):
+        self._cancelled = True
+        self._thread.join()
@@ -0,0 +1,224 @@
+"""
+Per-frame profiler for the render loop.
+
+Named CPU scopes and GL_TIME_ELAPSED GPU scopes are recorded per frame into a
+ring buffer of the last `capacity` frames and can be exported as CSV or as a
+Chrome trace (chrome://tracing, Perfetto). While disabled, scope() returns a
+shared no-op context manager, so instrumented code pays one attribute check.
+
+    with profiler.scope("sort"):
+        ...
+    with profiler.gpu_scope("draw"):
+        gl.glDrawElementsInstanced(...)
+"""
+import contextlib
+import ctypes
+import csv
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+import numpy as np
+
+_NULL_SCOPE = contextlib.nullcontext()
+
+
+@dataclass
+class Event:
+    name: str
+    start: float      # seconds since the profiler's epoch
+    duration: float   # seconds
+    thread: str       # thread name, or "GPU"
+
+
+@dataclass
+class FrameRecord:
+    index: int
+    start: float
+    duration: float = 0.0
+    events: list = field(default_factory=list)
+
+
+class _CpuScope:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        p = self.profiler
+        p._record(Event(self.name, self.start - p.epoch, end - self.start, threading.current_thread().name))
+        return False
+
+
+class _GpuScope:
+    """
+    Wraps a span in a GL_TIME_ELAPSED query. The result is collected a few frames
+    later by Profiler.end_frame(), so reading it never stalls the pipeline.
+    """
+    __slots__ = ("profiler", "name", "query", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        gl = self.profiler._gl
+        self.query = self.profiler._acquire_query()
+        self.start = time.perf_counter()
+        gl.glBeginQuery(gl.GL_TIME_ELAPSED, self.query)
+        return self
+
+    def __exit__(self, *exc):
+        p = self.profiler
+        p._gl.glEndQuery(p._gl.GL_TIME_ELAPSED)
+        p._pending.append((p._frame, self.name, self.start - p.epoch, self.query))
+        return False
+
+
+class Profiler:
+    def __init__(self, capacity=600):
+        self.enabled = False
+        self.capacity = capacity
+        self.frames = deque(maxlen=capacity)
+        self.epoch = time.perf_counter()
+        self._frame = None
+        self._lock = threading.Lock()
+        self._gl = None
+        self._free_queries = []
+        self._pending = []  # (frame, name, cpu start, query) awaiting GPU results
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if not enabled:
+            self._frame = None
+
+    def enable_gpu_timing(self):
+        """
+        Turns on gpu_scope(). Needs a current GL 3.3+ context.
+        """
+        import OpenGL.GL as gl
+        self._gl = gl
+
+    def scope(self, name):
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _CpuScope(self, name)
+
+    def gpu_scope(self, name):
+        """
+        CPU scope when GPU timing is unavailable. GL_TIME_ELAPSED queries cannot nest,
+        so GPU scopes must not overlap.
+        """
+        if not self.enabled:
+            return _NULL_SCOPE
+        if self._gl is None:
+            return _CpuScope(self, name)
+        return _GpuScope(self, name)
+
+    def begin_frame(self, index):
+        if not self.enabled:
+            return
+        frame = FrameRecord(index, time.perf_counter() - self.epoch)
+        with self._lock:
+            self.frames.append(frame)
+            self._frame = frame
+
+    def end_frame(self):
+        frame = self._frame
+        if frame is not None:
+            frame.duration = time.perf_counter() - self.epoch - frame.start
+        # Also after recording was switched off, so queries still in flight are read back and recycled.
+        if self._pending:
+            self._collect_gpu()
+
+    def _record(self, event):
+        with self._lock:
+            # Scopes of other threads (e.g. the sort worker) land in the current frame.
+            if self._frame is not None:
+                self._frame.events.append(event)
+
+    def _acquire_query(self):
+        if self._free_queries:
+            return self._free_queries.pop()
+        return int(self._gl.glGenQueries(1)[0])
+
+    def _collect_gpu(self):
+        gl = self._gl
+        still_pending = []
+        for frame, name, start, query in self._pending:
+            if not gl.glGetQueryObjectuiv(query, gl.GL_QUERY_RESULT_AVAILABLE):
+                still_pending.append((frame, name, start, query))
+                continue
+            # PyOpenGL cannot allocate the 64-bit output itself.
+            elapsed_ns = ctypes.c_uint64()
+            gl.glGetQueryObjectui64v(query, gl.GL_QUERY_RESULT, ctypes.byref(elapsed_ns))
+            elapsed_ns = elapsed_ns.value
+            self._free_queries.append(query)
+            if frame is not None:
+                with self._lock:
+                    frame.events.append(Event(name, start, elapsed_ns * 1e-9, "GPU"))
+        self._pending = still_pending
+
+    def clear(self):
+        with self._lock:
+            self.frames.clear()
+            self._frame = None
+
+    def scope_names(self):
+        with self._lock:
+            names = {(e.name, e.thread == "GPU") for f in self.frames for e in f.events}
+        return sorted(names)
+
+    def history(self, name, gpu=False) -> np.ndarray:
+        """
+        Per-frame total milliseconds of a scope over the ring buffer, oldest first.
+        """
+        with self._lock:
+            frames = list(self.frames)
+        out = np.zeros(len(frames), dtype=np.float32)
+        for i, f in enumerate(frames):
+            out[i] = sum(e.duration for e in f.events if e.name == name and (e.thread == "GPU") == gpu) * 1000
+        return out
+
+    def frame_times(self) -> np.ndarray:
+        with self._lock:
+            return np.array([f.duration * 1000 for f in self.frames], dtype=np.float32)
+
+    def export_csv(self, path):
+        with self._lock:
+            frames = list(self.frames)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "name", "thread", "start_ms", "duration_ms"])
+            for frame in frames:
+                writer.writerow([frame.index, "frame", threading.main_thread().name, f"{frame.start * 1000:.4f}", f"{frame.duration * 1000:.4f}"])
+                for e in frame.events:
+                    writer.writerow([frame.index, e.name, e.thread, f"{e.start * 1000:.4f}", f"{e.duration * 1000:.4f}"])
+
+    def export_chrome_trace(self, path):
+        """
+        Writes the ring buffer in the Trace Event Format; GPU spans go on their own track,
+        placed at the time they were issued.
+        """
+        with self._lock:
+            frames = list(self.frames)
+        events = []
+        for frame in frames:
+            events.append({"name": f"frame {frame.index}", "ph": "X", "pid": 0, "tid": threading.main_thread().name,
+                           "ts": frame.start * 1e6, "dur": frame.duration * 1e6})
+            for e in frame.events:
+                events.append({"name": e.name, "ph": "X", "pid": 0, "tid": e.thread,
+                               "ts": e.start * 1e6, "dur": e.duration * 1e6, "args": {"frame": frame.index}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+profiler = Profiler()
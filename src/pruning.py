@@ -0,0 +1,138 @@
+"""
+Load-time cleanup of Gaussians that cost a sort slot and an instance every frame
+but contribute next to nothing to the image.
+
+    python pruning.py scene.ply pruned.ply --min-opacity 0.004 --min-scale 1e-4 --dedup-radius 1e-4
+
+Splats below the opacity threshold, or whose largest axis is below the scale
+threshold, are dropped. Splats whose centers fall into the same cell of a hash
+grid over xyz are merged into one. The result can be written back with
+gaussian_representation.save_ply so the cleanup runs once per capture.
+"""
+import argparse
+import time
+from dataclasses import dataclass
+import numpy as np
+import util
+import gaussian_representation
+from gaussian_representation import GaussianData
+
+DEFAULT_MIN_OPACITY = 1.0 / 255.0
+
+
+@dataclass
+class PruneReport:
+    input_count: int
+    low_opacity: int = 0     # dropped below min_opacity
+    small_scale: int = 0     # dropped below min_scale
+    merged: int = 0          # removed by merging duplicate centers
+    row_bytes: int = 0       # bytes of one flat() row
+
+    @property
+    def removed(self) -> int:
+        return self.low_opacity + self.small_scale + self.merged
+
+    @property
+    def output_count(self) -> int:
+        return self.input_count - self.removed
+
+    @property
+    def removed_bytes(self) -> int:
+        return self.removed * self.row_bytes
+
+    def __str__(self):
+        share = self.removed / self.input_count * 100 if self.input_count else 0.0
+        return (f"Pruned {self.removed} of {self.input_count} splats ({share:.1f}%, "
+                f"{self.removed_bytes / 2**20:.1f} MiB): {self.low_opacity} below the opacity threshold, "
+                f"{self.small_scale} below the scale threshold, {self.merged} merged duplicates")
+
+
+def _cell_groups(xyz, radius):
+    """
+    Sorts the centers by their cell of a grid with `radius`-sized cells and returns
+    (order, group starts). With radius 0, only bit-identical centers share a cell.
+    """
+    if radius > 0:
+        cells = np.floor(xyz / radius).astype(np.int64)
+    else:
+        cells = np.ascontiguousarray(xyz, dtype=np.float32).view(np.int32).astype(np.int64)
+    order = np.lexsort((cells[:, 2], cells[:, 1], cells[:, 0]))
+    cells = cells[order]
+    starts = np.flatnonzero(np.concatenate([[True], np.any(cells[1:] != cells[:-1], axis=1)]))
+    return order, starts
+
+
+def _merge_groups(flat, starts):
+    """
+    Merges every run of rows starting at `starts` into one: opacity-weighted center
+    and SH, the shape of the most opaque member, and the opacity of all members
+    composited on top of each other.
+    """
+    alpha = flat[:, 10].astype(np.float64)
+    w = np.maximum(alpha, 1e-12)[:, None]
+    w_sum = np.add.reduceat(w, starts)
+    out = np.empty((len(starts), flat.shape[-1]), dtype=np.float32)
+    out[:, 0:3] = np.add.reduceat(w * flat[:, 0:3], starts) / w_sum
+    out[:, 11:] = np.add.reduceat(w * flat[:, 11:], starts) / w_sum
+    # The most opaque member of each group: max alpha per group, first index that reaches it.
+    group = np.repeat(np.arange(len(starts)), np.diff(np.concatenate([starts, [len(flat)]])))
+    best = np.maximum.reduceat(alpha, starts)
+    is_best = alpha == best[group]
+    first_best = np.flatnonzero(is_best)[np.searchsorted(group[is_best], np.arange(len(starts)))]
+    out[:, 3:10] = flat[first_best, 3:10]
+    transmittance = np.add.reduceat(np.log1p(-np.minimum(alpha, 1 - 1e-7)), starts)
+    out[:, 10] = -np.expm1(transmittance)
+    return out
+
+
+def prune(gaussians: GaussianData, min_opacity=DEFAULT_MIN_OPACITY, min_scale=0.0, dedup_radius=None):
+    """
+    Returns (pruned GaussianData backed by one flat() buffer, PruneReport).
+    min_scale is in world units and applies to the largest axis. Duplicate
+    merging is off with dedup_radius None, exact with 0.
+    """
+    flat = gaussians.flat()
+    report = PruneReport(len(gaussians), row_bytes=flat.shape[-1] * 4)
+    opacity = np.asarray(gaussians.opacity)[:, 0]
+    keep = opacity >= min_opacity
+    report.low_opacity = int(len(keep) - keep.sum())
+    if min_scale > 0:
+        large = np.asarray(gaussians.scale).max(axis=1) >= min_scale
+        report.small_scale = int((keep & ~large).sum())
+        keep &= large
+    if report.removed:
+        flat = flat[keep]
+
+    if dedup_radius is not None and len(flat):
+        order, starts = _cell_groups(flat[:, 0:3], dedup_radius)
+        if len(starts) < len(flat):
+            flat = flat[order]
+            report.merged = len(flat) - len(starts)
+            counts = np.diff(np.concatenate([starts, [len(flat)]]))
+            dup = np.repeat(counts > 1, counts)
+            dup_counts = counts[counts > 1]
+            merged = _merge_groups(flat[dup], np.concatenate([[0], np.cumsum(dup_counts)[:-1]]))
+            flat = np.concatenate([flat[~dup], merged])
+    return GaussianData.from_flat(np.ascontiguousarray(flat, dtype=np.float32)), report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove negligible and duplicate Gaussians from a PLY file.")
+    parser.add_argument("ply")
+    parser.add_argument("output", help="pruned PLY path")
+    parser.add_argument("--min-opacity", type=float, default=DEFAULT_MIN_OPACITY)
+    parser.add_argument("--min-scale", type=float, default=0.0, help="world units, largest axis")
+    parser.add_argument("--dedup-radius", type=float, default=None,
+                        help="merge centers sharing a grid cell of this size, 0 for exact duplicates")
+    args = parser.parse_args()
+
+    time_start = time.perf_counter()
+    gaussians = gaussian_representation.from_ply(args.ply)
+    pruned, report = prune(gaussians, args.min_opacity, args.min_scale, args.dedup_radius)
+    util.logger.info(f"{report} in {time.perf_counter() - time_start:.2f} s")
+    gaussian_representation.save_ply(args.output, pruned)
+    util.logger.info(f"Wrote {len(pruned)} splats to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Non-interactive rendering of a camera path.
+
+    python render_path.py scene.ply path.json --out frames/ [--video turntable.mp4] [--renderer cpu]
+
+path.json is a list of cameras keyed like Camera's fields:
+    [{"position": [x, y, z], "target": [x, y, z], "up": [x, y, z], "fovy": 1.57}, ...]
+up and fovy are optional. The depth sort of frame k + 1 runs on a SortWorker while
+frame k is uploaded, drawn and read back.
+"""
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+import imageio
+import numpy as np
+import util
+import ply_cache
+import splat_formats
+from camera import Camera
+from gaussian_renderer import sort_gaussians
+from sort_worker import SortWorker
+
+STAGES = ["load", "initial_upload", "sort", "sort_wait", "upload", "draw", "readback", "write"]
+
+
+def load_trajectory(path, width, height):
+    """
+    Reads a JSON camera path into Camera objects of the given resolution.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    cameras = []
+    for entry in entries:
+        camera = Camera(height, width)
+        camera.position[:] = entry["position"]
+        camera.target[:] = entry["target"]
+        if "up" in entry:
+            camera.up[:] = entry["up"]
+        if "fovy" in entry:
+            camera.fovy = float(entry["fovy"])
+        cameras.append(camera)
+    return cameras
+
+
+class OpenGLTarget:
+    """
+    Draws with OpenGLRenderer into an offscreen framebuffer of the path's resolution.
+    Needs a current GL 4.3 context.
+    """
+    def __init__(self, world_settings):
+        import OpenGL.GL as gl
+        self.gl = gl
+        self.world_settings = world_settings
+        camera = world_settings.world_camera
+        self.w, self.h = camera.w, camera.h
+        self.fbo = gl.glGenFramebuffers(1)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.fbo)
+        self.color = gl.glGenRenderbuffers(1)
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self.color)
+        gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, gl.GL_RGBA8, self.w, self.h)
+        gl.glFramebufferRenderbuffer(gl.GL_FRAMEBUFFER, gl.GL_COLOR_ATTACHMENT0, gl.GL_RENDERBUFFER, self.color)
+        world_settings.create_gaussian_renderer()
+
+    def set_gaussians(self, gaussians):
+        self.world_settings.gaussian_set = gaussians
+        self.world_settings.update_activated_render_state()
+        self.gl.glFinish()
+
+    def set_camera(self, camera):
+        world_camera = self.world_settings.world_camera
+        world_camera.position[:] = camera.position
+        world_camera.target[:] = camera.target
+        world_camera.up[:] = camera.up
+        world_camera.fovy = camera.fovy
+        self.world_settings.update_camera_pose()
+        self.world_settings.update_camera_intrin()
+
+    def upload_order(self, index):
+        self.world_settings.gauss_renderer.update_order(index)
+
+    def draw(self):
+        gl = self.gl
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.fbo)
+        gl.glViewport(0, 0, self.w, self.h)
+        gl.glClearColor(0, 0, 0, 1.0)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+        self.world_settings.gauss_renderer.draw()
+        gl.glFinish()
+
+    def readback(self):
+        gl = self.gl
+        data = gl.glReadPixels(0, 0, self.w, self.h, gl.GL_RGB, gl.GL_UNSIGNED_BYTE)
+        return np.frombuffer(data, np.uint8).reshape(self.h, self.w, 3)[::-1]
+
+    def close(self):
+        renderer = self.world_settings.gauss_renderer
+        if renderer.sort_worker is not None:
+            renderer.sort_worker.stop()
+        self.gl.glDeleteFramebuffers(1, [self.fbo])
+        self.gl.glDeleteRenderbuffers(1, [self.color])
+
+
+class CpuTarget:
+    """
+    Draws with the headless CpuRenderer.
+    """
+    def __init__(self, width, height, num_workers=None):
+        from cpu_renderer import CpuRenderer
+        self.renderer = CpuRenderer(width, height, num_workers=num_workers)
+
+    def set_gaussians(self, gaussians):
+        self.renderer.update_gaussian_data(gaussians)
+
+    def set_camera(self, camera):
+        self.renderer.set_camera(camera)
+
+    def upload_order(self, index):
+        self.renderer.order = index[:, 0]
+
+    def draw(self):
+        self.renderer.draw()
+
+    def readback(self):
+        return np.clip(self.renderer.image * 255.0 + 0.5, 0, 255).astype(np.uint8)
+
+    def close(self):
+        self.renderer.close()
+
+
+def create_gl_context(width, height):
+    """
+    Creates a hidden GLFW window whose context the OpenGL target renders with.
+    """
+    import glfw
+    if not glfw.init():
+        raise RuntimeError("Could not initialize GLFW")
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 4)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+    window = glfw.create_window(width, height, "Cosmos", None, None)
+    if not window:
+        glfw.terminate()
+        raise RuntimeError("Could not create a GL 4.3 context")
+    glfw.make_context_current(window)
+    return window
+
+
+class FrameWriter:
+    """
+    Writes frames as numbered PNGs and/or appends them to a video through imageio.
+    """
+    def __init__(self, out_dir=None, video=None, fps=30):
+        self.out_dir = out_dir
+        self.video = None
+        if out_dir is not None:
+            os.makedirs(out_dir, exist_ok=True)
+        if video is not None:
+            self.video = imageio.get_writer(video, fps=fps)
+
+    def write(self, index, frame):
+        if self.out_dir is not None:
+            imageio.imwrite(os.path.join(self.out_dir, f"frame_{index:05d}.png"), frame)
+        if self.video is not None:
+            self.video.append_data(frame)
+
+    def close(self):
+        if self.video is not None:
+            self.video.close()
+
+
+def render_path(target, gaussians, cameras, writer=None):
+    """
+    Renders every camera of the path and returns {stage: [seconds per frame]}.
+    The sort for the next frame is submitted before the current one is drawn.
+    The one-off upload of the Gaussians is kept apart as "initial_upload", so
+    "upload" only holds the per-frame order uploads.
+    """
+    timings = defaultdict(list)
+    start = time.perf_counter()
+    target.set_gaussians(gaussians)
+    timings["initial_upload"].append(time.perf_counter() - start)
+
+    worker = SortWorker(sort_gaussians)
+    try:
+        worker.submit(gaussians, cameras[0].get_view_matrix(), 0)
+        for k, camera in enumerate(cameras):
+            t0 = time.perf_counter()
+            result = worker.wait()
+            if result is None:
+                raise RuntimeError(f"Sort for frame {k} failed")
+            t1 = time.perf_counter()
+            if k + 1 < len(cameras):
+                worker.submit(gaussians, cameras[k + 1].get_view_matrix(), k + 1)
+
+            target.set_camera(camera)
+            target.upload_order(result.index)
+            t2 = time.perf_counter()
+            target.draw()
+            t3 = time.perf_counter()
+            frame = target.readback()
+            t4 = time.perf_counter()
+            if writer is not None:
+                writer.write(k, frame)
+            t5 = time.perf_counter()
+
+            timings["sort"].append(result.latency)
+            timings["sort_wait"].append(t1 - t0)
+            timings["upload"].append(t2 - t1)
+            timings["draw"].append(t3 - t2)
+            timings["readback"].append(t4 - t3)
+            timings["write"].append(t5 - t4)
+    finally:
+        worker.stop()
+    timings["total"].append(time.perf_counter() - start)
+    return timings
+
+
+def report(timings, num_frames):
+    """
+    Logs per-stage mean, median and total times and the overall frame rate.
+    Returns the same numbers as a dict.
+    """
+    summary = {}
+    for stage in STAGES:
+        values = np.array(timings.get(stage, [0.0]))
+        summary[stage] = {"mean_ms": values.mean() * 1000, "median_ms": np.median(values) * 1000,
+                          "total_s": values.sum()}
+        util.logger.info(f"{stage:>10}: mean {summary[stage]['mean_ms']:8.2f} ms  "
+                         f"median {summary[stage]['median_ms']:8.2f} ms  total {summary[stage]['total_s']:7.2f} s")
+    total = timings["total"][0]
+    summary["frames"] = num_frames
+    summary["fps"] = num_frames / total if total > 0 else 0.0
+    util.logger.info(f"{num_frames} frames in {total:.2f} s: {summary['fps']:.2f} FPS")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a PLY scene along a camera path.")
+    parser.add_argument("ply")
+    parser.add_argument("path", help="JSON list of {position, target, up, fovy}")
+    parser.add_argument("--out", default=None, help="directory for frame_XXXXX.png")
+    parser.add_argument("--video", default=None, help="video file, written through imageio")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--renderer", choices=["opengl", "cpu"], default="opengl")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size of the cpu renderer")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the preprocessed PLY cache")
+    parser.add_argument("--sh-degree", type=int, choices=range(4), default=None,
+                        help="load only the SH bands up to this degree")
+    parser.add_argument("--report", default=None, help="write the timing summary as JSON")
+    args = parser.parse_args()
+
+    cameras = load_trajectory(args.path, args.width, args.height)
+    if not cameras:
+        parser.error("the camera path is empty")
+
+    start = time.perf_counter()
+    if args.no_cache or not args.ply.lower().endswith(".ply"):
+        gaussians = splat_formats.load(args.ply, args.sh_degree)
+    else:
+        gaussians = ply_cache.load(args.ply, args.sh_degree)
+    load_time = time.perf_counter() - start
+    util.logger.info(f"Loaded {len(gaussians)} Gaussians in {load_time:.2f} s")
+
+    if args.renderer == "opengl":
+        from worldsettings import WorldSettings
+        create_gl_context(args.width, args.height)
+        world_settings = WorldSettings()
+        world_settings.world_camera.w, world_settings.world_camera.h = args.width, args.height
+        target = OpenGLTarget(world_settings)
+    else:
+        target = CpuTarget(args.width, args.height, args.workers)
+
+    writer = FrameWriter(args.out, args.video, args.fps)
+    try:
+        timings = render_path(target, gaussians, cameras, writer)
+    finally:
+        writer.close()
+        target.close()
+    timings["load"] = [load_time]
+    summary = report(timings, len(cameras))
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Scene of several Gaussian models, each placed with its own model matrix.
+
+All objects live in one merged row buffer, the flat() layout of
+GaussianData. Every object owns a contiguous range of rows. Removing an
+object returns its range to a free list that later objects reuse, so adding
+or removing one object never moves or re-uploads the others. Object ids are
+reused the same way, which keeps the transform table as small as the largest
+number of objects alive at once.
+"""
+import heapq
+import itertools
+from dataclasses import dataclass
+import numpy as np
+import util
+from gaussian_representation import GaussianData
+
+
+@dataclass
+class SceneObject:
+    id: int
+    name: str
+    gaussians: GaussianData
+    transform: np.ndarray  # 4x4 model matrix, row-major like np.array(glm.mat4)
+    offset: int            # first row in the merged buffer
+    count: int
+
+
+class ScenePoints:
+    """
+    World-space centers of every live Gaussian in the scene, in the form the sort
+    backends expect. slots maps each point to its row in the merged buffer.
+    """
+    def __init__(self, xyz, slots, scene=None, objects=()):
+        self.xyz = xyz
+        self.slots = slots
+        self.scene = scene      # the Scene these points were taken from
+        self.objects = objects  # SceneObjects whose points follow each other, in order
+
+    def live(self) -> np.ndarray:
+        """
+        Boolean mask of the points whose object is still in the scene. Rows of
+        removed objects may already hold another object's Gaussians.
+        """
+        if self.scene is None:
+            return np.ones(len(self.xyz), dtype=bool)
+        alive = [self.scene.objects.get(obj.id) is obj for obj in self.objects]
+        return np.repeat(alive, [obj.count for obj in self.objects]).astype(bool)
+
+    def __len__(self):
+        return len(self.xyz)
+
+
+class Scene:
+    def __init__(self, sh_dim=None, max_sh_dim=None):
+        self.objects = {}       # id -> SceneObject, in insertion order
+        self.sh_dim = sh_dim    # fixed by the first object unless given
+        self.max_sh_dim = max_sh_dim  # cap on the SH floats kept per row, see set_max_sh_dim()
+        self.capacity = 0       # rows spanned by the merged buffer
+        self.free_ranges = []   # sorted, non-adjacent (offset, count)
+        self.version = 0        # bumped on every change, renderers compare it
+        self._ids = itertools.count()
+        self._free_ids = []     # heap of ids released by remove()
+        self._points = None
+
+    def __len__(self):
+        return sum(obj.count for obj in self.objects.values())
+
+    @property
+    def row_dim(self):
+        return 11 + self.sh_dim
+
+    def _allocate(self, count):
+        for i, (offset, size) in enumerate(self.free_ranges):
+            if size >= count:
+                if size == count:
+                    del self.free_ranges[i]
+                else:
+                    self.free_ranges[i] = (offset + count, size - count)
+                return offset
+        # Grow at the end, absorbing a trailing free range.
+        offset = self.capacity
+        if self.free_ranges and sum(self.free_ranges[-1]) == self.capacity:
+            offset = self.free_ranges.pop()[0]
+        self.capacity = offset + count
+        return offset
+
+    def _release(self, offset, count):
+        ranges = sorted(self.free_ranges + [(offset, count)])
+        merged = []
+        for start, size in ranges:
+            if merged and sum(merged[-1]) == start:
+                merged[-1] = (merged[-1][0], merged[-1][1] + size)
+            else:
+                merged.append((start, size))
+        self.free_ranges = merged
+
+    def _changed(self):
+        self.version += 1
+        self._points = None
+
+    def rows(self, obj: SceneObject) -> np.ndarray:
+        """
+        flat() rows of an object, with its SH padded or cut to the scene's sh_dim.
+        """
+        flat = obj.gaussians.flat()
+        if flat.shape[-1] == self.row_dim:
+            return flat
+        rows = np.zeros((obj.count, self.row_dim), dtype=np.float32)
+        width = min(flat.shape[-1], self.row_dim)
+        rows[:, :width] = flat[:, :width]
+        return rows
+
+    def add(self, gaussians: GaussianData, transform=None, name=None) -> SceneObject:
+        if self.sh_dim is None:
+            self.sh_dim = gaussians.sh_dim if self.max_sh_dim is None else min(gaussians.sh_dim, self.max_sh_dim)
+        elif gaussians.sh_dim > self.sh_dim and self.sh_dim != self.max_sh_dim:
+            util.logger.warning(f"Truncating SH of '{name}' from {gaussians.sh_dim} to the scene's {self.sh_dim} coefficients")
+        object_id = heapq.heappop(self._free_ids) if self._free_ids else next(self._ids)
+        transform = np.eye(4, dtype=np.float32) if transform is None else np.asarray(transform, dtype=np.float32)
+        obj = SceneObject(object_id, name or f"object {object_id}", gaussians, transform,
+                          self._allocate(len(gaussians)), len(gaussians))
+        self.objects[object_id] = obj
+        self._changed()
+        return obj
+
+    def remove(self, obj: SceneObject):
+        del self.objects[obj.id]
+        heapq.heappush(self._free_ids, obj.id)
+        self._release(obj.offset, obj.count)
+        self._changed()
+
+    def set_transform(self, obj: SceneObject, transform):
+        obj.transform = np.asarray(transform, dtype=np.float32)
+        self._changed()
+
+    def set_max_sh_dim(self, max_sh_dim):
+        """
+        Caps the SH floats kept per row, or lifts the cap with None. The row width
+        follows the widest object under the cap, so renderers re-upload every object.
+        """
+        self.max_sh_dim = max_sh_dim
+        if self.objects:
+            widest = max(obj.gaussians.sh_dim for obj in self.objects.values())
+            self.sh_dim = widest if max_sh_dim is None else min(widest, max_sh_dim)
+        self._changed()
+
+    def clear(self):
+        self.objects.clear()
+        self.free_ranges = []
+        self.capacity = 0
+        self._ids = itertools.count()
+        self._free_ids = []
+        self._changed()
+
+    def transforms(self) -> np.ndarray:
+        """
+        (max id + 1, 2, 4, 4) model matrices and their inverses indexed by object id,
+        identity for ids no longer in use. A reused id belongs to an object with rows
+        of its own, so renderers must re-upload the per-row ids of every object they
+        have not seen, not of every id.
+        """
+        size = max(self.objects, default=0) + 1
+        models = np.tile(np.eye(4), (size, 1, 1))
+        for obj in self.objects.values():
+            models[obj.id] = obj.transform
+        return np.stack([models, np.linalg.inv(models)], axis=1).astype(np.float32)
+
+    def points(self) -> ScenePoints:
+        """
+        World-space centers for the global sort. Cached until the scene changes, so
+        camera motion alone reuses the same object and the incremental sorter stays warm.
+        """
+        if self._points is None:
+            xyz, slots = [], []
+            for obj in self.objects.values():
+                m = obj.transform
+                xyz.append(np.asarray(obj.gaussians.xyz) @ m[:3, :3].T + m[:3, 3])
+                slots.append(np.arange(obj.offset, obj.offset + obj.count, dtype=np.int32))
+            if xyz:
+                self._points = ScenePoints(np.concatenate(xyz).astype(np.float32), np.concatenate(slots), self,
+                                           list(self.objects.values()))
+            else:
+                self._points = ScenePoints(np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int32), self)
+        return self._points
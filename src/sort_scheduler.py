@@ -0,0 +1,166 @@
+"""
+Decides once per frame whether auto-sort has to sort again.
+
+Re-sorting every frame spends a full sort on views that barely changed. The
+scheduler compares the current view with the one the last sort was requested
+for and sorts when
+    - the camera rotated by more than `max_angle`, or moved by more than
+      `max_translation` times the scene extent,
+    - the estimated ordering error crosses `max_inversion_rate`: a random subset
+      of the drawn order is kept, in draw order, and the share of its pairs that
+      the current view puts in the wrong order is taken as the error. Neighbours
+      in the full order are near ties that flip on any motion, so pairs across
+      the whole subset are compared rather than consecutive splats,
+    - the camera has rested for `rest_delay` seconds away from the sorted view,
+      so the image it stays on is drawn in the exact order,
+    - or the camera moved at all and the last frame left enough of `frame_budget`
+      to absorb another sort.
+A still camera never triggers a sort; invalidate() forces one after a setting
+changed what the sort selects.
+"""
+import time
+from collections import Counter
+import numpy as np
+from sorting import rotation_angle, view_depth
+
+
+class SortScheduler:
+    def __init__(self, max_angle=np.radians(5.0), max_translation=0.05, max_inversion_rate=0.005,
+                 frame_budget=1 / 60, rest_delay=0.1, sample_size=1024, seed=0):
+        self.max_angle = max_angle                    # radians of rotation since the last sort
+        self.max_translation = max_translation        # camera travel as a fraction of the scene extent
+        self.max_inversion_rate = max_inversion_rate  # share of the sampled subset drawn out of order
+        self.frame_budget = frame_budget              # seconds per frame, None never sorts for spare time
+        self.rest_delay = rest_delay                  # seconds without motion before a settling sort
+        self.sample_size = sample_size                # splats of the drawn order whose pairs are checked
+        self.sorts_performed = 0
+        self.sorts_skipped = 0
+        self.reasons = Counter()   # sorts performed by cause, see _reason()
+        self.sort_cost = 0.0       # seconds the last sort took on the render thread
+        self.rng = np.random.default_rng(seed)
+        # Motion and error measured by the last should_sort() call, for display.
+        self.angle = 0.0
+        self.translation = 0.0
+        self.inversion_rate = 0.0
+        self.reset()
+
+    def reset(self):
+        self._gaussians = None
+        self._scale = 1.0
+        self._view = None
+        self._cam_pos = None
+        self._subset = None        # (sample_size, 3) centers of a random subset of the drawn order
+        self._last_call = None
+        self._prev_view = None     # view of the previous should_sort() call
+        self._moved_at = None      # time the view last changed
+
+    def invalidate(self):
+        """
+        Forces a sort on the next should_sort() call.
+        """
+        self._view = None
+
+    @staticmethod
+    def scene_scale(xyz, sample=1 << 16, rng=None) -> float:
+        """
+        Diagonal of the 1st to 99th percentile box of the centers, so far-away
+        floaters do not inflate the scale.
+        """
+        xyz = np.asarray(xyz)
+        if len(xyz) == 0:
+            return 1.0
+        if len(xyz) > sample:
+            rng = rng if rng is not None else np.random.default_rng(0)
+            xyz = xyz[rng.integers(0, len(xyz), sample)]
+        lo, hi = np.percentile(xyz, [1, 99], axis=0)
+        return max(float(np.linalg.norm(hi - lo)), 1e-6)
+
+    def should_sort(self, gaussians, view_mat, cam_pos) -> bool:
+        """
+        Returns whether the order should be recomputed for this view and counts the decision.
+        """
+        now = time.perf_counter()
+        frame_time = None if self._last_call is None else now - self._last_call
+        self._last_call = now
+        view_mat = np.asarray(view_mat, dtype=np.float32)
+        if self._prev_view is None or not np.array_equal(view_mat, self._prev_view):
+            self._moved_at = now
+            self._prev_view = view_mat.copy()
+        at_rest = now - self._moved_at >= self.rest_delay
+        reason = self._reason(gaussians, view_mat, np.asarray(cam_pos), frame_time, at_rest)
+        if reason is None:
+            self.sorts_skipped += 1
+            return False
+        self.sorts_performed += 1
+        self.reasons[reason] += 1
+        return True
+
+    def _reason(self, gaussians, view_mat, cam_pos, frame_time, at_rest):
+        if gaussians is not self._gaussians:
+            return "new set"
+        if self._view is None:
+            return "invalidated"
+        if np.array_equal(view_mat, self._view):
+            self.angle = self.translation = self.inversion_rate = 0.0
+            return None
+        self.angle = rotation_angle(self._view, view_mat)
+        self.translation = float(np.linalg.norm(cam_pos - self._cam_pos)) / self._scale
+        if at_rest:
+            return "at rest"
+        if self.angle > self.max_angle:
+            return "rotation"
+        if self.translation > self.max_translation:
+            return "translation"
+        self.inversion_rate = self.estimate_inversion_rate(view_mat)
+        if self.inversion_rate > self.max_inversion_rate:
+            return "inversions"
+        if (self.frame_budget is not None and frame_time is not None
+                and frame_time + self.sort_cost <= self.frame_budget):
+            return "budget"
+        return None
+
+    @property
+    def settling(self) -> bool:
+        """
+        True while the last seen view differs from the sorted one, i.e. a settling
+        sort is still to come once the camera rests.
+        """
+        return (self._view is None or self._prev_view is None
+                or not np.array_equal(self._view, self._prev_view))
+
+    def estimate_inversion_rate(self, view_mat) -> float:
+        """
+        Share of the pairs of the sampled subset that the current view puts out of
+        back-to-front order, an estimate of the normalized Kendall tau distance
+        between the drawn order and the correct one.
+        """
+        if self._subset is None or len(self._subset) < 2:
+            return 0.0
+        depth = view_depth(self._subset, view_mat)
+        k = len(depth)
+        inverted = np.count_nonzero(np.triu(depth[:, None] > depth[None, :], 1))
+        return float(inverted) / (k * (k - 1) // 2)
+
+    def sort_requested(self, gaussians, view_mat, cam_pos):
+        """
+        Makes this view the reference for the motion thresholds. Called for every
+        sort, including the ones not triggered by the scheduler.
+        """
+        if gaussians is not self._gaussians:
+            self._gaussians = gaussians
+            self._scale = self.scene_scale(gaussians.xyz, rng=self.rng)
+            self._subset = None
+        self._view = np.asarray(view_mat, dtype=np.float32).copy()
+        self._cam_pos = np.asarray(cam_pos, dtype=np.float64).copy()
+
+    def order_uploaded(self, xyz, index):
+        """
+        Keeps the centers of a random subset of the order now being drawn, in draw
+        order, for estimate_inversion_rate().
+        """
+        index = np.asarray(index).reshape(-1)
+        if len(index) <= self.sample_size:
+            picked = index
+        else:
+            picked = index[np.sort(self.rng.choice(len(index), self.sample_size, replace=False))]
+        self._subset = np.asarray(xyz)[picked].astype(np.float32)
@@ -0,0 +1,111 @@
+"""
+Background depth sorting so the render loop never waits for a sort.
+"""
+import threading
+import time
+from dataclasses import dataclass
+import numpy as np
+import util
+from profiler import profiler
+
+
+@dataclass
+class SortResult:
+    gaussians: object    # the GaussianData the order belongs to
+    index: np.ndarray    # (N, 1) int32 back-to-front order
+    frame: int           # frame whose view matrix produced the order
+    latency: float       # seconds from submission to completion
+
+
+class SortWorker:
+    """
+    Sorts on a daemon thread. Only the newest request is kept: submitting while
+    a request is still pending replaces it, so the worker always sorts for the
+    latest camera and never builds a backlog.
+    """
+    def __init__(self, sort_fn):
+        self.sort_fn = sort_fn  # (gaussianset, view) -> (N, 1) int32
+        self.dropped = 0
+        self.failed = 0
+        self._cond = threading.Condition()
+        self._request = None
+        self._result = None
+        self._sorting = False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="sort-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, gaussians, view, frame):
+        """
+        Queues a sort. view is whatever camera state sort_fn expects; the caller
+        must not modify it afterwards.
+        """
+        with self._cond:
+            if self._request is not None:
+                self.dropped += 1
+            self._request = (gaussians, view, frame, time.perf_counter())
+            self._cond.notify_all()
+
+    def poll(self):
+        """
+        Returns the newest finished SortResult, or None if nothing finished since the last poll.
+        """
+        with self._cond:
+            result, self._result = self._result, None
+        return result
+
+    def wait(self, timeout=None):
+        """
+        Blocks until a sort finishes and returns it like poll(), or None if the
+        sort failed or the timeout expired.
+        """
+        with self._cond:
+            failed = self.failed
+            self._cond.wait_for(lambda: self._result is not None or self.failed != failed, timeout)
+            result, self._result = self._result, None
+        return result
+
+    @property
+    def busy(self):
+        with self._cond:
+            return self._request is not None
+
+    @property
+    def pending(self):
+        """
+        True while a sort is queued or running, or finished but not yet polled.
+        """
+        with self._cond:
+            return self._request is not None or self._sorting or self._result is not None
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._request is None and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                gaussians, view, frame, submitted = self._request
+                self._request = None
+                self._sorting = True
+            try:
+                with profiler.scope("sort_async"):
+                    index = self.sort_fn(gaussians, view)
+            except Exception as e:
+                util.logger.error(f"Background sort failed: {e}")
+                with self._cond:
+                    self.failed += 1
+                    self._sorting = False
+                    self._cond.notify_all()
+                continue
+            result = SortResult(gaussians, index, frame, time.perf_counter() - submitted)
+            with self._cond:
+                self._result = result
+                self._sorting = False
+                self._cond.notify_all()
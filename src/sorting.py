@@ -0,0 +1,204 @@
+"""
+CPU depth-sorting engines used by gaussian_renderer.
+
+Every engine follows the (gaussianset, view_mat, subset=None) -> (N, 1) int32
+index contract of the _sort_gaussian_* functions and orders splats back to front.
+With a subset, only those rows are sorted and the index points into subset.
+"""
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def subset_xyz(gaussianset, subset=None) -> np.ndarray:
+    xyz = np.asarray(gaussianset.xyz)
+    return xyz if subset is None else xyz[subset]
+
+
+def view_depth(xyz, view_mat) -> np.ndarray:
+    """
+    View-space z of every center, computed as one matrix-vector product instead
+    of a batched 3x3 matmul over an (N, 3, 1) temporary.
+    """
+    view_mat = np.asarray(view_mat, dtype=np.float32)
+    depth = np.asarray(xyz) @ view_mat[2, :3]
+    depth += view_mat[2, 3]
+    return depth
+
+
+def rotation_angle(view_a, view_b) -> float:
+    """
+    Angle in radians of the relative rotation between two view matrices.
+    """
+    r = np.asarray(view_a)[:3, :3] @ np.asarray(view_b)[:3, :3].T
+    return float(np.arccos(np.clip((np.trace(r) - 1) / 2, -1.0, 1.0)))
+
+
+class IncrementalSorter:
+    """
+    Keeps the previous permutation and reuses it while the camera moves a little.
+
+    After a small motion the old order is still sorted up to small inversions. The
+    order is reused as is when no inversion is deeper than `tolerance` (relative to
+    the depth range), and repaired when few splats are out of place: the displaced
+    ones are pulled out, sorted on their own and inserted back with a binary search.
+    A full argsort runs only on large rotations or when many splats moved.
+    """
+    def __init__(self, tolerance=1e-3, max_repair=0.05, max_angle=np.radians(20)):
+        self.tolerance = tolerance    # accepted inversion depth, as a fraction of the depth range
+        self.max_repair = max_repair  # fraction of displaced splats above which a full sort is cheaper
+        self.max_angle = max_angle    # rotation since the last call that forces a full sort
+        self.skipped = 0
+        self.repaired = 0
+        self.full_sorts = 0
+        self.reset()
+
+    def reset(self):
+        self.order = None
+        self.last_view = None
+        # The order belongs to this set and subset. A weak reference, not id(): ids of
+        # freed sets are reused, and the set must not be kept alive by the sorter.
+        self._gaussians = None
+        self._subset = None
+
+    def _same_input(self, gaussianset, subset):
+        if self._gaussians is None or self._gaussians() is not gaussianset:
+            return False
+        if subset is None or self._subset is None:
+            return subset is None and self._subset is None
+        return np.array_equal(subset, self._subset)
+
+    def _full_sort(self, depth):
+        self.order = np.argsort(depth).astype(np.int32)
+        self.full_sorts += 1
+
+    def _repair(self, keys):
+        """
+        Returns False when too many splats are displaced for a repair to pay off.
+        """
+        if len(keys) < 2:
+            self.skipped += 1
+            return True
+        tol = self.tolerance * (keys.max() - keys.min())
+        # A splat is displaced when something after it is closer to the back than itself.
+        suffix_min = np.minimum.accumulate(keys[::-1])[::-1]
+        displaced = np.zeros(len(keys), dtype=bool)
+        displaced[:-1] = keys[:-1] > suffix_min[1:] + tol
+        n_displaced = np.count_nonzero(displaced)
+        if n_displaced == 0:
+            self.skipped += 1
+            return True
+        if n_displaced > self.max_repair * len(keys):
+            return False
+
+        kept = ~displaced
+        moved_keys = keys[displaced]
+        moved_sort = np.argsort(moved_keys)
+        positions = np.searchsorted(keys[kept], moved_keys[moved_sort])
+        self.order = np.insert(self.order[kept], positions, self.order[displaced][moved_sort])
+        self.repaired += 1
+        return True
+
+    def __call__(self, gaussianset, view_mat, subset=None):
+        view_mat = np.asarray(view_mat, dtype=np.float32)
+        depth = view_depth(subset_xyz(gaussianset, subset), view_mat)
+
+        if (not self._same_input(gaussianset, subset) or self.order is None or len(self.order) != len(depth)
+                or rotation_angle(self.last_view, view_mat) > self.max_angle
+                or not self._repair(depth[self.order])):
+            self._gaussians = weakref.ref(gaussianset)
+            self._subset = None if subset is None else np.array(subset)
+            self._full_sort(depth)
+        self.last_view = view_mat
+        return self.order.reshape(-1, 1)
+
+
+def quantize_depth(depth, bits=16) -> np.ndarray:
+    """
+    Maps depths linearly onto unsigned integer keys spanning [min, max].
+    """
+    dtype = np.uint16 if bits <= 16 else np.uint32
+    # float32 cannot resolve 32-bit keys, so the wider quantization works in float64.
+    ftype = np.float32 if bits <= 16 else np.float64
+    lo = depth.min()
+    span = float(depth.max() - lo)
+    top = (1 << bits) - 1
+    keys = (depth.astype(ftype, copy=False) - ftype(lo)) * ftype(top / span if span > 0 else 0.0)
+    np.clip(keys, 0, top, out=keys)
+    return keys.astype(dtype)
+
+
+class RadixSorter:
+    """
+    Radix sort over quantized depth keys, parallelized on a thread pool.
+
+    The first pass partitions the keys by their top 8 bits: every chunk builds a
+    histogram, the histograms become per-chunk output offsets, and each chunk
+    scatters its elements into disjoint slots. The 256 buckets are then finished
+    independently by NumPy's own sort on the remaining low bits (an LSD radix sort
+    for 8-bit digits). NumPy releases the GIL inside these kernels, so both stages
+    scale across cores.
+    """
+    def __init__(self, bits=16, num_threads=None, min_chunk=1 << 16):
+        self.bits = bits
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.min_chunk = min_chunk
+        self._pool = ThreadPoolExecutor(max_workers=self.num_threads) if self.num_threads > 1 else None
+
+    def _map(self, fn, *iterables):
+        if self._pool is None:
+            return list(map(fn, *iterables))
+        return list(self._pool.map(fn, *iterables))
+
+    def _split(self, n, num_parts):
+        bounds = np.linspace(0, n, num_parts + 1).astype(np.int64)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def argsort(self, keys) -> np.ndarray:
+        n = len(keys)
+        low_bits = self.bits - 8
+        top = (keys >> keys.dtype.type(low_bits)).astype(np.uint8)
+        low = keys & keys.dtype.type((1 << low_bits) - 1)
+        if low_bits <= 8:
+            low = low.astype(np.uint8)
+
+        # Pass 1: partition by the top digit.
+        chunks = self._split(n, max(1, min(self.num_threads, n // self.min_chunk)))
+        hist = np.stack(self._map(lambda c: np.bincount(top[c[0]:c[1]], minlength=256), chunks))
+        bucket_start = np.concatenate([[0], np.cumsum(hist.sum(axis=0))])
+        offsets = bucket_start[None, :-1] + np.cumsum(hist, axis=0) - hist
+
+        index = np.empty(n, dtype=np.int32)
+        part_low = np.empty_like(low)
+
+        def scatter(c, offset):
+            lo, hi = c
+            digits = top[lo:hi]
+            perm = np.argsort(digits, kind="stable")  # counting sort for uint8 keys
+            sorted_digits = digits[perm]
+            first = np.searchsorted(sorted_digits, np.arange(256, dtype=np.uint8))
+            dest = offset[sorted_digits] + (np.arange(hi - lo) - first[sorted_digits])
+            index[dest] = perm + lo
+            part_low[dest] = low[lo:hi][perm]
+
+        self._map(scatter, chunks, offsets)
+
+        # Pass 2: finish each bucket on its low bits, buckets spread over the pool.
+        # NumPy radix-sorts 8-bit keys when asked for a stable sort; wider keys use its
+        # vectorized quicksort, since the order of equal depths does not matter.
+        kind = "stable" if low_bits <= 8 else None
+
+        def finish(b):
+            lo, hi = bucket_start[b], bucket_start[b + 1]
+            if hi - lo > 1:
+                index[lo:hi] = index[lo:hi][np.argsort(part_low[lo:hi], kind=kind)]
+
+        self._map(finish, range(256))
+        return index
+
+    def __call__(self, gaussianset, view_mat, subset=None):
+        depth = view_depth(subset_xyz(gaussianset, subset), view_mat)
+        if len(depth) == 0:
+            return np.zeros((0, 1), dtype=np.int32)
+        return self.argsort(quantize_depth(depth, self.bits)).reshape(-1, 1)
@@ -0,0 +1,203 @@
+"""
+Spatial index over Gaussian centers for CPU frustum culling, and the Morton
+(Z-order) codes it, the LOD hierarchy and the chunked scenes are built on.
+"""
+import numpy as np
+
+MORTON_DEPTH = 10  # grid levels of morton_order(), 2^30 cells
+
+
+def _spread_bits(v):
+    """
+    Spreads the low 21 bits of v so that two zero bits separate consecutive bits.
+    """
+    v = v.astype(np.uint64) & np.uint64(0x1FFFFF)
+    v = (v | (v << np.uint64(32))) & np.uint64(0x1F00000000FFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x1F0000FF0000FF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x100F00F00F00F00F)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x10C30C30C30C30C3)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return v
+
+
+def morton_encode(cells) -> np.ndarray:
+    """
+    Interleaves (N, 3) integer cell coordinates into uint64 Z-order codes.
+    """
+    return _spread_bits(cells[:, 0]) | (_spread_bits(cells[:, 1]) << np.uint64(1)) | (_spread_bits(cells[:, 2]) << np.uint64(2))
+
+
+# _spread_bits of every 10-bit value, so grids up to 2^10 cells per axis are encoded by lookup.
+_SPREAD_10 = _spread_bits(np.arange(1 << 10))
+
+
+def bounding_cube(xyz):
+    """
+    Returns (lo, extent): the minimum corner and the largest side of the bounds of xyz.
+    """
+    if len(xyz) == 0:
+        return np.zeros(3, dtype=np.float32), 1.0
+    # Per column: reducing an (N, 3) array along axis 0 is several times slower.
+    lo = np.array([xyz[:, k].min() for k in range(3)], dtype=np.float32)
+    hi = np.array([xyz[:, k].max() for k in range(3)], dtype=np.float32)
+    return lo, max(float((hi - lo).max()), 1e-6)
+
+
+def morton_codes(xyz, depth, lo=None, extent=None) -> np.ndarray:
+    """
+    Z-order codes of the cells of a 2^depth grid over the cube (lo, extent),
+    the bounding cube of xyz by default. Codes of a coarser depth d are the
+    codes of depth > d shifted right by 3 * (depth - d).
+    """
+    xyz = np.asarray(xyz, dtype=np.float32)
+    if lo is None:
+        lo, extent = bounding_cube(xyz)
+    res = 1 << depth
+    cells = np.clip(((xyz - lo) / extent * res).astype(np.int64), 0, res - 1)
+    if depth > 10:
+        return morton_encode(cells)
+    return _SPREAD_10[cells[:, 0]] | (_SPREAD_10[cells[:, 1]] << np.uint64(1)) | (_SPREAD_10[cells[:, 2]] << np.uint64(2))
+
+
+def morton_order(xyz, depth=MORTON_DEPTH) -> np.ndarray:
+    """
+    Permutation that puts the centers into Z-order, so splats that are close in
+    space are close in memory. Every octree node over the bounding cube of the
+    reordered centers, down to `depth`, then covers one contiguous index range.
+    """
+    if len(xyz) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # Ties share a cell of the finest grid, so their order does not matter and no stable sort is needed.
+    return np.argsort(morton_codes(xyz, depth))
+
+
+def frustum_planes(clip_mat, margin=1.3) -> np.ndarray:
+    """
+    Returns (6, 4) planes (a, b, c, d) with a*x + b*y + c*z + d >= 0 inside the frustum
+    of clip_mat = projection @ view @ model. margin widens the NDC box the same way
+    the vertex shader's early culling does.
+    """
+    m = np.asarray(clip_mat, dtype=np.float64)
+    w = m[3] * margin
+    return np.stack([w + m[0], w - m[0], w + m[1], w - m[1], w + m[2], w - m[2]])
+
+
+def boxes_in_frustum(lo, hi, clip_mat, margin=1.3) -> np.ndarray:
+    """
+    Boolean mask of the axis-aligned boxes (lo, hi) that are not entirely outside
+    one of the frustum planes of clip_mat. Conservative: boxes near a frustum corner
+    may be kept although they miss it.
+    """
+    planes = frustum_planes(clip_mat, margin)
+    normals, offsets = planes[:, :3], planes[:, 3]
+    positive = np.where(normals[None] >= 0, hi[:, None], lo[:, None])
+    return ~np.any(np.einsum("npk,pk->np", positive, normals) + offsets < 0, axis=1)
+
+
+def _expand_ranges(starts, ends) -> np.ndarray:
+    """
+    Concatenates arange(s, e) for every (s, e) pair without a Python loop.
+    """
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return offsets + np.arange(total)
+
+
+class Octree:
+    """
+    Linear octree over Gaussian centers, built once per load.
+
+    Splats are sorted by the Morton code of their leaf cell, so every node covers
+    a contiguous range of `order`. Node bounds are padded by each splat's 3-sigma
+    radius so splats whose centers sit just outside the frustum are still kept.
+    For Gaussians already in morton_order(), `order` is the identity and `ordered`
+    is set: node ranges are ranges of the Gaussians themselves.
+    """
+    def __init__(self, xyz, scale, leaf_size=256, max_depth=MORTON_DEPTH):
+        xyz = np.asarray(xyz, dtype=np.float32)
+        n = len(xyz)
+        if n == 0:
+            self.depth, self.order, self.ordered, self.levels = 0, np.zeros(0, dtype=np.int32), True, []
+            return
+        self.depth = int(np.clip(np.ceil(np.log(max(n / leaf_size, 1)) / np.log(8)), 0, max_depth))
+        codes = morton_codes(xyz, self.depth)
+        self.order = np.argsort(codes, kind="stable").astype(np.int32)
+        self.ordered = bool(np.all(self.order == np.arange(n)))
+        codes = codes[self.order]
+
+        radius = 3 * np.asarray(scale, dtype=np.float32).max(axis=1, keepdims=True)
+        padded_lo = (xyz - radius)[self.order]
+        padded_hi = (xyz + radius)[self.order]
+
+        # Leaves: runs of equal codes.
+        starts = np.flatnonzero(np.concatenate([[True], codes[1:] != codes[:-1]]))
+        ends = np.concatenate([starts[1:], [n]])
+        level = {
+            "codes": codes[starts],
+            "lo": np.minimum.reduceat(padded_lo, starts, axis=0),
+            "hi": np.maximum.reduceat(padded_hi, starts, axis=0),
+            "start": starts, "end": ends,
+            "child_start": None, "child_end": None,
+        }
+        # Levels from the root (index 0) down to the leaves.
+        self.levels = [level]
+        for _ in range(self.depth):
+            child = self.levels[0]
+            parent_codes = child["codes"] >> np.uint64(3)
+            first = np.flatnonzero(np.concatenate([[True], parent_codes[1:] != parent_codes[:-1]]))
+            last = np.concatenate([first[1:], [len(parent_codes)]])
+            self.levels.insert(0, {
+                "codes": parent_codes[first],
+                "lo": np.minimum.reduceat(child["lo"], first, axis=0),
+                "hi": np.maximum.reduceat(child["hi"], first, axis=0),
+                "start": child["start"][first], "end": child["end"][last - 1],
+                "child_start": first, "child_end": last,
+            })
+
+    def query(self, clip_mat, margin=1.3) -> np.ndarray:
+        """
+        Returns the int32 indices of the Gaussians in nodes that intersect the frustum.
+        """
+        indices = _expand_ranges(*self.query_ranges(clip_mat, margin))
+        if self.ordered:
+            return indices.astype(np.int32)
+        return self.order[indices]
+
+    def query_ranges(self, clip_mat, margin=1.3):
+        """
+        Returns (starts, ends) of the runs of `order` in nodes that intersect the
+        frustum, in increasing order. With `ordered` these are row ranges.
+        """
+        if not self.levels:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        planes = frustum_planes(clip_mat, margin)
+        normals, offsets = planes[:, :3], planes[:, 3]
+        nodes = np.arange(len(self.levels[0]["codes"]))
+        starts, ends = [], []
+        for level in self.levels:
+            lo, hi = level["lo"][nodes], level["hi"][nodes]
+            # Per plane, the box corner furthest along (outside test) or against (inside test) the normal.
+            positive = np.where(normals[None] >= 0, hi[:, None], lo[:, None])
+            negative = np.where(normals[None] >= 0, lo[:, None], hi[:, None])
+            outside = np.any(np.einsum("npk,pk->np", positive, normals) + offsets < 0, axis=1)
+            inside = np.all(np.einsum("npk,pk->np", negative, normals) + offsets >= 0, axis=1)
+
+            done = inside | (level["child_start"] is None)
+            emit = nodes[done & ~outside]
+            starts.append(level["start"][emit])
+            ends.append(level["end"][emit])
+            refine = nodes[~done & ~outside]
+            if level["child_start"] is None or len(refine) == 0:
+                break
+            nodes = _expand_ranges(level["child_start"][refine], level["child_end"][refine])
+        starts, ends = np.concatenate(starts), np.concatenate(ends)
+        # Nodes emitted at different levels interleave; runs are disjoint, so sorting by start orders them.
+        by_start = np.argsort(starts, kind="stable")
+        starts, ends = starts[by_start], ends[by_start]
+        # Merge runs that touch into one.
+        first = np.concatenate([[True], starts[1:] != ends[:-1]])
+        last = np.concatenate([first[1:], [True]])
+        return starts[first], ends[last]
@@ -0,0 +1,212 @@
+"""
+Compact scene formats next to PLY: the 32-byte-per-splat .splat layout and SPZ v2.
+
+.splat (no SH, read through a memory map), one little-endian record per splat:
+    position   3 x float32
+    scale      3 x float32, activated
+    color      4 x uint8, RGB = (0.5 + SH_C0 * dc) * 255 and A = opacity * 255
+    rotation   4 x uint8, (w, x, y, z) * 128 + 128
+
+.spz (gzip stream), a 16-byte header followed by one block per attribute:
+    header     magic 0x5053474e, version 2, N (u32 each), SH degree, fractional bits,
+               flags, reserved (u8 each)
+    positions  N x 3 x 24-bit signed fixed point with `fractional bits` bits after the point
+    alphas     N x uint8, opacity * 255
+    colors     N x 3 x uint8, dc * 0.15 * 255 + 127.5
+    scales     N x 3 x uint8, (log(scale) + 10) * 16
+    rotations  N x 3 x uint8, (x, y, z) * 127.5 + 127.5 of the quaternion with w >= 0
+    sh         N x (rest coefficients) x 3 x uint8, coefficient-major, x * 128 + 128
+
+Coordinates are stored as they are, in the frame of the PLY they came from. The
+reference SPZ tools convert PLY input to a right-up-back frame; files written by
+them may therefore appear flipped here, and files written here in theirs.
+
+    python splat_formats.py scene.ply scene.spz [--sh-degree 1] [--morton-order]
+"""
+import argparse
+import gzip
+import os
+import time
+import numpy as np
+import util
+import gaussian_representation
+import spatial_index
+from gaussian_representation import GaussianData, sh_dim_for_degree
+from gaussian_math import SH_C0
+
+SPZ_MAGIC = 0x5053474E
+SPZ_VERSION = 2
+SPZ_COLOR_SCALE = 0.15
+_SPZ_HEADER = np.dtype([("magic", "<u4"), ("version", "<u4"), ("num_points", "<u4"), ("sh_degree", "u1"),
+                        ("fractional_bits", "u1"), ("flags", "u1"), ("reserved", "u1")])
+
+SPLAT_RECORD = np.dtype([("xyz", "<f4", 3), ("scale", "<f4", 3), ("rgba", "u1", 4), ("rot", "u1", 4)])
+
+
+def _to_u8(x):
+    return np.clip(np.rint(x), 0, 255).astype(np.uint8)
+
+
+def read_splat(path: str) -> GaussianData:
+    """
+    Reads a .splat file through a memory map into degree-0 GaussianData.
+    """
+    size = os.path.getsize(path)
+    if size % SPLAT_RECORD.itemsize:
+        raise ValueError(f"{path}: size is not a multiple of {SPLAT_RECORD.itemsize} bytes")
+    # An empty file cannot be memory-mapped.
+    records = np.memmap(path, dtype=SPLAT_RECORD, mode="r") if size else np.zeros(0, dtype=SPLAT_RECORD)
+    rgba = records["rgba"].astype(np.float32) / 255
+    rot = records["rot"].astype(np.float32) / 128 - 1
+    rot /= np.maximum(np.linalg.norm(rot, axis=-1, keepdims=True), 1e-12)
+    return GaussianData(np.array(records["xyz"], dtype=np.float32), rot,
+                        np.array(records["scale"], dtype=np.float32), rgba[:, 3:4],
+                        (rgba[:, :3] - 0.5) / SH_C0)
+
+
+def write_splat(path: str, gaussians: GaussianData):
+    """
+    Writes the DC color of the Gaussians as a .splat file; higher SH bands are dropped.
+    """
+    records = np.empty(len(gaussians), dtype=SPLAT_RECORD)
+    records["xyz"] = gaussians.xyz
+    records["scale"] = gaussians.scale
+    records["rgba"][:, :3] = _to_u8((0.5 + SH_C0 * np.asarray(gaussians.sh[:, :3])) * 255)
+    records["rgba"][:, 3] = _to_u8(np.asarray(gaussians.opacity[:, 0]) * 255)
+    rot = np.asarray(gaussians.rot, dtype=np.float32)
+    rot = rot / np.maximum(np.linalg.norm(rot, axis=-1, keepdims=True), 1e-12)
+    records["rot"] = np.clip(np.rint(rot * 128 + 128), 0, 255).astype(np.uint8)
+    records.tofile(path)
+
+
+def read_spz(path: str) -> GaussianData:
+    """
+    Reads an SPZ v2 file, gzip-compressed or not, into GaussianData.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    header = np.frombuffer(data, dtype=_SPZ_HEADER, count=1)[0]
+    if header["magic"] != SPZ_MAGIC:
+        raise ValueError(f"{path} is not an SPZ file")
+    if header["version"] != SPZ_VERSION:
+        raise ValueError(f"{path}: unsupported SPZ version {header['version']}, expected {SPZ_VERSION}")
+    n = int(header["num_points"])
+    n_rest = sh_dim_for_degree(int(header["sh_degree"])) - 3
+
+    offset = _SPZ_HEADER.itemsize
+    def block(width):
+        nonlocal offset
+        arr = np.frombuffer(data, dtype=np.uint8, count=n * width, offset=offset).reshape(n, width)
+        offset += n * width
+        return arr
+
+    packed = block(9).reshape(n, 3, 3).astype(np.int32)
+    fixed = packed[..., 0] | (packed[..., 1] << 8) | (packed[..., 2] << 16)
+    fixed -= (fixed & 0x800000) << 1  # sign-extend the 24-bit values
+    xyz = fixed.astype(np.float32) / (1 << int(header["fractional_bits"]))
+    opacity = block(1).astype(np.float32) / 255
+    dc = (block(3).astype(np.float32) / 255 - 0.5) / SPZ_COLOR_SCALE
+    scale = np.exp(block(3).astype(np.float32) / 16 - 10)
+    xyz_rot = block(3).astype(np.float32) / 127.5 - 1
+    w = np.sqrt(np.maximum(0, 1 - np.sum(xyz_rot * xyz_rot, axis=-1, keepdims=True)))
+    rot = np.concatenate([w, xyz_rot], axis=-1)
+    rot /= np.maximum(np.linalg.norm(rot, axis=-1, keepdims=True), 1e-12)
+    sh = np.empty((n, 3 + n_rest), dtype=np.float32)
+    sh[:, :3] = dc
+    sh[:, 3:] = (block(n_rest).astype(np.float32) - 128) / 128
+    return GaussianData(xyz, rot, scale, opacity, sh)
+
+
+def write_spz(path: str, gaussians: GaussianData, fractional_bits=12, compress=True):
+    """
+    Writes Gaussians as SPZ v2. Positions outside +-2^(23 - fractional_bits) are clamped.
+    """
+    n = len(gaussians)
+    sh_degree = min(gaussians.sh_degree, 3)
+    n_rest = sh_dim_for_degree(sh_degree) - 3
+    header = np.zeros(1, dtype=_SPZ_HEADER)
+    header[0] = (SPZ_MAGIC, SPZ_VERSION, n, sh_degree, fractional_bits, 0, 0)
+
+    xyz = np.asarray(gaussians.xyz, dtype=np.float64) * (1 << fractional_bits)
+    limit = (1 << 23) - 1
+    if np.any(np.abs(xyz) > limit):
+        util.logger.warning(f"Clamping positions beyond +-{limit / (1 << fractional_bits):.0f} "
+                            f"to fit {fractional_bits} fractional bits")
+    fixed = np.clip(np.rint(xyz), -limit, limit).astype("<i4")
+    positions = fixed.view(np.uint8).reshape(n, 3, 4)[..., :3]
+    rot = np.asarray(gaussians.rot, dtype=np.float32)
+    rot = rot / np.maximum(np.linalg.norm(rot, axis=-1, keepdims=True), 1e-12)
+    rot = rot * np.where(rot[:, :1] < 0, -1, 1)  # q and -q are the same rotation; keep w >= 0
+    sh = np.asarray(gaussians.sh, dtype=np.float32)
+
+    blocks = [
+        header.tobytes(),
+        np.ascontiguousarray(positions).tobytes(),
+        _to_u8(np.asarray(gaussians.opacity[:, 0]) * 255).tobytes(),
+        _to_u8(sh[:, :3] * (SPZ_COLOR_SCALE * 255) + 127.5).tobytes(),
+        _to_u8((np.log(np.maximum(np.asarray(gaussians.scale), 1e-30)) + 10) * 16).tobytes(),
+        _to_u8(rot[:, 1:] * 127.5 + 127.5).tobytes(),
+        _to_u8(sh[:, 3:3 + n_rest] * 128 + 128).tobytes(),
+    ]
+    opener = gzip.open if compress else open
+    with opener(path, "wb") as f:
+        for b in blocks:
+            f.write(b)
+
+
+READERS = {".splat": read_splat, ".spz": read_spz}
+WRITERS = {".splat": write_splat, ".spz": write_spz, ".ply": gaussian_representation.save_ply}
+
+
+def load(path: str, max_sh_degree=None) -> GaussianData:
+    """
+    Loads any supported scene file by its extension.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".ply":
+        return gaussian_representation.from_ply(path, max_sh_degree)
+    if ext not in READERS:
+        raise ValueError(f"Unsupported scene format '{ext}', expected .ply, .splat or .spz")
+    gaussians = READERS[ext](path)
+    return gaussians if max_sh_degree is None else gaussians.with_sh_degree(max_sh_degree)
+
+
+def save(path: str, gaussians: GaussianData):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"Unsupported scene format '{ext}', expected .ply, .splat or .spz")
+    WRITERS[ext](path, gaussians)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert between .ply, .splat and .spz scenes.")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--sh-degree", type=int, choices=range(4), default=None,
+                        help="keep only the SH bands up to this degree")
+    parser.add_argument("--fractional-bits", type=int, default=12, help="SPZ position precision")
+    parser.add_argument("--morton-order", action="store_true",
+                        help="write the splats in Z-order so the file loads with spatial locality")
+    args = parser.parse_args()
+
+    time_start = time.perf_counter()
+    gaussians = load(args.input, args.sh_degree)
+    if args.morton_order:
+        gaussians = gaussians.reordered(spatial_index.morton_order(gaussians.xyz))
+    load_time = time.perf_counter() - time_start
+    time_start = time.perf_counter()
+    if args.output.lower().endswith(".spz"):
+        write_spz(args.output, gaussians, args.fractional_bits)
+    else:
+        save(args.output, gaussians)
+    save_time = time.perf_counter() - time_start
+    in_size, out_size = os.path.getsize(args.input), os.path.getsize(args.output)
+    util.logger.info(f"{len(gaussians)} splats: {args.input} ({in_size / 2**20:.1f} MiB, read in {load_time:.2f} s) -> "
+                     f"{args.output} ({out_size / 2**20:.1f} MiB, {in_size / max(out_size, 1):.1f}x smaller, "
+                     f"written in {save_time:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
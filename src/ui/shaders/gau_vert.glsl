@@ -43,15 +43,56 @@ layout (std430, binding=0) buffer gaussian_data {
 layout (std430, binding=1) buffer gaussian_order {
 	int gi[];
 };
+// compact layout, see CompactGaussianData in gaussian_representation.py
+layout (std430, binding=2) buffer gaussian_packed {
+	uint p_data[];
+};
+layout (std430, binding=3) buffer sh_quant_range {
+	float q_range[];  // [chunk][sh rest index][min, max]
+};
+// structure-of-arrays layout, see GaussianData.soa()
+layout (std430, binding=4) buffer gaussian_pos_opacity {
+	vec4 s_pos_opacity[];
+};
+layout (std430, binding=5) buffer gaussian_rot {
+	vec4 s_rot[];
+};
+layout (std430, binding=6) buffer gaussian_scale {
+	vec4 s_scale[];
+};
+layout (std430, binding=7) buffer gaussian_sh {
+	vec4 s_sh[];
+};
 
-uniform mat4 view_matrix;
-uniform mat4 projection_matrix;
+// camera state, see OpenGLRenderer.camera_ubo; matrices are stored row by row
+layout (std140, row_major, binding=0) uniform camera_block {
+	mat4 view_matrix;
+	mat4 projection_matrix;
+	vec4 hfovxy_focal;  // xyz used
+	vec4 cam_pos;       // xyz used
+};
+// multi-object scenes, see Scene in scene.py
+layout (std430, binding=8) buffer gaussian_object {
+	uint g_object[];  // object id of every Gaussian
+};
+struct ObjectTransform {
+	mat4 model;
+	mat4 inv_model;
+};
+layout (std430, row_major, binding=9) buffer object_transforms {
+	ObjectTransform g_transforms[];  // indexed by object id
+};
 uniform mat4 model_matrix;
-uniform vec3 hfovxy_focal;
-uniform vec3 cam_pos;
+uniform mat4 inv_model_matrix;
+uniform int use_object_transforms;
 uniform int sh_dim;
 uniform float scale_modifier;
 uniform int render_mod;  // > 0 render 0-ith SH dim, -1 depth, -2 bill board, -3 gaussian
+uniform int data_layout;  // 0 interleaved float32, 1 compact, 2 structure of arrays
+uniform int sh_stride4;   // vec4s per Gaussian in gaussian_sh
+uniform int packed_stride;
+uniform int sh_rest_bits;
+uniform int sh_chunk_size;
 
 out vec3 color;
 out float alpha;
@@ -116,13 +157,94 @@ vec4 get_vec4(int offset)
 	return vec4(g_data[offset], g_data[offset + 1], g_data[offset + 2], g_data[offset + 3]);
 }
 
+vec3 get_pos(int boxid)
+{
+	if (data_layout == 2)
+		return s_pos_opacity[boxid].xyz;
+	if (data_layout == 1)
+	{
+		int start = boxid * packed_stride;
+		return uintBitsToFloat(uvec3(p_data[start], p_data[start + 1], p_data[start + 2]));
+	}
+	return get_vec3(boxid * (SH_IDX + sh_dim) + POS_IDX);
+}
+
+void get_shape(int boxid, out vec4 rot, out vec3 scale, out float opacity)
+{
+	if (data_layout == 2)
+	{
+		rot = s_rot[boxid];
+		scale = s_scale[boxid].xyz;
+		opacity = s_pos_opacity[boxid].w;
+		return;
+	}
+	if (data_layout == 1)
+	{
+		int start = boxid * packed_stride;
+		rot = unpackSnorm4x8(p_data[start + 3]);
+		vec2 sz_op = unpackHalf2x16(p_data[start + 5]);
+		scale = vec3(unpackHalf2x16(p_data[start + 4]), sz_op.x);
+		opacity = float((p_data[start + 5] >> 16) & 0xFFu) / 255.f;
+		return;
+	}
+	int start = boxid * (SH_IDX + sh_dim);
+	rot = get_vec4(start + ROT_IDX);
+	scale = get_vec3(start + SCALE_IDX);
+	opacity = g_data[start + OPACITY_IDX];
+}
+
+float get_sh_rest(int boxid, int start, int i)
+{
+	if (sh_rest_bits == 8)
+	{
+		uint code = (p_data[start + 8 + (i >> 2)] >> (8 * (i & 3))) & 0xFFu;
+		int range = ((boxid / sh_chunk_size) * (sh_dim - 3) + i) * 2;
+		return mix(q_range[range], q_range[range + 1], float(code) / 255.f);
+	}
+	vec2 pair = unpackHalf2x16(p_data[start + 8 + (i >> 1)]);
+	return (i & 1) == 0 ? pair.x : pair.y;
+}
+
+// k-th SH coefficient (rgb) of a Gaussian
+vec3 get_sh(int boxid, int k)
+{
+	if (data_layout == 2)
+	{
+		int e = k * 3;
+		int v = boxid * sh_stride4 + (e >> 2);
+		vec4 a = s_sh[v];
+		switch (e & 3)
+		{
+			case 0: return a.xyz;
+			case 1: return a.yzw;
+			case 2: return vec3(a.zw, s_sh[v + 1].x);
+			default: return vec3(a.w, s_sh[v + 1].xy);
+		}
+	}
+	if (data_layout == 1)
+	{
+		int start = boxid * packed_stride;
+		if (k == 0)
+			return vec3(unpackHalf2x16(p_data[start + 6]), unpackHalf2x16(p_data[start + 7]).x);
+		int i = (k - 1) * 3;
+		return vec3(get_sh_rest(boxid, start, i), get_sh_rest(boxid, start, i + 1), get_sh_rest(boxid, start, i + 2));
+	}
+	return get_vec3(boxid * (SH_IDX + sh_dim) + SH_IDX + k * 3);
+}
+
 void main()
 {
 	int boxid = gi[gl_InstanceID];
-	int total_dim = 3 + 4 + 3 + 1 + sh_dim;
-	int start = boxid * total_dim;
-	vec4 g_pos = vec4(get_vec3(start + POS_IDX), 1.f);
-    vec4 g_pos_model = model_matrix * g_pos;
+	vec4 g_pos = vec4(get_pos(boxid), 1.f);
+	mat4 model = model_matrix;
+	mat4 inv_model = inv_model_matrix;
+	if (use_object_transforms != 0)
+	{
+		ObjectTransform t = g_transforms[g_object[boxid]];
+		model = t.model;
+		inv_model = t.inv_model;
+	}
+    vec4 g_pos_model = model * g_pos;
 	vec4 g_pos_view = view_matrix * g_pos_model;
     vec4 g_pos_screen = projection_matrix * g_pos_view;
 	g_pos_screen.xyz = g_pos_screen.xyz / g_pos_screen.w;
@@ -133,9 +255,10 @@ void main()
 		gl_Position = vec4(-100, -100, -100, 1);
 		return;
 	}
-	vec4 g_rot = get_vec4(start + ROT_IDX);
-	vec3 g_scale = get_vec3(start + SCALE_IDX);
-	float g_opacity = g_data[start + OPACITY_IDX];
+	vec4 g_rot;
+	vec3 g_scale;
+	float g_opacity;
+	get_shape(boxid, g_rot, g_scale, g_opacity);
 
     mat3 cov3d = computeCov3D(g_scale * scale_modifier, g_rot);
     vec2 wh = 2 * hfovxy_focal.xy * hfovxy_focal.z;
@@ -145,7 +268,7 @@ void main()
                               hfovxy_focal.x, 
                               hfovxy_focal.y, 
                               cov3d, 
-                              view_matrix);
+                              view_matrix * model);
 
     // Invert covariance (EWA algorithm)
 	float det = (cov2d.x * cov2d.z - cov2d.y * cov2d.y);
@@ -174,39 +297,39 @@ void main()
 	}
 
 	// Covert SH to color
-	int sh_start = start + SH_IDX;
-	vec3 dir = g_pos.xyz - cam_pos;
+	// view direction in the object's own frame, where its SH are defined
+	vec3 dir = mat3(inv_model) * (g_pos_model.xyz - cam_pos.xyz);
     dir = normalize(dir);
-	color = SH_C0 * get_vec3(sh_start);
+	color = SH_C0 * get_sh(boxid, 0);
 	
 	if (sh_dim > 3 && render_mod >= 1)  // 1 * 3
 	{
 		float x = dir.x;
 		float y = dir.y;
 		float z = dir.z;
-		color = color - SH_C1 * y * get_vec3(sh_start + 1 * 3) + SH_C1 * z * get_vec3(sh_start + 2 * 3) - SH_C1 * x * get_vec3(sh_start + 3 * 3);
+		color = color - SH_C1 * y * get_sh(boxid, 1) + SH_C1 * z * get_sh(boxid, 2) - SH_C1 * x * get_sh(boxid, 3);
 
 		if (sh_dim > 12 && render_mod >= 2)  // (1 + 3) * 3
 		{
 			float xx = x * x, yy = y * y, zz = z * z;
 			float xy = x * y, yz = y * z, xz = x * z;
 			color = color +
-				SH_C2_0 * xy * get_vec3(sh_start + 4 * 3) +
-				SH_C2_1 * yz * get_vec3(sh_start + 5 * 3) +
-				SH_C2_2 * (2.0f * zz - xx - yy) * get_vec3(sh_start + 6 * 3) +
-				SH_C2_3 * xz * get_vec3(sh_start + 7 * 3) +
-				SH_C2_4 * (xx - yy) * get_vec3(sh_start + 8 * 3);
+				SH_C2_0 * xy * get_sh(boxid, 4) +
+				SH_C2_1 * yz * get_sh(boxid, 5) +
+				SH_C2_2 * (2.0f * zz - xx - yy) * get_sh(boxid, 6) +
+				SH_C2_3 * xz * get_sh(boxid, 7) +
+				SH_C2_4 * (xx - yy) * get_sh(boxid, 8);
 
 			if (sh_dim > 27 && render_mod >= 3)  // (1 + 3 + 5) * 3
 			{
 				color = color +
-					SH_C3_0 * y * (3.0f * xx - yy) * get_vec3(sh_start + 9 * 3) +
-					SH_C3_1 * xy * z * get_vec3(sh_start + 10 * 3) +
-					SH_C3_2 * y * (4.0f * zz - xx - yy) * get_vec3(sh_start + 11 * 3) +
-					SH_C3_3 * z * (2.0f * zz - 3.0f * xx - 3.0f * yy) * get_vec3(sh_start + 12 * 3) +
-					SH_C3_4 * x * (4.0f * zz - xx - yy) * get_vec3(sh_start + 13 * 3) +
-					SH_C3_5 * z * (xx - yy) * get_vec3(sh_start + 14 * 3) +
-					SH_C3_6 * x * (xx - 3.0f * yy) * get_vec3(sh_start + 15 * 3);
+					SH_C3_0 * y * (3.0f * xx - yy) * get_sh(boxid, 9) +
+					SH_C3_1 * xy * z * get_sh(boxid, 10) +
+					SH_C3_2 * y * (4.0f * zz - xx - yy) * get_sh(boxid, 11) +
+					SH_C3_3 * z * (2.0f * zz - 3.0f * xx - 3.0f * yy) * get_sh(boxid, 12) +
+					SH_C3_4 * x * (4.0f * zz - xx - yy) * get_sh(boxid, 13) +
+					SH_C3_5 * z * (xx - yy) * get_sh(boxid, 14) +
+					SH_C3_6 * x * (xx - 3.0f * yy) * get_sh(boxid, 15);
 			}
 		}
 	}
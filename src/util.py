@@ -2,9 +2,7 @@ from loguru import logger
 import sys
 import OpenGL.GL.shaders as shaders 
 import OpenGL.GL as gl
-from gaussian_representation import *
 import numpy as np
-import glm
 import glfw
 
 logger.remove()
@@ -33,7 +31,7 @@ def compile_shaders(vertex_shader, fragment_shader):
     return active_shader
 
 def set_attributes(program, keys, values, vao=None, buffer_ids=None):
-        gl.glUseProgram(program)
+        use_program(program)
         if vao is None:
             vao = gl.glGenVertexArrays(1)
 
@@ -63,11 +61,18 @@ def set_faces_to_vao(vao, faces: np.ndarray):
     gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, faces.nbytes, faces, gl.GL_STATIC_DRAW)
     return element_buffer
 
-def set_storage_buffer_data(program, key, value: np.ndarray, bind_idx, vao=None, buffer_id=None):
-    gl.glUseProgram(program)
-    
+# (program, block name) -> binding point already assigned with glShaderStorageBlockBinding
+_storage_block_bindings = {}
+
+def bind_storage_block(program, key, bind_idx):
+    if _storage_block_bindings.get((program, key)) == bind_idx:
+        return
     block_index = gl.glGetProgramResourceIndex(program, gl.GL_SHADER_STORAGE_BLOCK, key)
     gl.glShaderStorageBlockBinding(program, block_index, bind_idx)
+    _storage_block_bindings[(program, key)] = bind_idx
+
+def set_storage_buffer_data(program, key, value: np.ndarray, bind_idx, vao=None, buffer_id=None):
+    bind_storage_block(program, key, bind_idx)
 
     if vao is not None:
         gl.glBindVertexArray(vao)
@@ -82,44 +87,176 @@ def set_storage_buffer_data(program, key, value: np.ndarray, bind_idx, vao=None,
     gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, 0)
     return buffer_id
 
-def set_uniform_lf(shader, content, name):
-    gl.glUseProgram(shader)
-    gl.glUniform1i(gl.glUniformLocation(shader ,name), content)
+class StreamingStorageBuffer:
+    """
+    Storage buffer for data that is re-uploaded every frame, such as the sort order.
 
-def set_uniform_1int(shader, content, name):
-    gl.glUseProgram(shader)
-    gl.glUniform1i(
-        gl.glGetUniformLocation(shader, name), 
-        content
-    )
+    Uploads rotate through a ring of buffers, so a new upload never overwrites
+    a buffer the GPU may still be reading. Each buffer is guarded by a fence placed
+    after the draws that use it. Storage is reallocated only when the data size
+    changes; otherwise the contents are replaced with glBufferSubData.
+    """
+    def __init__(self, program, key, bind_idx, num_buffers=3):
+        self.bind_idx = bind_idx
+        bind_storage_block(program, key, bind_idx)
+        self.buffers = [gl.glGenBuffers(1) for _ in range(num_buffers)]
+        self.sizes = [0] * num_buffers
+        self.fences = [None] * num_buffers
+        self.current = -1
 
-def set_uniform_mat4(shader, content, name):
-    gl.glUseProgram(shader)
-    if isinstance(content, glm.mat4):
-        content = np.array(content).astype(np.float32)
-    else:
-        content = content.T
-    gl.glUniformMatrix4fv(
-        gl.glGetUniformLocation(shader, name),
-        1,
-        gl.GL_FALSE,
-        content.astype(np.float32)
-    )
+        # Debug counters
+        self.uploads = 0
+        self.bytes_uploaded = 0
+        self.upload_time = 0.0
+        self.fence_wait_time = 0.0
+        self.last_upload_bytes = 0
+        self.last_upload_time = 0.0
 
-def set_uniform_1f(shader, content, name):
-    gl.glUseProgram(shader)
-    gl.glUniform1f(
-        gl.glGetUniformLocation(shader, name),
-        content
-    )
+    def upload(self, value: np.ndarray):
+        data = np.ascontiguousarray(value)
+        start = glfw.get_time()
 
+        self.current = (self.current + 1) % len(self.buffers)
+        fence = self.fences[self.current]
+        if fence is not None:
+            gl.glClientWaitSync(fence, gl.GL_SYNC_FLUSH_COMMANDS_BIT, 1_000_000_000)
+            gl.glDeleteSync(fence)
+            self.fences[self.current] = None
+            self.fence_wait_time += glfw.get_time() - start
 
-def set_uniform_v3(shader, contents, name):
-    gl.glUseProgram(shader)
-    gl.glUniform3f(
-        gl.glGetUniformLocation(shader, name),
-        contents[0], contents[1], contents[2]
-    )
+        buffer_id = self.buffers[self.current]
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, buffer_id)
+        if self.sizes[self.current] != data.nbytes:
+            gl.glBufferData(gl.GL_SHADER_STORAGE_BUFFER, data.nbytes, data, gl.GL_STREAM_DRAW)
+            self.sizes[self.current] = data.nbytes
+        else:
+            gl.glBufferSubData(gl.GL_SHADER_STORAGE_BUFFER, 0, data.nbytes, data)
+        gl.glBindBufferBase(gl.GL_SHADER_STORAGE_BUFFER, self.bind_idx, buffer_id)
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, 0)
+
+        self.last_upload_bytes = data.nbytes
+        self.last_upload_time = glfw.get_time() - start
+        self.uploads += 1
+        self.bytes_uploaded += data.nbytes
+        self.upload_time += self.last_upload_time
+
+    def fence(self):
+        """
+        Marks the current buffer as in use by the draws issued so far.
+        """
+        if self.current < 0:
+            return
+        if self.fences[self.current] is not None:
+            gl.glDeleteSync(self.fences[self.current])
+        self.fences[self.current] = gl.glFenceSync(gl.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+
+    def bandwidth(self):
+        """
+        Average upload bandwidth in bytes per second.
+        """
+        return self.bytes_uploaded / self.upload_time if self.upload_time > 0 else 0.0
+
+# Program last bound by use_program()
+_bound_program = None
+
+def use_program(program):
+    """
+    glUseProgram, skipped when the program is already bound. Code that binds another
+    program behind it must restore the previous one, as the imgui renderer does.
+    """
+    global _bound_program
+    if _bound_program != program:
+        gl.glUseProgram(program)
+        _bound_program = program
+
+class ShaderProgram:
+    """
+    A linked program with its uniform locations resolved once.
+
+    Uniforms are written with glProgramUniform*, so no glUseProgram is needed, and
+    every value is shadowed on the CPU: writing the value a uniform already holds
+    makes no GL call. Uniforms the compiler optimized away are ignored.
+    """
+    def __init__(self, program):
+        self.id = program
+        self.uniforms = {}
+        for i in range(gl.glGetProgramiv(program, gl.GL_ACTIVE_UNIFORMS)):
+            name, _, _ = gl.glGetActiveUniform(program, i)
+            name = name.decode() if isinstance(name, bytes) else name
+            location = gl.glGetUniformLocation(program, name)
+            if location >= 0:  # members of uniform blocks have no location
+                self.uniforms[name.removesuffix("[0]")] = location
+        self._values = {}
+        self.skipped_writes = 0
+
+    @classmethod
+    def from_files(cls, vs, fs):
+        return cls(load_shaders(vs, fs))
+
+    def use(self):
+        use_program(self.id)
+
+    def _changed(self, name, value):
+        if name not in self.uniforms:
+            return False
+        if self._values.get(name) == value:
+            self.skipped_writes += 1
+            return False
+        self._values[name] = value
+        return True
+
+    def set_int(self, name, value):
+        value = int(value)
+        if self._changed(name, value):
+            gl.glProgramUniform1i(self.id, self.uniforms[name], value)
+
+    def set_float(self, name, value):
+        value = float(value)
+        if self._changed(name, value):
+            gl.glProgramUniform1f(self.id, self.uniforms[name], value)
+
+    def set_vec3(self, name, value):
+        value = tuple(float(v) for v in value[:3])
+        if self._changed(name, value):
+            gl.glProgramUniform3f(self.id, self.uniforms[name], *value)
+
+    def set_mat4(self, name, value):
+        """
+        value is a row-major 4x4 matrix as returned by np.array(glm.mat4); GL transposes it on upload.
+        """
+        data = np.ascontiguousarray(value, dtype=np.float32)
+        if self._changed(name, data.tobytes()):
+            gl.glProgramUniformMatrix4fv(self.id, self.uniforms[name], 1, gl.GL_TRUE, data)
+
+    def bind_storage_block(self, name, binding):
+        bind_storage_block(self.id, name, binding)
+
+class UniformBuffer:
+    """
+    A uniform buffer bound to a fixed binding point. upload() skips the GL call
+    when the bytes did not change.
+    """
+    def __init__(self, nbytes, binding):
+        self.binding = binding
+        self.nbytes = nbytes
+        self.buffer = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, self.buffer)
+        gl.glBufferData(gl.GL_UNIFORM_BUFFER, nbytes, None, gl.GL_DYNAMIC_DRAW)
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, 0)
+        gl.glBindBufferBase(gl.GL_UNIFORM_BUFFER, binding, self.buffer)
+        self._shadow = None
+        self.uploads = 0
+
+    def upload(self, data: np.ndarray):
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        raw = data.tobytes()
+        if raw == self._shadow:
+            return
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, self.buffer)
+        gl.glBufferSubData(gl.GL_UNIFORM_BUFFER, 0, data.nbytes, data)
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, 0)
+        self._shadow = raw
+        self.uploads += 1
 
 def get_time():
     return glfw.get_time()
@@ -1,9 +1,21 @@
 from camera import Camera
 from gaussian_representation import GaussianData
 import gaussian_representation
+import ply_cache
+import lod
+import pruning
+import splat_formats
+from ply_stream import StreamingPlyLoader
+from scene import Scene
+from chunked_scene import ResidencyManager, DEFAULT_BUDGET_BYTES
+from profiler import profiler
 from gaussian_renderer import OpenGLRenderer
+import gaussian_renderer
+import spatial_index
 import util
 import numpy as np
+import os
+import time
 
 class WorldSettings():
     def __init__(self):
@@ -22,10 +34,41 @@ class WorldSettings():
         self.scale_modifier = 1.0
         self.render_mode = 7
         self.auto_sort = False
+        self.use_ply_cache = True
+        self.stream_ply_loading = True
+        self.streaming_loader = None
+        self.async_sort = True
+        self.render_on_demand = False  # sleep until an event and redraw the splats only when stale
+        self.idle_timeout = 0.5        # seconds between wake-ups with nothing to do
+        self.busy_timeout = 1 / 120    # seconds between wake-ups while loading, sorting or moving
+        self.storage_format = "float32"
+        self.frustum_culling = False
+        self.lod_enabled = False
+        self.lod_budget = 2_000_000    # maximum number of splats drawn with LOD on
+        self.lod_max_error_px = 2.0    # projected node size above which the node is refined
+        self.lod = None
+        self.load_sh_degree = None     # SH bands read from PLY files, None reads all of them
+        self.sh_degree = 3             # SH bands kept resident on the GPU
+        self.prune_on_load = False
+        self.prune_min_opacity = pruning.DEFAULT_MIN_OPACITY
+        self.prune_min_scale = 0.0     # world units, 0 keeps every size
+        self.prune_dedup_radius = None # merge centers closer than this, None keeps duplicates
+        self.last_prune_report = None
+        self.morton_reorder_on_load = False  # permute loaded splats into Z-order for memory locality
+        self._resident = None          # (source set, degree, truncated set)
+        self.frame_index = 0
 
         # Transformations
         self.model_transform = np.eye(4) 
 
+        # Multi-object scene; None while a single gaussian_set is shown.
+        self.scene = None
+        self.selected_object = None
+
+        # Out-of-core chunked scene paged into self.scene; None otherwise.
+        self.residency = None
+        self.residency_budget = DEFAULT_BUDGET_BYTES
+
 
     def process_model_translation(self, dx, dy):
         dx *= self.model_transform_speed
@@ -35,12 +78,20 @@ class WorldSettings():
         translation[0, 3] = dx
         translation[1, 3] = dy
 
+        if self.scene is not None:
+            # In a scene, I/J/K/L move the selected object.
+            if self.selected_object is not None:
+                self.scene.set_transform(self.selected_object, translation @ self.selected_object.transform)
+                self.gauss_renderer.update_scene(self.scene)
+            return
+
         self.model_transform = translation @ self.model_transform
 
         self.gauss_renderer.set_model_matrix(self.model_transform)
 
     def update_camera_pose(self):
         self.gauss_renderer.update_camera_pose()
+        self._refresh_culling()
 
     def update_render_mode(self, mode):
         self.render_mode = mode
@@ -48,6 +99,69 @@ class WorldSettings():
 
     def update_camera_intrin(self):
         self.gauss_renderer.update_camera_intrin()
+        self._refresh_culling()
+
+    def _refresh_culling(self):
+        """
+        The culled subset is only taken when a sort runs. Without auto-sort, a moved
+        camera would keep drawing the old frustum's splats, so sort for the new one.
+        """
+        if self.auto_sort or getattr(self.gauss_renderer, "spatial_index", None) is None:
+            return
+        if self.async_sort:
+            self.gauss_renderer.request_sort_async()
+        else:
+            self.gauss_renderer.sort_and_update()
+
+    def set_frustum_culling(self, enabled):
+        self.frustum_culling = enabled
+        self.update_activated_render_state()
+
+    def set_lod_enabled(self, enabled):
+        self.lod_enabled = enabled
+        self.update_activated_render_state()
+
+    def set_sh_degree(self, degree):
+        """
+        Changes the SH bands kept resident and rebuilds the GPU buffer with the new sh_dim.
+        Bands dropped here are still in memory, so the degree can be raised again.
+        """
+        self.sh_degree = degree
+        if self.scene is not None:
+            self.scene.set_max_sh_dim(gaussian_representation.sh_dim_for_degree(degree))
+        self.update_activated_render_state()
+
+    def get_render_set(self):
+        """
+        The Gaussians uploaded to the renderer: the loaded set, or all nodes of its
+        LOD hierarchy when LOD is on, with the SH bands above sh_degree dropped.
+        """
+        gaussians = self.gaussian_set
+        if self.lod_enabled:
+            if self.lod is None or self.lod.source is not self.gaussian_set:
+                time_start = util.get_time()
+                self.lod = lod.LodHierarchy(self.gaussian_set)
+                util.logger.info(f"Built {self.lod.num_levels}-level LOD hierarchy "
+                                 f"({len(self.lod.gaussians)} nodes) in {util.get_time() - time_start:.2f} s")
+            gaussians = self.lod.gaussians
+        if gaussians.sh_degree <= self.sh_degree:
+            return gaussians
+        # Keep the truncated copy, so switching render options does not rebuild it.
+        if self._resident is None or self._resident[0] is not gaussians or self._resident[1] != self.sh_degree:
+            self._resident = (gaussians, self.sh_degree, gaussians.with_sh_degree(self.sh_degree))
+        return self._resident[2]
+
+    def set_storage_format(self, storage_format):
+        self.storage_format = storage_format
+        self.update_activated_render_state()
+
+    def set_sort_backend(self, name):
+        try:
+            gaussian_renderer.set_sort_backend(name)
+        except (ImportError, ValueError) as e:
+            util.logger.error(f"Cannot use sort backend '{name}': {e}")
+            return
+        self.gauss_renderer.sort_and_update()
 
     def create_gaussian_renderer(self):
         self.gauss_renderer = OpenGLRenderer(self.world_camera.w, self.world_camera.h, self)
@@ -58,15 +172,217 @@ class WorldSettings():
         dy *= self.time_scale
         self.world_camera.process_translation(dx, dy)
 
+    def set_render_on_demand(self, enabled):
+        self.render_on_demand = enabled
+        if not enabled:
+            self.gauss_renderer.release_frame_target()
+        self.gauss_renderer.dirty = True
+
+    def event_timeout(self):
+        """
+        Seconds the render-on-demand loop may wait for input before the next frame:
+        short while work that will change the image is in progress, long otherwise.
+        """
+        renderer = self.gauss_renderer
+        busy = (renderer.dirty or self.streaming_loader is not None
+                or (self.residency is not None and self.residency.busy)
+                or (renderer.sort_worker is not None and renderer.sort_worker.pending)
+                or (self.auto_sort and renderer.sort_scheduler.settling)
+                or (self.input_handler is not None and self.input_handler.keys_held()))
+        return self.busy_timeout if busy else self.idle_timeout
+
+    def get_sort_staleness(self):
+        """
+        Number of frames since the view that produced the drawn order.
+        """
+        return self.frame_index - self.gauss_renderer.order_frame
+
     def get_num_gaussians(self):
+        if self.scene is not None:
+            return len(self.scene)
         return len(self.gaussian_set) if self.gaussian_set is not None else 0
-    
+
+    def _read_ply(self, file_path):
+        if not file_path.lower().endswith(".ply"):
+            gaussians = splat_formats.load(file_path, self.load_sh_degree)
+        elif self.use_ply_cache:
+            gaussians = ply_cache.load(file_path, self.load_sh_degree)
+        else:
+            gaussians = gaussian_representation.from_ply(file_path, self.load_sh_degree)
+        return self._prepare(gaussians)
+
+    def _prepare(self, gaussians):
+        """
+        The load stages that run on every loaded set: pruning, then Morton reordering.
+        """
+        gaussians = self._prune(gaussians)
+        if self.morton_reorder_on_load:
+            time_start = time.perf_counter()
+            gaussians = gaussians.reordered(spatial_index.morton_order(gaussians.xyz))
+            util.logger.info(f"Morton-ordered {len(gaussians)} splats in {time.perf_counter() - time_start:.2f} s")
+        return gaussians
+
+    def _prune(self, gaussians):
+        if not self.prune_on_load:
+            return gaussians
+        gaussians, self.last_prune_report = pruning.prune(
+            gaussians, self.prune_min_opacity, self.prune_min_scale, self.prune_dedup_radius)
+        util.logger.info(str(self.last_prune_report))
+        return gaussians
+
+    @property
+    def can_save(self) -> bool:
+        """
+        True when gaussian_set is what is on screen: not a multi-object or
+        out-of-core scene, and not a file still streaming in.
+        """
+        return self.scene is None and self.residency is None and self.streaming_loader is None
+
+    def save_ply(self, file_path):
+        """
+        Writes the loaded set, after pruning, back to a .ply, .splat or .spz file.
+        """
+        if not self.can_save:
+            raise RuntimeError("Only a fully loaded single model can be saved, not a scene or a file still loading")
+        splat_formats.save(file_path, self.gaussian_set)
+        util.logger.info(f"Saved {len(self.gaussian_set)} splats to {file_path}")
+
+    def add_ply_object(self, file_path, transform=None):
+        """
+        Adds a PLY file to the scene next to the objects already loaded; the first
+        call turns the current single-model view into a scene whose first object is
+        the loaded model, placed by model_transform. An out-of-core scene is closed.
+        """
+        single_model = self.scene is None
+        self._close_residency()
+        if self.scene is None:
+            self.scene = Scene(max_sh_dim=gaussian_representation.sh_dim_for_degree(self.sh_degree))
+            self.selected_object = None
+            if self.streaming_loader is not None:
+                self.gaussian_set = self.streaming_loader.wait()
+                self.streaming_loader = None
+            if single_model and self.gaussian_set is not None and len(self.gaussian_set) > 0:
+                self.scene.add(self.gaussian_set, self.model_transform, name="model")
+            # Scene objects carry their own transforms and are drawn in world space.
+            self.model_transform = np.eye(4)
+        obj = self.scene.add(self._read_ply(file_path), transform, name=os.path.basename(file_path))
+        self.selected_object = obj
+        self.update_activated_render_state()
+        return obj
+
+    def remove_object(self, obj):
+        self.scene.remove(obj)
+        if self.selected_object is obj:
+            self.selected_object = None
+        self.update_activated_render_state()
+
     def load_ply(self, file_path):
-        self.gaussian_set = gaussian_representation.from_ply(file_path)
+        if self.streaming_loader is not None:
+            self.streaming_loader.cancel()
+            self.streaming_loader = None
+        self._close_residency()
+        self.scene = None
+        self.selected_object = None
+        is_ply = file_path.lower().endswith(".ply")
+        if self.use_ply_cache and is_ply:
+            cached = ply_cache.default_cache().lookup(file_path, self.load_sh_degree)
+            if cached is not None:
+                self.gaussian_set = self._prepare(cached)
+                self.update_activated_render_state()
+                return
+        if self.stream_ply_loading and is_ply and not self.prune_on_load and not self.morton_reorder_on_load:
+            # The previous scene stays on screen until the first chunk arrives.
+            cache = ply_cache.default_cache() if self.use_ply_cache else None
+            self.streaming_loader = StreamingPlyLoader(file_path, max_sh_degree=self.load_sh_degree, cache=cache)
+            return
+        self.gaussian_set = self._read_ply(file_path)
+        self.update_activated_render_state()
+
+    def open_chunked(self, manifest_path):
+        """
+        Opens a scene preprocessed by chunked_scene.py. Chunks are paged in by
+        update_residency() as the camera moves.
+        """
+        if self.streaming_loader is not None:
+            self.streaming_loader.cancel()
+            self.streaming_loader = None
+        self._close_residency()
+        scene = Scene(max_sh_dim=gaussian_representation.sh_dim_for_degree(self.sh_degree))
+        self.residency = ResidencyManager(manifest_path, self.residency_budget, scene)
+        self.scene = scene
+        self.selected_object = None
+        util.logger.info(f"Opened {len(self.residency.chunks)} chunks "
+                         f"({self.residency.manifest['total']} splats) from {manifest_path}")
         self.update_activated_render_state()
 
+    def _close_residency(self):
+        if self.residency is None:
+            return
+        self.residency.stop()
+        self.residency = None
+        self.scene = None
+        self.selected_object = None
+
+    def update_residency(self):
+        """
+        Pages chunks of an out-of-core scene in and out for the current camera and
+        re-uploads the scene when that changed it. Called once per frame.
+        """
+        if self.residency is None:
+            return
+        self.residency.budget_bytes = self.residency_budget
+        with profiler.scope("residency"):
+            changed = self.residency.update(self.world_camera)
+        if changed:
+            self.gauss_renderer.update_scene(self.scene)
+            if self.async_sort and self.gauss_renderer.num_instances > 0:
+                # The previous order keeps drawing the chunks it covers until the new one lands.
+                self.gauss_renderer.request_sort_async()
+            else:
+                self.gauss_renderer.sort_and_update()
+
+    def update_streaming(self):
+        """
+        Uploads the chunks the streaming loader finished since the last frame and
+        redraws the grown prefix. Called once per frame.
+        """
+        loader = self.streaming_loader
+        if loader is None:
+            return
+        ranges = loader.poll()
+        if loader.error is not None:
+            self.streaming_loader = None
+            return
+        if not ranges:
+            return
+        if ranges[0][0] == 0:
+            self.gauss_renderer.begin_streaming(loader.total, loader.flat.shape[-1] - 11)
+            util.logger.info(f"First {ranges[0][1]} splats after {loader.first_chunk_time * 1000:.0f} ms")
+        for start, stop in ranges:
+            self.gauss_renderer.upload_rows(start, loader.flat[start:stop])
+        self.gaussian_set = loader.gaussians()
+        self.gauss_renderer.set_streamed_prefix(self.gaussian_set)
+        if ranges[0][0] == 0 or not self.async_sort:
+            # begin_streaming() reallocated the SSBO, so the first chunk needs an order right away.
+            self.gauss_renderer.sort_and_update()
+        else:
+            # The previous prefix's order stays valid until the worker sorts the grown one.
+            self.gauss_renderer.request_sort_async()
+
+        if loader.done:
+            self.streaming_loader = None
+            util.logger.info(f"Loaded {loader.total} splats in {time.perf_counter() - loader.start_time:.2f} s")
+            # The streamed SSBO only covers the plain float32 layout with every loaded SH band.
+            if (self.storage_format != "float32" or self.lod_enabled or self.frustum_culling
+                    or self.gaussian_set.sh_degree > self.sh_degree):
+                self.update_activated_render_state()
+
     def update_activated_render_state(self):
-        self.gauss_renderer.update_gaussian_data(self.gaussian_set)
+        with profiler.scope("gaussian_upload"):
+            if self.scene is not None:
+                self.gauss_renderer.update_scene(self.scene)
+            else:
+                self.gauss_renderer.update_gaussian_data(self.get_render_set())
         self.gauss_renderer.sort_and_update()
         self.gauss_renderer.set_scale_modifier(self.scale_modifier)
         self.gauss_renderer.set_render_mode(self.render_mode - 4)